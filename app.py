@@ -5,6 +5,14 @@ sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
 import pandapower_electrisim
 import opendss_electrisim
+import simulation_jobs
+import network_cache
+import payload_index
+import result_columns
+import result_json
+import stage_timing
+import request_profiler
+import study_cancellation
 import os
 import json
 
@@ -44,8 +52,9 @@ cors_origins = os.getenv('CORS_ORIGINS', '').split(',') if os.getenv('CORS_ORIGI
 # CORS configuration for both development and production
 CORS(app, 
      origins=cors_origins, 
-     methods=['GET', 'POST', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization', 'Access-Control-Allow-Credentials'],
+     methods=['GET', 'POST', 'DELETE', 'OPTIONS'],
+     allow_headers=['Content-Type', 'Authorization', 'Access-Control-Allow-Credentials', 'X-Electrisim-Profile'],
+     expose_headers=['X-Electrisim-Model-Hash', 'Server-Timing', 'X-Electrisim-Peak-Memory-Bytes'],
      supports_credentials=True)
 
 app.config['CORS_HEADERS'] = 'Content-Type'
@@ -59,565 +68,716 @@ app.config['CORS_HEADERS'] = 'Content-Type'
 def index():
         return 'Please send data to backend'
 
-@app.route('/', methods=['GET','POST'])
-def simulation():
-    try:
-        #in_data = request.get_json()
-        in_data = request.get_json(force=True) #force – if set to True the mimetype is ignored.
-        print(in_data) 
-       
-        Busbars = {}
+
+def _gzip_json_response(response_data):
+    """Return a JSON string body, gzip-compressed when the client accepts it and it is larger than 1 KB."""
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if 'gzip' in accept_encoding and len(response_data) > 1024:
+        with stage_timing.stage('compress'):
+            compressed = gzip.compress(response_data.encode('utf-8'))
+        response = make_response(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Content-Type'] = 'application/json'
+        response.headers['Content-Length'] = len(compressed)
+        return response
+    return Response(response_data, mimetype='application/json')
+
+
+def _study_response(result):
+    """
+    Turn the value returned by _run_study() / _run_study_job() into a Flask response:
+    JSON strings go through the gzip path, dicts through jsonify, (dict, status) tuples
+    keep their status and ready-made Response objects (NDJSON streams) pass through.
+    """
+    if isinstance(result, Response):
+        return result
+    if isinstance(result, tuple):
+        payload, status = result
+        return jsonify(payload), status
+    if isinstance(result, str):
+        return _gzip_json_response(result)
+    return jsonify(result)
+
+
+def _study_error(e):
+    """Map an exception raised by a study to the (error payload, HTTP status) pair sent to the frontend."""
+    if isinstance(e, network_cache.UnknownBaseModel):
+        # Delta against a model this worker no longer remembers - the client resends the full diagram
+        print(f"Delta Error: {e}")
+        return {'error': str(e), 'code': 'unknown_base_model'}, 409
+    if isinstance(e, ValueError):
+        # Handle validation errors (like missing bus connections)
+        error_message = str(e)
+        print(f"Validation Error: {error_message}")
+        return {'error': error_message}, 400
+    # Handle other unexpected errors
+    error_message = (
+        f"Server error: {str(e)} "
+        f"- if this problem persists, please contact electrisim@electrisim.com for support."
+    )
+    print(f"Unexpected Error: {error_message}")
+    import traceback
+    traceback.print_exc()
+    return {'error': error_message}, 500
+
+
+# Study rows are matched in the same order as the branches in _run_study()
+# ("PowerFlowPandaPower" is also a substring of "OptimalPowerFlowPandaPower").
+_STUDY_TYPES = (
+    'FuseCharacteristicPreviewPandaPower',
+    'OptimalPowerFlowPandaPower',
+    'PowerFlowPandaPower',
+    'RPCAnalysisPandaPower',
+    'ShortCircuitPandaPower',
+    'ShortCircuitOpenDss',
+    'PowerFlowOpenDss',
+    'ContingencyAnalysisPandaPower',
+    'ProtectionCoordinationPandaPower',
+    'EconomicAnalysisPandaPower',
+    'ControllerSimulationPandaPower',
+    'TimeSeriesSimulationPandaPower',
+)
+
+
+def _study_type(in_data):
+    """Name of the study requested by a simulation payload (e.g. 'PowerFlowPandaPower'), or 'unknown'."""
+    if not isinstance(in_data, dict):
+        return 'unknown'
+    if in_data.get('bess_sizing_params', {}).get('typ') == 'BessSizingPandaPower':
+        return 'BessSizingPandaPower'
+    for row in in_data.values():
+        typ = row.get('typ', '') if isinstance(row, dict) else ''
+        for study in _STUDY_TYPES:
+            if study in typ:
+                return study
+    return 'unknown'
+
+
+def _stream_requested(study_row, allow_stream, key='stream'):
+    """True when the study row asks for an NDJSON stream and streaming is allowed for this request."""
+    return allow_stream and isinstance(study_row, dict) and bool(study_row.get(key, False))
+
+
+def _ndjson_study_stream(run, cancel=None):
+    """
+    Stream a long study as NDJSON. run(progress_cb, partial_cb) executes in a worker thread and
+    returns the study result (JSON string or dict); what it reports is sent as it arrives.
+    cancel (the study's CancelToken) is tripped when the client stops reading the stream.
+
+        {"type": "progress", "message": "..."}
+        {"type": "partial", "data": {"<result key>": [...]}}   items to append to result[key]
+        {"type": "result", "data": {...}}                      lists sent as partials are empty here
+        {"type": "error", "message": "..."}
+    """
+    def _stream():
+        q = queue.Queue()
+
+        def _progress_cb(msg):
+            q.put(('p', msg))
+
+        def _partial_cb(data):
+            # Serialised in the worker so the study may reuse its objects afterwards.
+            q.put(('r', result_json.dumps(data)))
+
+        def _worker():
+            try:
+                q.put(('d', run(_progress_cb, _partial_cb)))
+            except study_cancellation.StudyCancelled:
+                q.put(('e', 'Study cancelled'))
+            except Exception as ex:
+                q.put(('e', str(ex)))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+        try:
+            while True:
+                kind, payload = q.get()
+                if kind == 'p':
+                    yield json.dumps({'type': 'progress', 'message': payload}, ensure_ascii=False) + '\n'
+                elif kind == 'r':
+                    yield '{"type":"partial","data":' + payload + '}\n'
+                elif kind == 'e':
+                    yield json.dumps({'type': 'error', 'message': payload}, ensure_ascii=False) + '\n'
+                    return
+                elif kind == 'd':
+                    raw = payload
+                    break
+
+            if raw is None:
+                yield json.dumps({'type': 'error', 'message': 'No result'}, ensure_ascii=False) + '\n'
+                return
+            if isinstance(raw, dict):
+                obj = raw
+            else:
+                try:
+                    obj = json.loads(raw)
+                except Exception:
+                    yield json.dumps({'type': 'error', 'message': 'Invalid result JSON'}, ensure_ascii=False) + '\n'
+                    return
+            if isinstance(obj, dict) and obj.get('error'):
+                message = obj['error'] if isinstance(obj['error'], str) else obj.get('message', 'Study failed')
+                yield json.dumps({'type': 'error', 'message': message}, ensure_ascii=False) + '\n'
+                return
+            yield '{"type":"result","data":' + result_json.dumps(obj) + '}\n'
+        finally:
+            # Also reached when the server closes the generator because the client went away;
+            # the worker thread then stops at the study's next cancellation check.
+            if cancel is not None:
+                cancel.cancel()
+
+    resp = Response(stream_with_context(_stream()), mimetype='application/x-ndjson')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+
+def _run_study(in_data, allow_stream=False, delta=None, cancel=None, model=None):
+    """
+    Build the network and run the study requested by in_data (delta: see network_cache.expand_delta,
+    model: its network_cache.remember_model hash if the caller already has it).
+    cancel (a study_cancellation.CancelToken) is handed to the long-running studies as '_cancel_token'.
+
+    Returns a JSON string, a dict (jsonify'd by the caller) or a Response (fuse preview, NDJSON
+    stream of a long study when allow_stream is True). Validation problems raise ValueError.
+    """
+    Busbars = {}
+    index = payload_index.index_payload(in_data)
+    
+    # Check for BESS sizing request first (it's in a nested structure)
+    if 'bess_sizing_params' in in_data and in_data.get('bess_sizing_params', {}).get('typ') == 'BessSizingPandaPower':
+        # Extract user email for logging
+        user_email = in_data.get('bess_sizing_params', {}).get('user_email', 'unknown@user.com')
+        print(f"=== BESS SIZING REQUESTED BY USER: {user_email} ===")
         
-        # Check for BESS sizing request first (it's in a nested structure)
-        if 'bess_sizing_params' in in_data and in_data.get('bess_sizing_params', {}).get('typ') == 'BessSizingPandaPower':
-            # Extract user email for logging
-            user_email = in_data.get('bess_sizing_params', {}).get('user_email', 'unknown@user.com')
-            print(f"=== BESS SIZING REQUESTED BY USER: {user_email} ===")
-            
-            # Extract BESS sizing parameters
-            bess_params = in_data.get('bess_sizing_params', {})
-            frequency = float(bess_params.get('frequency', 50))
-            algorithm = bess_params.get('algorithm', 'nr')
-            calculation_mode = bess_params.get('calculationMode', 'single')
-            
-            # Check if multiple scenarios mode
-            if calculation_mode == 'multiple' and 'scenarios' in bess_params:
-                scenarios = bess_params.get('scenarios', [])
-                print(f"=== MULTIPLE SCENARIOS MODE: {len(scenarios)} scenarios ===")
-                
+        # Extract BESS sizing parameters
+        bess_params = {**in_data.get('bess_sizing_params', {}), '_cancel_token': cancel}
+        frequency = float(bess_params.get('frequency', 50))
+        algorithm = bess_params.get('algorithm', 'nr')
+        calculation_mode = bess_params.get('calculationMode', 'single')
+        
+        # Check if multiple scenarios mode
+        if calculation_mode == 'multiple' and 'scenarios' in bess_params:
+            scenarios = bess_params.get('scenarios', [])
+            print(f"=== MULTIPLE SCENARIOS MODE: {len(scenarios)} scenarios ===")
+
+            def _run_scenarios(progress_cb=None, partial_cb=None):
                 scenario_results = []
                 for scenario in scenarios:
+                    study_cancellation.check(cancel)
                     scenario_name = scenario.get('name', 'Unknown')
                     scenario_p = float(scenario.get('p', 0.0))
                     scenario_q = float(scenario.get('q', 0.0))
-                    
+
                     print(f"=== Processing scenario: {scenario_name} (P={scenario_p} MW, Q={scenario_q} Mvar) ===")
-                    
-                    # Create fresh network for each scenario (as in notebook)
-                    net = pp.create_empty_network(f_hz=frequency)
-                    Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                    pandapower_electrisim.create_other_elements(in_data, net, None, Busbars)
-                    
+                    if progress_cb:
+                        progress_cb(f"Scenario {scenario_name} (P={scenario_p} MW, Q={scenario_q} Mvar)")
+
+                    # Fresh copy of the (cached) network for each scenario
+                    net, _ = network_cache.build_network(in_data, frequency, delta=delta, index=index, model=model)
+
                     # Create scenario-specific params
                     scenario_params = bess_params.copy()
                     scenario_params['targetP'] = scenario_p
                     scenario_params['targetQ'] = scenario_q
-                    
+
                     # Run BESS sizing calculation for this scenario
                     scenario_result_json = pandapower_electrisim.bess_sizing(net, scenario_params)
                     scenario_result = json.loads(scenario_result_json)
-                    
+
                     # Add scenario name to result
                     scenario_result['scenario_name'] = scenario_name
                     scenario_result['scenario_p'] = scenario_p
                     scenario_result['scenario_q'] = scenario_q
-                    scenario_results.append(scenario_result)
-                
+                    if partial_cb:
+                        partial_cb({'scenarios': [scenario_result]})
+                    else:
+                        scenario_results.append(scenario_result)
+
                 # Aggregate results
-                response_data = json.dumps({
+                return json.dumps({
                     'calculationMode': 'multiple',
                     'scenarios': scenario_results,
                     'total_scenarios': len(scenarios)
                 })
-            else:
-                # Single target mode (existing logic)
-                print(f"=== SINGLE TARGET MODE ===")
-                
-                # Create network
-                net = pp.create_empty_network(f_hz=frequency)
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                # Process all elements (create_other_elements loops internally, so call once)
-                pandapower_electrisim.create_other_elements(in_data, net, None, Busbars)
-                
-                # Run BESS sizing calculation
-                response_data = pandapower_electrisim.bess_sizing(net, bess_params)
+
+            if _stream_requested(bess_params, allow_stream):
+                return _ndjson_study_stream(_run_scenarios, cancel)
+            response_data = _run_scenarios()
+        else:
+            # Single target mode (existing logic)
+            print(f"=== SINGLE TARGET MODE ===")
             
-            # Check if client accepts gzip compression
-            accept_encoding = request.headers.get('Accept-Encoding', '')
-            if 'gzip' in accept_encoding and len(response_data) > 1024:
-                compressed = gzip.compress(response_data.encode('utf-8'))
-                response = make_response(compressed)
-                response.headers['Content-Encoding'] = 'gzip'
-                response.headers['Content-Type'] = 'application/json'
-                response.headers['Content-Length'] = len(compressed)
-                return response
-            else:
-                return response_data
-              
-        #utworzenie sieci - w pierwszej petli sczytujemy parametry symulacji i tworzymy szyny
-        for x in in_data:    
-            #print(x)
-            if "FuseCharacteristicPreviewPandaPower" in in_data[x].get('typ', ''):
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                print(f"=== FUSE CHARACTERISTIC PREVIEW: {user_email} ===")
-                body = pandapower_electrisim.fuse_characteristic_preview(in_data[x])
-                return Response(body, mimetype='application/json')
-
-            if "OptimalPowerFlowPandaPower" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                
-                # Extract OPF parameters
-                opf_params = {
-                    'opf_type': in_data[x]['opf_type'],
-                    'frequency': eval(in_data[x]['frequency']),
-                    'ac_algorithm': in_data[x]['ac_algorithm'],
-                    'dc_algorithm': in_data[x]['dc_algorithm'],
-                    'calculate_voltage_angles': in_data[x]['calculate_voltage_angles'],
-                    'init': in_data[x]['init'],
-                    'delta': in_data[x]['delta'],
-                    'trafo_model': in_data[x]['trafo_model'],
-                    'trafo_loading': in_data[x]['trafo_loading'],
-                    'ac_line_model': in_data[x]['ac_line_model'],
-                    'numba': in_data[x]['numba'],
-                    'suppress_warnings': in_data[x]['suppress_warnings'],
-                    'cost_function': in_data[x]['cost_function'],
-                    'cost_currency': in_data[x].get('cost_currency') or 'EUR',
-                    'generator_cost_cp1': in_data[x].get('generator_cost_cp1') or {},
-                    'generator_cost_cp2': in_data[x].get('generator_cost_cp2') or {},
-                    'ext_grid_cost_cp1': in_data[x].get('ext_grid_cost_cp1') or {},
-                    'ext_grid_cost_cp2': in_data[x].get('ext_grid_cost_cp2') or {},
-                    'storage_cost_cp1': in_data[x].get('storage_cost_cp1') or {},
-                    'storage_cost_cp2': in_data[x].get('storage_cost_cp2') or {},
-                    'sgen_cost_cp1': in_data[x].get('sgen_cost_cp1') or {},
-                    'sgen_cost_cp2': in_data[x].get('sgen_cost_cp2') or {},
-                    'load_cost_cp1': in_data[x].get('load_cost_cp1') or {},
-                    'load_cost_cp2': in_data[x].get('load_cost_cp2') or {},
-                    'dcline_cost_cp1': in_data[x].get('dcline_cost_cp1') or {},
-                    'dcline_cost_cp2': in_data[x].get('dcline_cost_cp2') or {},
-                }
-                
-                # Create network
-                net = pp.create_empty_network(f_hz=opf_params['frequency'])
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                
-                # Run optimal power flow
-                response = pandapower_electrisim.optimalPowerFlow(net, opf_params)
-                return jsonify(response) # Changed to jsonify for direct dict return
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, frequency, delta=delta, index=index, model=model)
             
-            if "PowerFlowPandaPower" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                print(f"=== LOAD FLOW SIMULATION REQUESTED BY USER: {user_email} ===")
-                
-                frequency=eval(in_data[x]['frequency'])
-                algorithm=in_data[x]['algorithm']
-                calculate_voltage_angles = in_data[x]['calculate_voltage_angles']
-                init = in_data[x]['initialization']
-                export_python = in_data[x].get('exportPython', False)  # Export Python code flag
-                rc2, rc3, rcs = pandapower_electrisim._resolve_controller_family_flags(in_data[x])
-
-                net = pp.create_empty_network(f_hz=frequency)
-           
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)   
-
-                response_data = pandapower_electrisim.powerflow(
-                    net, algorithm, calculate_voltage_angles, init, export_python, in_data, Busbars,
-                    run_control_trafo2w=rc2, run_control_trafo3w=rc3, run_control_shunt=rcs,
-                )  
-
-                # Check if client accepts gzip compression
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:  # Only compress if > 1KB
-                    # Compress response
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
+            # Run BESS sizing calculation
+            response_data = pandapower_electrisim.bess_sizing(net, bess_params)
+        
+        return response_data
+          
+    #utworzenie sieci - w pierwszej petli sczytujemy parametry symulacji i tworzymy szyny
+    for x in index.keys(payload_index.STUDY):
+        #print(x)
+        if "FuseCharacteristicPreviewPandaPower" in in_data[x].get('typ', ''):
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            print(f"=== FUSE CHARACTERISTIC PREVIEW: {user_email} ===")
+            body = pandapower_electrisim.fuse_characteristic_preview(in_data[x])
+            return Response(body, mimetype='application/json')
+
+        if "OptimalPowerFlowPandaPower" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
             
+            # Extract OPF parameters
+            opf_params = {
+                'opf_type': in_data[x]['opf_type'],
+                'frequency': eval(in_data[x]['frequency']),
+                'ac_algorithm': in_data[x]['ac_algorithm'],
+                'dc_algorithm': in_data[x]['dc_algorithm'],
+                'calculate_voltage_angles': in_data[x]['calculate_voltage_angles'],
+                'init': in_data[x]['init'],
+                'delta': in_data[x]['delta'],
+                'trafo_model': in_data[x]['trafo_model'],
+                'trafo_loading': in_data[x]['trafo_loading'],
+                'ac_line_model': in_data[x]['ac_line_model'],
+                'numba': in_data[x]['numba'],
+                'suppress_warnings': in_data[x]['suppress_warnings'],
+                'cost_function': in_data[x]['cost_function'],
+                'cost_currency': in_data[x].get('cost_currency') or 'EUR',
+                'generator_cost_cp1': in_data[x].get('generator_cost_cp1') or {},
+                'generator_cost_cp2': in_data[x].get('generator_cost_cp2') or {},
+                'ext_grid_cost_cp1': in_data[x].get('ext_grid_cost_cp1') or {},
+                'ext_grid_cost_cp2': in_data[x].get('ext_grid_cost_cp2') or {},
+                'storage_cost_cp1': in_data[x].get('storage_cost_cp1') or {},
+                'storage_cost_cp2': in_data[x].get('storage_cost_cp2') or {},
+                'sgen_cost_cp1': in_data[x].get('sgen_cost_cp1') or {},
+                'sgen_cost_cp2': in_data[x].get('sgen_cost_cp2') or {},
+                'load_cost_cp1': in_data[x].get('load_cost_cp1') or {},
+                'load_cost_cp2': in_data[x].get('load_cost_cp2') or {},
+                'dcline_cost_cp1': in_data[x].get('dcline_cost_cp1') or {},
+                'dcline_cost_cp2': in_data[x].get('dcline_cost_cp2') or {},
+            }
             
-            if "RPCAnalysisPandaPower" in in_data[x]['typ']:
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                print(f"=== RPC ANALYSIS REQUESTED BY USER: {user_email} ===")
-
-                frequency = float(in_data[x].get('frequency', 50))
-                net = pp.create_empty_network(f_hz=frequency)
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-
-                q_mode = in_data[x].get('q_capability_mode', 'from_rating')
-                if q_mode == 'from_sgen_curve':
-                    pandapower_electrisim.apply_sgen_q_capability_curves(
-                        net, in_data, rpc_use_diagram_curves=True)
-
-                rpc_params = {
-                    'pcc_bus_name': in_data[x].get('pcc_bus_name'),
-                    'ext_grid_name': in_data[x].get('ext_grid_name'),
-                    'generator_names': in_data[x].get('generator_names', []),
-                    'voltage_levels': [float(v) for v in in_data[x].get('voltage_levels', [1.0])],
-                    'p_min_mw': in_data[x].get('p_min_mw', 0),
-                    'p_max_mw': in_data[x].get('p_max_mw', 0),
-                    'p_steps': in_data[x].get('p_steps', 10),
-                    'q_capability_mode': q_mode,
-                    'limit_overloads': in_data[x].get('limit_overloads', False),
-                    'max_loading_percent': in_data[x].get('max_loading_percent', 100),
-                    'requirements': in_data[x].get('requirements', None),
-                    'verbose_iwamoto': in_data[x].get('verbose_iwamoto', False),
-                    'run_control': in_data[x].get('run_control', False),
-                    'grid_code_template_key': in_data[x].get('grid_code_template_key'),
-                    'grid_code_template_name': in_data[x].get('grid_code_template_name'),
-                }
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, opf_params['frequency'], delta=delta, index=index, model=model)
+            
+            # Run optimal power flow
+            response = pandapower_electrisim.optimalPowerFlow(net, opf_params)
+            return response
+        
+        if "PowerFlowPandaPower" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            print(f"=== LOAD FLOW SIMULATION REQUESTED BY USER: {user_email} ===")
+            
+            frequency=eval(in_data[x]['frequency'])
+            algorithm=in_data[x]['algorithm']
+            calculate_voltage_angles = in_data[x]['calculate_voltage_angles']
+            init = in_data[x]['initialization']
+            export_python = in_data[x].get('exportPython', False)  # Export Python code flag
+            rc2, rc3, rcs = pandapower_electrisim._resolve_controller_family_flags(in_data[x])
+
+            net, Busbars = network_cache.build_network(in_data, frequency, delta=delta, index=index, model=model)
+
+            response_data = pandapower_electrisim.powerflow(
+                net, algorithm, calculate_voltage_angles, init, export_python, in_data, Busbars,
+                run_control_trafo2w=rc2, run_control_trafo3w=rc3, run_control_shunt=rcs,
+                result_format=result_columns.result_format(in_data[x]),
+            )  
+
+            return response_data
+        
+        
+        if "RPCAnalysisPandaPower" in in_data[x]['typ']:
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            print(f"=== RPC ANALYSIS REQUESTED BY USER: {user_email} ===")
+
+            frequency = float(in_data[x].get('frequency', 50))
+            net, Busbars = network_cache.build_network(in_data, frequency, delta=delta, index=index, model=model)
+
+            q_mode = in_data[x].get('q_capability_mode', 'from_rating')
+            if q_mode == 'from_sgen_curve':
+                pandapower_electrisim.apply_sgen_q_capability_curves(
+                    net, in_data, rpc_use_diagram_curves=True)
+
+            rpc_params = {
+                'pcc_bus_name': in_data[x].get('pcc_bus_name'),
+                'ext_grid_name': in_data[x].get('ext_grid_name'),
+                'generator_names': in_data[x].get('generator_names', []),
+                'voltage_levels': [float(v) for v in in_data[x].get('voltage_levels', [1.0])],
+                'p_min_mw': in_data[x].get('p_min_mw', 0),
+                'p_max_mw': in_data[x].get('p_max_mw', 0),
+                'p_steps': in_data[x].get('p_steps', 10),
+                'q_capability_mode': q_mode,
+                'limit_overloads': in_data[x].get('limit_overloads', False),
+                'max_loading_percent': in_data[x].get('max_loading_percent', 100),
+                'requirements': in_data[x].get('requirements', None),
+                'verbose_iwamoto': in_data[x].get('verbose_iwamoto', False),
+                'q_search': in_data[x].get('q_search', 'bisection'),
+                'q_tolerance_mvar': in_data[x].get('q_tolerance_mvar', 0.01),
+                'engine': in_data[x].get('engine', 'pf'),
+                'run_control': in_data[x].get('run_control', False),
+                'grid_code_template_key': in_data[x].get('grid_code_template_key'),
+                'grid_code_template_name': in_data[x].get('grid_code_template_name'),
+                '_cancel_token': cancel,
+            }
 
-                use_rpc_stream = bool(in_data[x].get('rpc_stream', False))
+            if _stream_requested(in_data[x], allow_stream, 'rpc_stream'):
+                return _ndjson_study_stream(lambda progress_cb, partial_cb: pandapower_electrisim.reactive_power_capability(
+                    net, {**rpc_params, '_progress_callback': progress_cb}), cancel)
 
-                if use_rpc_stream:
+            response_data = pandapower_electrisim.reactive_power_capability(net, rpc_params)
 
-                    def _rpc_ndjson_stream():
-                        q = queue.Queue()
+            return response_data
 
-                        def _progress_cb(msg):
-                            q.put(('p', msg))
+        if "ShortCircuitPandaPower" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
 
-                        def _worker():
-                            try:
-                                rp = {**rpc_params, '_progress_callback': _progress_cb}
-                                out = pandapower_electrisim.reactive_power_capability(net, rp)
-                                q.put(('d', out))
-                            except Exception as ex:
-                                q.put(('e', str(ex)))
-
-                        threading.Thread(target=_worker, daemon=True).start()
-
-                        while True:
-                            kind, payload = q.get()
-                            if kind == 'p':
-                                yield json.dumps({'type': 'progress', 'message': payload}, ensure_ascii=False) + '\n'
-                            elif kind == 'e':
-                                yield json.dumps({'type': 'error', 'message': payload}, ensure_ascii=False) + '\n'
-                                return
-                            elif kind == 'd':
-                                raw = payload
-                                break
-
-                        if raw is None:
-                            yield json.dumps({'type': 'error', 'message': 'No RPC result'}, ensure_ascii=False) + '\n'
-                            return
-                        try:
-                            obj = json.loads(raw)
-                        except Exception:
-                            yield json.dumps({'type': 'error', 'message': 'Invalid RPC JSON'}, ensure_ascii=False) + '\n'
-                            return
-                        if isinstance(obj, dict) and obj.get('error'):
-                            yield json.dumps({'type': 'error', 'message': obj['error']}, ensure_ascii=False) + '\n'
-                            return
-                        yield json.dumps({'type': 'result', 'data': obj}, ensure_ascii=False, separators=(',', ':')) + '\n'
-
-                    resp = Response(
-                        stream_with_context(_rpc_ndjson_stream()),
-                        mimetype='application/x-ndjson'
-                    )
-                    resp.headers['Cache-Control'] = 'no-cache'
-                    resp.headers['X-Accel-Buffering'] = 'no'
-                    return resp
-
-                response_data = pandapower_electrisim.reactive_power_capability(net, rpc_params)
-
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
+            net, Busbars = network_cache.build_network(in_data, delta=delta, index=index, model=model)
+            response_data = pandapower_electrisim.shortcircuit(net, in_data[x], in_data)
+            
+            return response_data
 
-            if "ShortCircuitPandaPower" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
+        if "ShortCircuitOpenDss" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            frequency = int(in_data[x].get('frequency', 50))
+            fault_type = in_data[x].get('fault', '3ph')
+            export_open_dss_results = in_data[x].get('exportOpenDSSResults', False)
+
+            response_data = opendss_electrisim.shortcircuit(
+                in_data,
+                frequency=frequency,
+                fault_type=fault_type,
+                export_open_dss_results=export_open_dss_results,
+                index=index
+            )
+
+            return response_data
+       
+        if "PowerFlowOpenDss" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            
+            # Extract OpenDSS parameters based on OpenDSS documentation
+            # Reference: https://opendss.epri.com/PowerFlow.html
+            frequency = eval(in_data[x]['frequency'])  # Base frequency (50 or 60 Hz)
+            analysis_type = in_data[x].get('analysisType', 'loadflow')
+            mode = in_data[x].get('mode', 'Snapshot')  # Solution mode (Snapshot, Daily, Dutycycle, Yearly)
+            algorithm = in_data[x].get('algorithm', 'Normal')  # Solution algorithm (Normal, Newton)
+            loadmodel = in_data[x].get('loadmodel', 'Powerflow')  # Load model (Powerflow, Admittance)
+            harmonics = in_data[x].get('harmonics', '3,5,7,11,13')
+            neglect_load_y = bool(in_data[x].get('neglectLoadY', False))
+            max_iterations = int(in_data[x].get('maxIterations', 100))  # Maximum iterations
+            tolerance = float(in_data[x].get('tolerance', 0.0001))  # Convergence tolerance
+            controlmode = in_data[x].get('controlmode', 'Static')  # Control mode (Static, Event, Time)
+            export_commands = in_data[x].get('exportCommands', False)  # Export OpenDSS commands flag
+            
+            # For backwards compatibility, default to standard power flow when analysisType is missing
+            if str(analysis_type).lower() == 'harmonic':
+                response_data = opendss_electrisim.harmonic_analysis(
+                    in_data,
+                    frequency,
+                    mode,
+                    algorithm,
+                    loadmodel,
+                    max_iterations,
+                    tolerance,
+                    controlmode,
+                    harmonics,
+                    neglect_load_y,
+                    export_commands,
+                    index=index
+                )
+            else:
+                response_data = opendss_electrisim.powerflow(
+                    in_data, 
+                    frequency, 
+                    mode,
+                    algorithm, 
+                    loadmodel,
+                    max_iterations, 
+                    tolerance, 
+                    controlmode,
+                    export_commands,
+                    index=index
+                )
+            
+            return response_data
+        
+        if "ContingencyAnalysisPandaPower" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            
+            # Extract contingency analysis parameters
+            contingency_params = {
+                'element_type': in_data[x].get('element_type', 'line'),
+                'voltage_limits': in_data[x].get('voltage_limits', 'true'),
+                'thermal_limits': in_data[x].get('thermal_limits', 'true'),
+                'min_vm_pu': in_data[x].get('min_vm_pu', '0.95'),
+                'max_vm_pu': in_data[x].get('max_vm_pu', '1.05'),
+                'max_loading_percent': in_data[x].get('max_loading_percent', '100'),
+                'screening': in_data[x].get('screening', 'false'),
+                'screening_band_percent': in_data[x].get('screening_band_percent', '20'),
+                'screening_voltage_band_pu': in_data[x].get('screening_voltage_band_pu', '0.02'),
+                'contingency_type': in_data[x].get('contingency_type', 'N-1'),
+                'outage_groups': in_data[x].get('outage_groups', []),
+                'n2_top_k': in_data[x].get('n2_top_k', '30'),
+                'n2_time_budget_s': in_data[x].get('n2_time_budget_s', '120'),
+                '_cancel_token': cancel,
+            }
+            
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, delta=delta, index=index, model=model)
+            
+            # Run contingency analysis
+            if _stream_requested(in_data[x], allow_stream):
+                return _ndjson_study_stream(lambda progress_cb, partial_cb: pandapower_electrisim.contingency_analysis(
+                    net, {**contingency_params, '_progress_callback': progress_cb, '_partial_callback': partial_cb}), cancel)
+            response_data = pandapower_electrisim.contingency_analysis(net, contingency_params)
+            
+            return response_data
+
+        if "ProtectionCoordinationPandaPower" in in_data[x]['typ']:
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            print(f"=== PROTECTION COORDINATION REQUESTED BY USER: {user_email} ===")
+
+            prot_params = {
+                'fault_type': in_data[x].get('fault_type', '3ph'),
+                'case': in_data[x].get('case', 'max'),
+                'fault_location_mode': in_data[x].get('fault_location_mode', 'line'),
+                'fault_bus_id': in_data[x].get('fault_bus_id', ''),
+                'sc_line_id': in_data[x].get('sc_line_id'),
+                'sc_fraction': in_data[x].get('sc_fraction', 0.5),
+                'grading_mode': in_data[x].get('grading_mode', 'auto'),
+                'curve_type': in_data[x].get('curve_type', 'standard_inverse'),
+                'overload_factor': in_data[x].get('overload_factor', 1.25),
+                'ct_current_factor': in_data[x].get('ct_current_factor', 1.2),
+                'safety_factor': in_data[x].get('safety_factor', 1.0),
+                't_diff': in_data[x].get('t_diff', 0.3),
+                't_g': in_data[x].get('t_g', 0.5),
+                't_gg': in_data[x].get('t_gg', 0.07),
+                'tms': in_data[x].get('tms', 1.0),
+                't_grade': in_data[x].get('t_grade', 0.5),
+                'export_results': in_data[x].get('export_results', False),
+                '_cancel_token': cancel,
+            }
 
-                net = pp.create_empty_network()
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                response_data = pandapower_electrisim.shortcircuit(net, in_data[x], in_data)
-                
-                # Check if client accepts gzip compression
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:  # Only compress if > 1KB
-                    # Compress response
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
+            net, Busbars = network_cache.build_network(in_data, delta=delta, index=index, model=model)
 
-            if "ShortCircuitOpenDss" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                frequency = int(in_data[x].get('frequency', 50))
-                fault_type = in_data[x].get('fault', '3ph')
-                export_open_dss_results = in_data[x].get('exportOpenDSSResults', False)
+            if _stream_requested(in_data[x], allow_stream):
+                return _ndjson_study_stream(lambda progress_cb, partial_cb: pandapower_electrisim.protection_coordination(
+                    net, {**prot_params, '_progress_callback': progress_cb, '_partial_callback': partial_cb}, in_data), cancel)
+            response_data = pandapower_electrisim.protection_coordination(net, prot_params, in_data)
 
-                response_data = opendss_electrisim.shortcircuit(
-                    in_data,
-                    frequency=frequency,
-                    fault_type=fault_type,
-                    export_open_dss_results=export_open_dss_results
-                )
+            return response_data
 
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
-           
-            if "PowerFlowOpenDss" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                
-                # Extract OpenDSS parameters based on OpenDSS documentation
-                # Reference: https://opendss.epri.com/PowerFlow.html
-                frequency = eval(in_data[x]['frequency'])  # Base frequency (50 or 60 Hz)
-                analysis_type = in_data[x].get('analysisType', 'loadflow')
-                mode = in_data[x].get('mode', 'Snapshot')  # Solution mode (Snapshot, Daily, Dutycycle, Yearly)
-                algorithm = in_data[x].get('algorithm', 'Normal')  # Solution algorithm (Normal, Newton)
-                loadmodel = in_data[x].get('loadmodel', 'Powerflow')  # Load model (Powerflow, Admittance)
-                harmonics = in_data[x].get('harmonics', '3,5,7,11,13')
-                neglect_load_y = bool(in_data[x].get('neglectLoadY', False))
-                max_iterations = int(in_data[x].get('maxIterations', 100))  # Maximum iterations
-                tolerance = float(in_data[x].get('tolerance', 0.0001))  # Convergence tolerance
-                controlmode = in_data[x].get('controlmode', 'Static')  # Control mode (Static, Event, Time)
-                export_commands = in_data[x].get('exportCommands', False)  # Export OpenDSS commands flag
-                
-                # For backwards compatibility, default to standard power flow when analysisType is missing
-                if str(analysis_type).lower() == 'harmonic':
-                    response_data = opendss_electrisim.harmonic_analysis(
-                        in_data,
-                        frequency,
-                        mode,
-                        algorithm,
-                        loadmodel,
-                        max_iterations,
-                        tolerance,
-                        controlmode,
-                        harmonics,
-                        neglect_load_y,
-                        export_commands
-                    )
-                else:
-                    response_data = opendss_electrisim.powerflow(
-                        in_data, 
-                        frequency, 
-                        mode,
-                        algorithm, 
-                        loadmodel,
-                        max_iterations, 
-                        tolerance, 
-                        controlmode,
-                        export_commands
-                    )
-                
-                # Check if client accepts gzip compression
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:  # Only compress if > 1KB
-                    # Compress response
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
+        if "EconomicAnalysisPandaPower" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            print(f"=== ECONOMIC ANALYSIS REQUESTED BY USER: {user_email} ===")
             
-            if "ContingencyAnalysisPandaPower" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                
-                # Extract contingency analysis parameters
-                contingency_params = {
-                    'element_type': in_data[x].get('element_type', 'line'),
-                    'voltage_limits': in_data[x].get('voltage_limits', 'true'),
-                    'thermal_limits': in_data[x].get('thermal_limits', 'true'),
-                    'min_vm_pu': in_data[x].get('min_vm_pu', '0.95'),
-                    'max_vm_pu': in_data[x].get('max_vm_pu', '1.05'),
-                    'max_loading_percent': in_data[x].get('max_loading_percent', '100'),
-                }
-                
-                # Create network
-                net = pp.create_empty_network()
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                
-                # Run contingency analysis
-                response_data = pandapower_electrisim.contingency_analysis(net, contingency_params)
-                
-                # Check if client accepts gzip compression
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:  # Only compress if > 1KB
-                    # Compress response
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
-
-            if "ProtectionCoordinationPandaPower" in in_data[x]['typ']:
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                print(f"=== PROTECTION COORDINATION REQUESTED BY USER: {user_email} ===")
-
-                prot_params = {
-                    'fault_type': in_data[x].get('fault_type', '3ph'),
-                    'case': in_data[x].get('case', 'max'),
-                    'fault_location_mode': in_data[x].get('fault_location_mode', 'line'),
-                    'fault_bus_id': in_data[x].get('fault_bus_id', ''),
-                    'sc_line_id': in_data[x].get('sc_line_id'),
-                    'sc_fraction': in_data[x].get('sc_fraction', 0.5),
-                    'grading_mode': in_data[x].get('grading_mode', 'auto'),
-                    'curve_type': in_data[x].get('curve_type', 'standard_inverse'),
-                    'overload_factor': in_data[x].get('overload_factor', 1.25),
-                    'ct_current_factor': in_data[x].get('ct_current_factor', 1.2),
-                    'safety_factor': in_data[x].get('safety_factor', 1.0),
-                    't_diff': in_data[x].get('t_diff', 0.3),
-                    't_g': in_data[x].get('t_g', 0.5),
-                    't_gg': in_data[x].get('t_gg', 0.07),
-                    'tms': in_data[x].get('tms', 1.0),
-                    't_grade': in_data[x].get('t_grade', 0.5),
-                    'export_results': in_data[x].get('export_results', False),
-                }
+            # Extract economic analysis parameters
+            economic_params = {
+                'frequency': eval(in_data[x].get('frequency', '50')),
+                'currency': in_data[x].get('currency', 'EUR'),
+                'algorithm': in_data[x].get('algorithm', 'nr'),
+                'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
+                'init': in_data[x].get('init', 'dc'),
+                'use_generation_profile': in_data[x].get('use_generation_profile', False),
+                'time_steps': int(in_data[x].get('time_steps', 24)),
+                'lifetime_years': int(in_data[x].get('lifetime_years', 30)),
+                'calculation_mode': in_data[x].get('calculation_mode', 'full'),
+                'load_profile': in_data[x].get('load_profile', 'constant'),
+                'generation_profile': in_data[x].get('generation_profile', 'constant'),
+                'energy_price_per_mwh': in_data[x].get('energy_price_per_mwh'),
+                'energy_price_currency': in_data[x].get('energy_price_currency', 'EUR'),
+                '_cancel_token': cancel,
+            }
+            
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, economic_params['frequency'], delta=delta, index=index, model=model)
+            
+            # Run economic analysis
+            if _stream_requested(in_data[x], allow_stream):
+                return _ndjson_study_stream(lambda progress_cb, partial_cb: pandapower_electrisim.economic_analysis(
+                    net, in_data, {**economic_params, '_progress_callback': progress_cb, '_partial_callback': partial_cb}), cancel)
+            response = pandapower_electrisim.economic_analysis(net, in_data, economic_params)
+            print(f"=== ECONOMIC ANALYSIS RESPONSE: total_capex={response.get('total_capex')}, total_power_losses_mw={response.get('total_power_losses_mw')}, error={response.get('error')} ===")
+            return response
+            
+        if "ControllerSimulationPandaPower Parameters" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            
+            # Extract controller simulation parameters
+            controller_params = {
+                'voltage_control': in_data[x].get('voltage_control', False),
+                'tap_control': in_data[x].get('tap_control', False),
+                'discrete_tap_control': in_data[x].get('discrete_tap_control', False),
+                'continuous_tap_control': in_data[x].get('continuous_tap_control', False),
+                'frequency': eval(in_data[x].get('frequency', '50')),
+                'algorithm': in_data[x].get('algorithm', 'nr'),
+                'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
+                'init': in_data[x].get('init', 'dc')
+            }
+            
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, controller_params['frequency'], delta=delta, index=index, model=model)
+            
+            # Run controller simulation
+            response = pandapower_electrisim.controller_simulation(net, controller_params)
+            return response
+            
+        if "TimeSeriesSimulationPandaPower Parameters" in in_data[x]['typ']:
+            # Extract user email for logging
+            user_email = in_data[x].get('user_email', 'unknown@user.com')
+            
+            # Extract time series simulation parameters
+            timeseries_params = {
+                'time_steps': int(in_data[x].get('time_steps', 24)),
+                'load_profile': in_data[x].get('load_profile', 'constant'),
+                'generation_profile': in_data[x].get('generation_profile', 'constant'),
+                'profile_mode': in_data[x].get('profile_mode', 'preset'),
+                'element_profiles': in_data[x].get('element_profiles') or {},
+                'frequency': eval(in_data[x].get('frequency', '50')),
+                'algorithm': in_data[x].get('algorithm', 'nr'),
+                'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
+                'init': in_data[x].get('init') or in_data[x].get('initialization') or 'auto',
+                'engine': in_data[x].get('engine', 'loop'),
+                '_cancel_token': cancel,
+            }
+            
+            # Create network
+            net, Busbars = network_cache.build_network(in_data, timeseries_params['frequency'], delta=delta, index=index, model=model)
+            
+            # Run time series simulation
+            if _stream_requested(in_data[x], allow_stream):
+                return _ndjson_study_stream(lambda progress_cb, partial_cb: pandapower_electrisim.time_series_simulation(
+                    net, {**timeseries_params, '_progress_callback': progress_cb, '_partial_callback': partial_cb}), cancel)
+            response = pandapower_electrisim.time_series_simulation(net, timeseries_params)
+            return response
 
-                net = pp.create_empty_network()
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
+    # If no simulation type matches, return error
+    return {'error': 'No valid simulation type found in request data'}
 
-                response_data = pandapower_electrisim.protection_coordination(net, prot_params, in_data)
 
-                accept_encoding = request.headers.get('Accept-Encoding', '')
-                if 'gzip' in accept_encoding and len(response_data) > 1024:
-                    compressed = gzip.compress(response_data.encode('utf-8'))
-                    response = make_response(compressed)
-                    response.headers['Content-Encoding'] = 'gzip'
-                    response.headers['Content-Type'] = 'application/json'
-                    response.headers['Content-Length'] = len(compressed)
-                    return response
-                else:
-                    return response_data
+def _study_cancelled(study_type):
+    # 499 (client closed request) as logged by nginx; nobody reads this response any more
+    print(f"=== STUDY CANCELLED: {study_type} ===")
+    return {'error': 'Study cancelled'}, 499
 
-            if "EconomicAnalysisPandaPower" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                print(f"=== ECONOMIC ANALYSIS REQUESTED BY USER: {user_email} ===")
-                
-                # Extract economic analysis parameters
-                economic_params = {
-                    'frequency': eval(in_data[x].get('frequency', '50')),
-                    'currency': in_data[x].get('currency', 'EUR'),
-                    'algorithm': in_data[x].get('algorithm', 'nr'),
-                    'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
-                    'init': in_data[x].get('init', 'dc'),
-                    'use_generation_profile': in_data[x].get('use_generation_profile', False),
-                    'time_steps': int(in_data[x].get('time_steps', 24)),
-                    'lifetime_years': int(in_data[x].get('lifetime_years', 30)),
-                    'calculation_mode': in_data[x].get('calculation_mode', 'full'),
-                    'load_profile': in_data[x].get('load_profile', 'constant'),
-                    'generation_profile': in_data[x].get('generation_profile', 'constant'),
-                    'energy_price_per_mwh': in_data[x].get('energy_price_per_mwh'),
-                    'energy_price_currency': in_data[x].get('energy_price_currency', 'EUR')
-                }
-                
-                # Create network
-                net = pp.create_empty_network(f_hz=economic_params['frequency'])
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                
-                # Run economic analysis
-                response = pandapower_electrisim.economic_analysis(net, in_data, economic_params)
-                print(f"=== ECONOMIC ANALYSIS RESPONSE: total_capex={response.get('total_capex')}, total_power_losses_mw={response.get('total_power_losses_mw')}, error={response.get('error')} ===")
-                return jsonify(response)
-                
-            if "ControllerSimulationPandaPower Parameters" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                
-                # Extract controller simulation parameters
-                controller_params = {
-                    'voltage_control': in_data[x].get('voltage_control', False),
-                    'tap_control': in_data[x].get('tap_control', False),
-                    'discrete_tap_control': in_data[x].get('discrete_tap_control', False),
-                    'continuous_tap_control': in_data[x].get('continuous_tap_control', False),
-                    'frequency': eval(in_data[x].get('frequency', '50')),
-                    'algorithm': in_data[x].get('algorithm', 'nr'),
-                    'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
-                    'init': in_data[x].get('init', 'dc')
-                }
-                
-                # Create network
-                net = pp.create_empty_network(f_hz=controller_params['frequency'])
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                
-                # Run controller simulation
-                response = pandapower_electrisim.controller_simulation(net, controller_params)
-                return jsonify(response)
-                
-            if "TimeSeriesSimulationPandaPower Parameters" in in_data[x]['typ']:
-                # Extract user email for logging
-                user_email = in_data[x].get('user_email', 'unknown@user.com')
-                
-                # Extract time series simulation parameters
-                timeseries_params = {
-                    'time_steps': int(in_data[x].get('time_steps', 24)),
-                    'load_profile': in_data[x].get('load_profile', 'constant'),
-                    'generation_profile': in_data[x].get('generation_profile', 'constant'),
-                    'profile_mode': in_data[x].get('profile_mode', 'preset'),
-                    'element_profiles': in_data[x].get('element_profiles') or {},
-                    'frequency': eval(in_data[x].get('frequency', '50')),
-                    'algorithm': in_data[x].get('algorithm', 'nr'),
-                    'calculate_voltage_angles': in_data[x].get('calculate_voltage_angles', 'auto'),
-                    'init': in_data[x].get('init') or in_data[x].get('initialization') or 'auto',
-                }
-                
-                # Create network
-                net = pp.create_empty_network(f_hz=timeseries_params['frequency'])
-                Busbars = pandapower_electrisim.create_busbars(in_data, net)
-                pandapower_electrisim.create_other_elements(in_data, net, x, Busbars)
-                
-                # Run time series simulation
-                response = pandapower_electrisim.time_series_simulation(net, timeseries_params)
-                return jsonify(response)
-                 
-        #print(net.bus)
-        #print(net.shunt)
-#print(net.ext_grid)    
-#print(net.line))
-
-# If no simulation type matches, return error
-        return jsonify({'error': 'No valid simulation type found in request data'})
-    
-    except ValueError as ve:
-        # Handle validation errors (like missing bus connections)
-        error_message = str(ve)
-        print(f"Validation Error: {error_message}")
-        return jsonify({'error': error_message}), 400
-    
+
+def _run_study_job(in_data, cancel=None):
+    """Process-pool entry point for /jobs: same dispatch as simulation(), without streaming."""
+    try:
+        result = _run_study(in_data, cancel=cancel)
+    except study_cancellation.StudyCancelled:
+        return _study_cancelled(_study_type(in_data))
     except Exception as e:
-        # Handle other unexpected errors
-        error_message = (
-            f"Server error: {str(e)} "
-            f"- if this problem persists, please contact electrisim@electrisim.com for support."
-        )
-        print(f"Unexpected Error: {error_message}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': error_message}), 500   
+        return _study_error(e)
+    if isinstance(result, Response):
+        result = result.get_data(as_text=True)
+    return result
+
+
+@app.route('/', methods=['GET','POST'])
+@request_profiler.profiled
+def simulation():
+    timer, token = stage_timing.start_request()
+    study_type, size = 'unknown', stage_timing.size_bucket(None)
+    try:
+        #in_data = request.get_json()
+        with stage_timing.stage('parse'):
+            in_data = request.get_json(force=True) #force – if set to True the mimetype is ignored.
+        print(in_data) 
+        with stage_timing.stage('parse'):
+            in_data, delta = network_cache.expand_delta(in_data)
+            # Clients send this hash back as model_delta.base_hash to submit only the edited rows
+            model = network_cache.remember_model(in_data)
+        study_type, size = _study_type(in_data), stage_timing.size_bucket(in_data)
+        # A profiled request runs the whole study inside the view, so it is never streamed
+        allow_stream = not request_profiler.is_profiling()
+        # Tripped when the client disconnects, so an abandoned study stops early
+        cancel = study_cancellation.request_token(request.environ)
+        response = make_response(_study_response(_run_study(in_data, allow_stream=allow_stream, delta=delta, cancel=cancel, model=model)))
+        response.headers['X-Electrisim-Model-Hash'] = model
+    except study_cancellation.StudyCancelled:
+        response = make_response(_study_response(_study_cancelled(study_type)))
+    except Exception as e:
+        response = make_response(_study_response(_study_error(e)))
+    finally:
+        stage_timing.end_request(token)
+    response.headers['Server-Timing'] = timer.server_timing()
+    stage_timing.observe(timer, study_type, size)
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Per-stage request durations and network cache counters of this worker in Prometheus format."""
+    return Response(stage_timing.render_metrics() + network_cache.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a simulation payload (same body as POST /) on the background process pool.
+    Returns 202 with the job status; 429 when the job queue is full.
+    """
+    in_data = request.get_json(force=True)
+    if not isinstance(in_data, dict) or not in_data:
+        return jsonify({'error': 'Empty simulation payload'}), 400
+    try:
+        in_data, _ = network_cache.expand_delta(in_data)
+    except Exception as e:
+        return _study_response(_study_error(e))
+    study_type = _study_type(in_data)
+    try:
+        job = simulation_jobs.submit_job(_run_study_job, in_data, study_type=study_type)
+    except simulation_jobs.JobQueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 429
+        response.headers['Retry-After'] = '5'
+        return response
+    print(f"=== JOB {job['job_id']} QUEUED: {study_type} ===")
+    return jsonify(job), 202
+
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    """Pool size, queue depth limit and job counts per state."""
+    return jsonify(simulation_jobs.stats())
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = simulation_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Study response of a finished job, exactly as POST / would have returned it."""
+    job = simulation_jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    if job['status'] in ('queued', 'running', 'cancelling'):
+        return jsonify(job), 202
+    if job['status'] != 'done':
+        return jsonify({**job, 'error': job.get('error') or f"Job {job['status']}"}), 409
+    return _study_response(simulation_jobs.get_job_result(job_id))
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = simulation_jobs.cancel_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job)
 
 
 def pandapower_net_to_json(net):
@@ -1012,6 +1172,7 @@ def pandapower_net_to_json(net):
 
 
 @app.route('/import-pandapower', methods=['POST'])
+@request_profiler.profiled
 def import_pandapower():
     """
     Accepts a Pandapower .py script, executes it to build `net`,
@@ -1163,6 +1324,7 @@ def _bus_voltages_from_equipment(dss, bus_names):
 
 
 @app.route('/import-opendss', methods=['POST'])
+@request_profiler.profiled
 def import_opendss():
     """
     Accepts an OpenDSS .dss text, builds a model, and returns
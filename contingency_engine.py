@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Outage-case engine for contingency studies.
+
+Instead of deep-copying the whole net for every outage case, each case switches the outaged
+elements out of service in place, solves, and restores the original in_service flags
+afterwards (also when the solve fails). Every case is warm-started from the base-case voltages:
+the base res_* tables are snapshotted once and the ones the 'results' initialisation reads are
+put back before each solve, so a diverged or failed case cannot leak its state into the next one.
+A case that does not converge from the warm start is retried once from pandapower's default
+initialisation before it is reported as non-convergent.
+
+The net belongs to the study for the whole loop; callers read the case results from net.res_*
+right after run_case() returns and call restore_results() when done.
+
+screen_branch_outages() is an optional linear pre-screen for line / transformer outages: from the
+base case it estimates every outage's post-contingency branch loadings with DC line outage
+distribution factors (LODF), so only the cases near a limit need the full AC power flow.
+n2_pairs() picks the N-2 outage pairs worth solving from the N-1 severities.
+
+solve_cases() runs a list of cases either in-process or, for large studies, on a process pool
+created for the study: the base net and its base-case results are pickled once per worker (pool
+initializer), cases are sent in chunks, and results come back in case order.
+
+Configuration (environment variables):
+    ELECTRISIM_CONTINGENCY_WORKERS            pool size for contingency cases (default 1: no pool)
+    ELECTRISIM_CONTINGENCY_PARALLEL_MIN_CASES fewest cases worth starting a pool for (default 32)
+    ELECTRISIM_CONTINGENCY_START_METHOD       multiprocessing start method for the pool (default 'spawn')
+"""
+import contextlib
+import itertools
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+import pandapower as pp
+from pandapower.powerflow import LoadflowNotConverged
+from pandapower.pypower.idx_brch import F_BUS, T_BUS
+from pandapower.pypower.idx_bus import BUS_TYPE, REF
+from pandapower.pypower.makeBdc import makeBdc
+from scipy.sparse.linalg import splu
+
+import stage_timing
+import study_cancellation
+
+CONTINGENCY_WORKERS = max(1, int(os.getenv('ELECTRISIM_CONTINGENCY_WORKERS', 1)))
+PARALLEL_MIN_CASES = max(1, int(os.getenv('ELECTRISIM_CONTINGENCY_PARALLEL_MIN_CASES', 32)))
+POOL_START_METHOD = os.getenv('ELECTRISIM_CONTINGENCY_START_METHOD', 'spawn')
+
+# Chunks per worker: small enough to balance uneven case runtimes, large enough to amortise IPC.
+_CHUNKS_PER_WORKER = 4
+# How often (s) the study checks its cancel token while waiting for a pool chunk
+_CANCEL_POLL_S = 0.25
+
+# Result tables pandapower reads for init='results' (bus voltages, internal voltages of FACTS / VSC).
+_WARM_START_TABLES = ('res_bus', 'res_bus_dc', 'res_svc', 'res_ssc', 'res_tcsc', 'res_vsc')
+
+# Monitored / outaged branch tables for screening: (table, from bus, to bus, base flow result columns).
+_SCREEN_BRANCHES = (
+    ('line', 'from_bus', 'to_bus', ('p_from_mw', 'q_from_mvar', 'p_to_mw', 'q_to_mvar')),
+    ('trafo', 'hv_bus', 'lv_bus', ('p_hv_mw', 'q_hv_mvar', 'p_lv_mw', 'q_lv_mvar')),
+)
+
+# LODF columns are built for this many outages at a time (bounds memory to branches x chunk floats).
+_SCREEN_CHUNK = 256
+
+# |1 - PTDF_kk| below this: the outage splits the network, the linear estimate does not apply.
+_ISLANDING_TOL = 1e-6
+
+
+@contextlib.contextmanager
+def outage(net, elements):
+    """Take elements ((table, index) pairs, e.g. ('line', 12)) out of service for the with-block."""
+    saved = []
+    try:
+        for table, idx in elements:
+            df = net[table]
+            saved.append((df, idx, df.at[idx, 'in_service']))
+            df.at[idx, 'in_service'] = False
+        yield
+    finally:
+        for df, idx, in_service in reversed(saved):
+            df.at[idx, 'in_service'] = in_service
+
+
+def snapshot_results(net):
+    """Copies of the net's res_* tables (taken after the base-case power flow)."""
+    return {key: net[key].copy() for key in net.keys() if key.startswith('res_') and hasattr(net[key], 'copy')}
+
+
+def restore_results(net, snapshot, tables=None):
+    """Put the snapshotted result tables (all, or only those named in tables) back on the net."""
+    for key in (snapshot if tables is None else tables):
+        if key in snapshot:
+            net[key] = snapshot[key].copy()
+
+
+def run_case(net, elements, base_results, **pf_kwargs):
+    """
+    Solve the net with elements out of service, warm-started from base_results. Raises like
+    pp.runpp when the case fails; the in_service flags are restored either way.
+    """
+    restore_results(net, base_results, _WARM_START_TABLES)
+    with outage(net, elements):
+        try:
+            pp.runpp(net, init='results', **pf_kwargs)
+        except LoadflowNotConverged:
+            restore_results(net, base_results, _WARM_START_TABLES)
+            pp.runpp(net, **pf_kwargs)
+
+
+def _branch_ratings_mva(net, table):
+    """Thermal rating in MVA per element, consistent with pandapower's loading_percent."""
+    df = net[table]
+    if table == 'line':
+        vn_kv = net.bus.vn_kv.reindex(df.from_bus).to_numpy(dtype=float)
+        return (np.sqrt(3.0) * df.max_i_ka.to_numpy(dtype=float) * df.df.to_numpy(dtype=float)
+                * df.parallel.to_numpy(dtype=float) * vn_kv)
+    return df.sn_mva.to_numpy(dtype=float) * df.parallel.to_numpy(dtype=float)
+
+
+def screen_branch_outages(net, outages, base_results):
+    """
+    DC-LODF estimate of the worst branch loading after each outage.
+
+    net must hold the converged base-case AC power flow (its internal ppc is reused); outages are
+    (table, index) pairs of lines / trafos; base_results is the snapshot_results() of the base case.
+    Post-outage active flows are the base AC flows plus LODF * the outaged branch's base flow,
+    reactive flows are kept at their base values, and loadings use the base-case bus voltages.
+
+    Returns a list parallel to outages of (estimated max loading %, (table, index) of the most
+    loaded branch) tuples, or None where the case cannot be screened (the outage islands part of
+    the network, or the element is not part of the solved model).
+    """
+    internal = net._ppc['internal']
+    bus, branch, in_model = internal['bus'], internal['branch'], internal['branch_is']
+    n_branch = branch.shape[0]
+    # ppc branch row -> ppci branch row (-1 where out of service / disconnected)
+    ppci_row = np.where(in_model, np.cumsum(in_model) - 1, -1)
+    bus_lookup = net._pd2ppc_lookups['bus']
+    vm_pu = base_results['res_bus'].vm_pu
+
+    # Base flows and ratings per ppci branch (NaN rating: not monitored, e.g. trafo3w branches).
+    p_from, q_from = np.zeros(n_branch), np.zeros(n_branch)
+    p_to, q_to = np.zeros(n_branch), np.zeros(n_branch)
+    vm_from, vm_to = np.ones(n_branch), np.ones(n_branch)
+    rating = np.full(n_branch, np.nan)
+    owner = [None] * n_branch
+    position = {}
+    for table, from_col, to_col, flow_cols in _SCREEN_BRANCHES:
+        lookup = net._pd2ppc_lookups['branch'].get(table)
+        df = net[table]
+        if lookup is None or df.empty:
+            continue
+        rows = ppci_row[lookup[0]:lookup[1]]
+        ok = rows >= 0
+        rows = rows[ok]
+        res = base_results['res_' + table].reindex(df.index)
+        p_from[rows], q_from[rows], p_to[rows], q_to[rows] = (
+            np.nan_to_num(res[col].to_numpy(dtype=float)[ok]) for col in flow_cols)
+        vm_from[rows] = vm_pu.reindex(df[from_col]).to_numpy(dtype=float)[ok]
+        vm_to[rows] = vm_pu.reindex(df[to_col]).to_numpy(dtype=float)[ok]
+        rating[rows] = _branch_ratings_mva(net, table)[ok]
+        for idx, row in zip(df.index[ok], rows):
+            owner[row] = (table, idx)
+            position[(table, idx)] = row
+    monitored = np.isfinite(rating) & (rating > 0)
+    vm_from = np.where(vm_from > 0, vm_from, 1.0)
+    vm_to = np.where(vm_to > 0, vm_to, 1.0)
+
+    # Reduced DC susceptance matrix (reference buses removed), factorised once.
+    Bbus, Bf, _, _, Cft = makeBdc(bus, branch)
+    keep = np.flatnonzero(bus[:, BUS_TYPE] != REF)
+    lu = splu(Bbus[keep][:, keep].tocsc())
+    Bf_keep = Bf[:, keep]
+    Ct_keep = Cft.T.tocsr()[keep]
+
+    estimates = [None] * len(outages)
+    cases = [(i, position.get((table, idx))) for i, (table, idx) in enumerate(outages)]
+    cases = [(i, row) for i, row in cases if row is not None]
+    for start in range(0, len(cases), _SCREEN_CHUNK):
+        chunk = cases[start:start + _SCREEN_CHUNK]
+        rows = np.array([row for _, row in chunk])
+        # PTDF columns for a transfer from -> to across each outaged branch: H = Bf Bbus^-1 Cft^T
+        theta = lu.solve(Ct_keep[:, rows].toarray())
+        H = np.asarray(Bf_keep @ theta)
+        den = 1.0 - H[rows, np.arange(len(rows))]
+        islanding = np.abs(den) < _ISLANDING_TOL
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lodf = H / np.where(islanding, 1.0, den)
+        delta_p = lodf * p_from[rows]
+        s_from = np.hypot(p_from[:, None] + delta_p, q_from[:, None]) / vm_from[:, None]
+        s_to = np.hypot(p_to[:, None] - delta_p, q_to[:, None]) / vm_to[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loading = np.maximum(s_from, s_to) / rating[:, None] * 100.0
+        loading[~monitored] = -np.inf
+        loading[rows, np.arange(len(rows))] = -np.inf  # the outaged branch carries nothing
+        worst = np.argmax(loading, axis=0)
+        for col, (i, _) in enumerate(chunk):
+            if islanding[col]:
+                continue
+            value = loading[worst[col], col]
+            estimates[i] = (float(value), owner[worst[col]]) if np.isfinite(value) else (0.0, None)
+    return estimates
+
+
+def n2_pairs(severities, top_k):
+    """
+    N-2 pruning: positions of the top_k most severe N-1 cases (severity None: excluded), paired
+    with each other and ordered by combined severity, most severe pair first.
+    """
+    ranked = sorted((i for i, value in enumerate(severities) if value is not None),
+                    key=lambda i: severities[i], reverse=True)[:max(0, int(top_k))]
+    pairs = list(itertools.combinations(sorted(ranked), 2))
+    pairs.sort(key=lambda pair: severities[pair[0]] + severities[pair[1]], reverse=True)
+    return pairs
+
+
+_worker_state = None
+
+
+def _init_worker(net, base_results, evaluate, args):
+    """Pool initializer: keep this worker's copy of the base net for all chunks it solves."""
+    global _worker_state
+    _worker_state = (net, base_results, evaluate, args)
+
+
+def _solve_chunk(cases):
+    net, base_results, evaluate, args = _worker_state
+    return [evaluate(net, case, base_results, *args) for case in cases]
+
+
+def solve_cases(net, cases, base_results, evaluate, on_result, args=(), deadline=None, workers=None, cancel=None):
+    """
+    evaluate(net, case, base_results, *args) for every case; on_result(case, result) receives the
+    results in case order as they become available. evaluate must be a module-level function (it
+    is pickled by reference for the pool) and leave the net as it found it, like run_case() does.
+
+    With more than one worker and at least ELECTRISIM_CONTINGENCY_PARALLEL_MIN_CASES cases the
+    cases are solved on a process pool. When deadline (a time.perf_counter() value) passes, no
+    further cases / chunks are started; the cases solved so far are always a prefix of cases.
+    A tripped cancel token (study_cancellation) raises StudyCancelled between cases; the pool
+    processes are terminated then instead of finishing their chunks.
+    Returns the number of cases solved.
+    """
+    workers = min(CONTINGENCY_WORKERS if workers is None else max(1, int(workers)), len(cases))
+    if workers <= 1 or len(cases) < PARALLEL_MIN_CASES:
+        solved = 0
+        for case in cases:
+            study_cancellation.check(cancel)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            on_result(case, evaluate(net, case, base_results, *args))
+            solved += 1
+        return solved
+
+    chunk_size = max(1, math.ceil(len(cases) / (workers * _CHUNKS_PER_WORKER)))
+    chunks = [cases[i:i + chunk_size] for i in range(0, len(cases), chunk_size)]
+    solved = 0
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                               initializer=_init_worker, initargs=(net, base_results, evaluate, args))
+    with stage_timing.stage('solve'), pool as executor:
+        futures = [executor.submit(_solve_chunk, chunk) for chunk in chunks]
+        try:
+            for number, future in enumerate(futures):
+                if deadline is not None and time.perf_counter() > deadline:
+                    # Chunks already running still finish; only those not yet started are dropped.
+                    for pending in futures[number:]:
+                        pending.cancel()
+                if future.cancelled():
+                    break
+                while not wait([future], timeout=_CANCEL_POLL_S).done:
+                    study_cancellation.check(cancel)
+                for case, result in zip(chunks[number], future.result()):
+                    on_result(case, result)
+                    solved += 1
+        except study_cancellation.StudyCancelled:
+            # Before leaving the with-block, whose shutdown would wait for the running chunks
+            terminate_pool(executor)
+            raise
+    return solved
+
+
+def terminate_pool(pool):
+    """Stop a study pool at once: drop queued chunks and kill the workers still solving theirs."""
+    # ProcessPoolExecutor has no public way to stop running tasks (and shutdown() forgets its processes)
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+Per-process cache of pandapower networks built from Electrisim diagram payloads.
+
+Building a net with create_busbars + create_other_elements is often a large share of the
+latency of a load flow, yet users frequently re-run a different study on an unchanged
+diagram. Networks are cached under a content hash of the element rows (the study-parameter
+row is excluded), so any study on the same diagram reuses the built model.
+
+Cached nets are never handed out directly: every caller gets its own deep copy, so studies
+may mutate their net freely.
+
+Diagram deltas: instead of the full diagram the client may send the study row plus
+    "model_delta": {"base_hash": "<X-Electrisim-Model-Hash of an earlier run>",
+                    "changed": {key: row, ...}, "added": {key: row, ...}, "removed": [key, ...]}
+expand_delta() rebuilds the full payload from the remembered base rows, and build_network()
+patches a copy of the cached base net row by row instead of rebuilding it. Edits that touch
+buses, switches, controllers or Q capability curves fall back to a full build.
+
+Configuration (environment variables):
+    ELECTRISIM_NET_CACHE_SIZE       number of built networks kept per worker process (default 8, 0 disables)
+    ELECTRISIM_MODEL_HISTORY_SIZE   number of diagrams remembered as delta bases (default 32)
+"""
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+import pandapower_electrisim
+import payload_index
+import stage_timing
+from payload_index import is_study_row
+
+
+NET_CACHE_SIZE = max(0, int(os.getenv('ELECTRISIM_NET_CACHE_SIZE', 8)))
+MODEL_HISTORY_SIZE = max(1, int(os.getenv('ELECTRISIM_MODEL_HISTORY_SIZE', 32)))
+
+_cache = OrderedDict()  # (model hash, f_hz) -> (net, Busbars)
+_models = OrderedDict()  # model hash -> list of (key, row) element rows, for delta expansion
+_empty_templates = {}  # f_hz -> empty pandapower net
+_lock = threading.Lock()
+_counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'patched': 0}
+
+# Tables whose rows are created one per diagram element, without cross references that a
+# row-level patch could invalidate. Removal is limited to injections (no switch/controller
+# refers to their index).
+_PATCHABLE_TABLES = (
+    'line', 'trafo', 'trafo3w', 'impedance', 'tcsc',
+    'load', 'sgen', 'gen', 'ext_grid', 'shunt', 'storage', 'asymmetric_load', 'asymmetric_sgen',
+    'ward', 'xward', 'motor', 'svc', 'ssc',
+)
+_REMOVABLE_TABLES = _PATCHABLE_TABLES[5:]
+
+# Side lists create_other_elements keeps on the net, and the table whose indices they hold.
+_SIDE_LISTS = {
+    'trafo_discrete_tap_controllers': ('trafo',),
+    'trafo3w_discrete_tap_controllers': ('trafo3w',),
+    'shunt_discrete_controllers': ('shunt',),
+    'line_flow_shunt_controllers': ('shunt',),
+    'warnings': ('ext_grid', 'gen'),
+}
+
+
+class UnknownBaseModel(Exception):
+    """Raised when a diagram delta refers to a base model this worker does not remember."""
+
+
+def element_items(in_data):
+    """(key, row) pairs of diagram elements in payload order (payload order fixes pandapower indices)."""
+    return [(k, row) for k, row in in_data.items() if not is_study_row(row)]
+
+
+def _hash_items(items):
+    h = hashlib.sha256()
+    for key, row in items:
+        h.update(b'\x00')
+        h.update(json.dumps([key, row], sort_keys=True, separators=(',', ':'), default=str).encode())
+    return h.hexdigest()
+
+
+def model_hash(in_data):
+    """Canonical content hash of the element rows of in_data (sent to clients as the delta base)."""
+    return _hash_items(element_items(in_data))
+
+
+def remember_model(in_data):
+    """Keep the element rows of in_data as a possible delta base; returns its model hash."""
+    items = element_items(in_data)
+    key = _hash_items(items)
+    with _lock:
+        _models[key] = items
+        _models.move_to_end(key)
+        while len(_models) > MODEL_HISTORY_SIZE:
+            _models.popitem(last=False)
+    return key
+
+
+def expand_delta(in_data):
+    """
+    Resolve a "model_delta" payload into the full diagram payload.
+
+    Returns (in_data, delta). Payloads without a delta are returned unchanged with delta None.
+    Raises UnknownBaseModel if the base hash is not remembered and ValueError for malformed deltas.
+    """
+    if not isinstance(in_data, dict) or 'model_delta' not in in_data:
+        return in_data, None
+    delta = in_data['model_delta']
+    if not isinstance(delta, dict) or not delta.get('base_hash'):
+        raise ValueError("model_delta must be an object with a 'base_hash'")
+    changed = delta.get('changed') or {}
+    added = delta.get('added') or {}
+    removed = delta.get('removed') or []
+    if not isinstance(changed, dict) or not isinstance(added, dict) or not isinstance(removed, list):
+        raise ValueError("model_delta: 'changed' and 'added' must be objects and 'removed' a list")
+
+    with _lock:
+        base_items = _models.get(delta['base_hash'])
+        if base_items is not None:
+            _models.move_to_end(delta['base_hash'])
+    if base_items is None:
+        raise UnknownBaseModel(
+            f"Unknown base model {delta['base_hash']!r}; please send the full diagram."
+        )
+
+    base_keys = set(k for k, _ in base_items)
+    for key in list(changed) + [str(k) for k in removed]:
+        if key not in base_keys:
+            raise ValueError(f"model_delta refers to element {key!r} which is not in the base model")
+    for key in added:
+        if key in base_keys or key in in_data:
+            raise ValueError(f"model_delta adds element {key!r} which already exists")
+
+    removed = set(str(k) for k in removed)
+    full = {}
+    for key, row in base_items:
+        if key in removed:
+            continue
+        full[key] = changed.get(key, row)
+    full.update(added)
+    for key, row in in_data.items():
+        if key != 'model_delta':
+            full[key] = row
+    return full, {
+        'base_hash': delta['base_hash'],
+        'base_rows': dict(base_items),
+        'changed': changed,
+        'added': added,
+        'removed': removed,
+    }
+
+
+def _empty_network(f_hz):
+    """Copy of an empty net (pp.create_empty_network itself takes a few hundred ms)."""
+    with _lock:
+        template = _empty_templates.get(float(f_hz))
+    if template is None:
+        template = pp.create_empty_network(f_hz=f_hz)
+        with _lock:
+            _empty_templates[float(f_hz)] = template
+    net = copy.deepcopy(template)
+    net.f_hz = f_hz
+    return net
+
+
+def _build(in_data, f_hz, index=None):
+    net = _empty_network(f_hz)
+    index = payload_index.index_payload(in_data, index)
+    Busbars = pandapower_electrisim.create_busbars(in_data, net, index=index)
+    pandapower_electrisim.create_other_elements(in_data, net, None, Busbars, index=index)
+    return net, Busbars
+
+
+def _table_of(net, cell_id):
+    """(table, index) of the patchable element whose 'id' is cell_id, or None if not exactly one."""
+    found = None
+    for table in _PATCHABLE_TABLES:
+        df = net[table]
+        if df.empty or 'id' not in df.columns:
+            continue
+        idx = df.index[df['id'] == cell_id]
+        if len(idx) > 1 or (len(idx) == 1 and found is not None):
+            return None
+        if len(idx) == 1:
+            found = (table, idx[0])
+    return found
+
+
+def _side_lists_touch(net, table):
+    for attr, tables in _SIDE_LISTS.items():
+        if table in tables and getattr(net, attr, None):
+            return True
+    return False
+
+
+def _build_single(net, Busbars, key, row):
+    """
+    Build one element row into a scratch net sharing the buses of net. Returns
+    (table, row_df, user_friendly_names) when the row produced exactly one patchable element
+    and nothing else, otherwise None.
+    """
+    scratch = _empty_network(net.f_hz)
+    scratch.bus = net.bus.copy()
+    if 'bus_dc' in net and not net.bus_dc.empty:
+        scratch.bus_dc = net.bus_dc.copy()
+    pandapower_electrisim.create_other_elements({key: row}, scratch, None, dict(Busbars))
+
+    if any(hasattr(scratch, attr) for attr in _SIDE_LISTS):
+        return None
+    if 'q_capability_curve_table' in scratch and len(scratch.q_capability_curve_table):
+        return None
+    produced = []
+    for table, df in scratch.items():
+        if not isinstance(df, pd.DataFrame) or table in ('bus', 'bus_dc') or table.startswith('res_'):
+            continue
+        if len(df):
+            produced.append(table)
+    if len(produced) != 1 or produced[0] not in _PATCHABLE_TABLES or len(scratch[produced[0]]) != 1:
+        return None
+    return produced[0], scratch[produced[0]], getattr(scratch, 'user_friendly_names', {})
+
+
+def _patch(net, Busbars, delta):
+    """
+    Apply a diagram delta to net in place. Returns False (net possibly half patched) when the
+    delta needs a full rebuild.
+    """
+    if 'q_capability_curve_table' in net and len(net.q_capability_curve_table):
+        return False
+    if not net.controller.empty:
+        return False
+    base_rows = delta['base_rows']
+    names = getattr(net, 'user_friendly_names', None)
+    if names is None:
+        return False
+
+    for key in delta['removed']:
+        old = base_rows[key]
+        loc = _table_of(net, old.get('id'))
+        if loc is None or loc[0] not in _REMOVABLE_TABLES or _side_lists_touch(net, loc[0]):
+            return False
+        table, idx = loc
+        df = net[table]
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            return False
+        net[table] = df.drop(index=idx).reset_index(drop=True)
+        names.pop(old.get('name'), None)
+
+    for key, row in delta['changed'].items():
+        old = base_rows[key]
+        if not isinstance(row, dict) or row.get('typ') != old.get('typ') or row.get('id') != old.get('id') \
+                or row.get('name') != old.get('name'):
+            return False
+        loc = _table_of(net, old.get('id'))
+        if loc is None or _side_lists_touch(net, loc[0]):
+            return False
+        built = _build_single(net, Busbars, key, row)
+        if built is None or built[0] != loc[0]:
+            return False
+        table, idx = loc
+        new_row = built[1].iloc[0]
+        df = net[table]
+        for col in built[1].columns:
+            if col not in df.columns:
+                df[col] = np.nan
+        for col in df.columns:
+            value = new_row[col] if col in built[1].columns else np.nan
+            df.at[idx, col] = value
+        names.update(built[2])
+
+    for key, row in delta['added'].items():
+        if not isinstance(row, dict):
+            return False
+        built = _build_single(net, Busbars, key, row)
+        if built is None or _side_lists_touch(net, built[0]):
+            return False
+        table = built[0]
+        df = net[table]
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            return False
+        new_rows = built[1].copy()
+        new_rows.index = pd.RangeIndex(len(df), len(df) + 1)
+        net[table] = new_rows if df.empty else pd.concat([df, new_rows])
+        names.update(built[2])
+    return True
+
+
+def _patched_from_base(delta, f_hz):
+    """Patched copy of the cached base net for delta, or None if it is not cached or not patchable."""
+    with _lock:
+        entry = _cache.get((delta['base_hash'], float(f_hz)))
+    if entry is None:
+        return None
+    net, Busbars = copy.deepcopy(entry[0]), dict(entry[1])
+    net.f_hz = f_hz
+    try:
+        ok = _patch(net, Busbars, delta)
+    except Exception as e:
+        print(f"Network patch failed, rebuilding: {e}")
+        ok = False
+    return (net, Busbars) if ok else None
+
+
+def build_network(in_data, f_hz=50.0, delta=None, index=None, model=None):
+    """
+    Return (net, Busbars) for the diagram in in_data, reusing a cached build when the element
+    rows are unchanged and patching the cached base net when a diagram delta (see
+    expand_delta) allows it. index: PayloadIndex of in_data if the caller already built one;
+    model: remember_model(in_data) if the caller already called it.
+    The returned net is a private copy owned by the caller.
+    """
+    with stage_timing.stage('build'):
+        return _cached_build(in_data, f_hz, delta, index, model)
+
+
+def _cached_build(in_data, f_hz, delta, index, model):
+    if NET_CACHE_SIZE == 0:
+        return _build(in_data, f_hz, index)
+
+    if model is None:
+        model = remember_model(in_data)
+    key = (model, float(f_hz))
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+            _counters['hits'] += 1
+    if entry is not None:
+        print(f"Network cache hit ({model[:12]})")
+        net = copy.deepcopy(entry[0])
+        net.f_hz = f_hz
+        return net, dict(entry[1])
+
+    built = _patched_from_base(delta, f_hz) if delta is not None else None
+    if built is not None:
+        print(f"Network patched from {delta['base_hash'][:12]} to {model[:12]}")
+        net, Busbars = built
+    else:
+        net, Busbars = _build(in_data, f_hz, index)
+    with _lock:
+        if built is not None:
+            _counters['patched'] += 1
+        else:
+            _counters['misses'] += 1
+        _cache[key] = (copy.deepcopy(net), dict(Busbars))
+        _cache.move_to_end(key)
+        while len(_cache) > NET_CACHE_SIZE:
+            _cache.popitem(last=False)
+            _counters['evictions'] += 1
+    return net, Busbars
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+        _models.clear()
+
+
+def stats():
+    """Hit/miss/eviction counters and current occupancy of this process' cache."""
+    with _lock:
+        return {
+            'size': len(_cache),
+            'capacity': NET_CACHE_SIZE,
+            **_counters,
+        }
+
+
+_METRICS = (
+    # (stats key, metric name, type, help)
+    ('hits', 'electrisim_net_cache_hits_total', 'counter', 'Builds served from the network cache.'),
+    ('patched', 'electrisim_net_cache_patched_total', 'counter', 'Builds patched from a cached base net by a diagram delta.'),
+    ('misses', 'electrisim_net_cache_misses_total', 'counter', 'Full network builds.'),
+    ('evictions', 'electrisim_net_cache_evictions_total', 'counter', 'Networks evicted from the cache.'),
+    ('size', 'electrisim_net_cache_size', 'gauge', 'Networks currently cached.'),
+    ('capacity', 'electrisim_net_cache_capacity', 'gauge', 'ELECTRISIM_NET_CACHE_SIZE of this worker.'),
+)
+
+
+def render_metrics():
+    """stats() in the Prometheus text exposition format."""
+    values = stats()
+    lines = []
+    for key, name, kind, help_text in _METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {values[key]}')
+    return '\n'.join(lines) + '\n'
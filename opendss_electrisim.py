@@ -4,6 +4,10 @@ import math
 import json
 import re
 
+import payload_index
+import result_json
+import stage_timing
+
 # Output classes for OpenDSS results (similar to pandapower_electrisim.py structure)
 class BusbarOut(object):
     def __init__(self, name: str, id: str, vm_pu: float, va_degree: float,
@@ -202,8 +206,8 @@ def _sanitize_opendss_name(name):
         return name
     return name.replace(' ', '_')
 
-def _collect_voltage_bases_from_in_data(in_data, BusbarsDictVoltage):
-    """Build OpenDSS voltagebases list from buses and equipment rated voltages."""
+def _collect_voltage_bases_from_in_data(index, BusbarsDictVoltage):
+    """Build OpenDSS voltagebases list from buses and equipment rated voltages (index: PayloadIndex of in_data)."""
     levels = set()
     for v in (BusbarsDictVoltage or {}).values():
         try:
@@ -212,37 +216,24 @@ def _collect_voltage_bases_from_in_data(in_data, BusbarsDictVoltage):
                 levels.add(fv)
         except (TypeError, ValueError):
             pass
-    for elem in in_data.values():
-        typ = elem.get('typ', '')
+    for x in index.keys():
         for key in ('vn_kv', 'vn_hv_kv', 'vn_lv_kv', 'vn_mv_kv', 'kV', 'kv'):
-            raw = elem.get(key)
-            if raw in (None, '', '0'):
-                continue
-            try:
-                fv = float(raw)
-                if fv > 0:
-                    levels.add(fv)
-            except (TypeError, ValueError):
-                pass
+            fv = index.number(x, key)
+            if fv is not None and fv > 0:
+                levels.add(fv)
     return sorted(levels, reverse=True)
 
-def _resolve_external_grid_basekv(in_data, bus_basekv):
+def _resolve_external_grid_basekv(index, bus_basekv):
     """Use transformer HV rating when slack bus vn_kv was imported at LV level."""
     try:
         bus_kv = float(bus_basekv)
     except (TypeError, ValueError):
         bus_kv = 110.0
     hv_levels = []
-    for elem in in_data.values():
-        typ = elem.get('typ', '')
-        if not (typ.startswith('Transformer') or typ.startswith('Two Winding')):
-            continue
-        try:
-            hv = float(elem.get('vn_hv_kv') or 0)
-            if hv > 0:
-                hv_levels.append(hv)
-        except (TypeError, ValueError):
-            pass
+    for x in index.keys('trafo'):
+        hv = index.number(x, 'vn_hv_kv', 0)
+        if hv > 0:
+            hv_levels.append(hv)
     if hv_levels and bus_kv < max(hv_levels):
         return max(hv_levels)
     return bus_kv
@@ -304,11 +295,9 @@ def _ext_grid_vsource_impedance(element_data, bus_voltage_ll):
     return 'mvasc3', '', s_sc_max
 
 
-def _prescan_external_grid(in_data):
-    """Read first External Grid element for New Circuit / Vsource.source setup."""
-    for _elem in in_data.values():
-        if not _elem.get('typ', '').startswith('External Grid'):
-            continue
+def _prescan_external_grid(index):
+    """Read first External Grid element for New Circuit / Vsource.source setup (index: PayloadIndex of in_data)."""
+    for _ekey, _elem in index.rows('ext_grid'):
         bus_ref = _elem.get('bus', '')
         ext_bus = _sanitize_opendss_name(bus_ref)
         try:
@@ -322,9 +311,9 @@ def _prescan_external_grid(in_data):
         if ext_pu == 0:
             ext_pu = 1.0
         ext_basekv = None
-        for _belem in in_data.values():
-            if 'Bus' in _belem.get('typ', '') and _sanitize_opendss_name(_belem.get('name', '')) == ext_bus:
-                ext_basekv = _resolve_external_grid_basekv(in_data, _belem.get('vn_kv', 110))
+        for _bkey, _belem in index.rows(*payload_index.BUS_KINDS):
+            if _sanitize_opendss_name(_belem.get('name', '')) == ext_bus:
+                ext_basekv = _resolve_external_grid_basekv(index, _belem.get('vn_kv', 110))
                 break
         if ext_basekv is None:
             ext_basekv = 110.0
@@ -372,7 +361,7 @@ def _bus_vm_pu_from_opendss(V1_mag_ll_kv, BusbarsDictVoltage, matched_bus_id):
     return 1.0
 
 
-def _apply_equipment_bus_voltages(in_data, BusbarsDictVoltage, BusbarsDictConnectionToName):
+def _apply_equipment_bus_voltages(index, BusbarsDictVoltage, BusbarsDictConnectionToName):
     """Override bus vn_kv using transformer LV rating, PV kV, and external grid context."""
     def bus_key(ref):
         if not ref:
@@ -380,33 +369,28 @@ def _apply_equipment_bus_voltages(in_data, BusbarsDictVoltage, BusbarsDictConnec
         name = _sanitize_opendss_name(ref)
         return BusbarsDictConnectionToName.get(name, name)
 
-    for elem in in_data.values():
-        typ = elem.get('typ', '')
-        if typ.startswith('Transformer') or typ.startswith('Two Winding'):
+    for x, elem in index.rows('trafo', 'pvsystem', 'ext_grid'):
+        kind = index.kind(x)
+        if kind == 'trafo':
             bt = bus_key(elem.get('busTo') or elem.get('lv_bus'))
-            try:
-                vn_lv = float(elem.get('vn_lv_kv') or 0)
-            except (TypeError, ValueError):
-                continue
+            vn_lv = index.number(x, 'vn_lv_kv', 0)
             # HV bus keeps network vn_kv (e.g. 10.6 kV); vn_hv_kv is transformer nameplate only
             if vn_lv > 0 and bt in BusbarsDictVoltage:
                 BusbarsDictVoltage[bt] = vn_lv
-        elif typ.startswith('PVSystem'):
+        elif kind == 'pvsystem':
             b = bus_key(elem.get('bus'))
-            try:
-                kv = float(elem.get('kv') or elem.get('kV') or 0)
-            except (TypeError, ValueError):
-                kv = 0
+            kv = index.number(x, 'kv' if elem.get('kv') else 'kV', 0)
             if kv > 0 and b in BusbarsDictVoltage:
                 BusbarsDictVoltage[b] = kv
-        elif typ.startswith('External Grid'):
+        else:
             b = bus_key(elem.get('bus'))
             if b in BusbarsDictVoltage:
                 BusbarsDictVoltage[b] = _resolve_external_grid_basekv(
-                    in_data, BusbarsDictVoltage[b])
+                    index, BusbarsDictVoltage[b])
 
-def create_busbars(in_data, dss, export_commands=False, opendss_commands=None):
+def create_busbars(in_data, dss, export_commands=False, opendss_commands=None, index=None):
     """Create busbars in OpenDSS circuit - Let OpenDSS handle bus creation automatically  when elements are connected"""
+    index = payload_index.index_payload(in_data, index)
     BusbarsDictVoltage = {}  
     BusbarsDictConnectionToName = {}
     if opendss_commands is None:
@@ -415,70 +399,68 @@ def create_busbars(in_data, dss, export_commands=False, opendss_commands=None):
     
         # Collect bus information from input data for reference
     bus_elements = {}
-    for x in in_data:         
-        if "Bus" in in_data[x]['typ']:
-            bus_name_raw = in_data[x]['name']
-            bus_name = _sanitize_opendss_name(bus_name_raw)
-            bus_id = in_data[x].get('id', bus_name_raw)  # Get ID for error messages
-            bus_voltage_raw = in_data[x].get('vn_kv', None)
-            
-            # Validate bus voltage
-            if bus_voltage_raw is None:
-                error_msg = (
-                    f"Bus '{bus_name_raw}' (ID: {bus_id}) is missing the 'vn_kv' (nominal voltage) attribute.\n\n"
-                    f"Please set the nominal voltage in kV for this bus element.\n"
-                    f"Common values: 110, 30, 20, 10, etc."
-                )
-                raise ValueError(error_msg)
-            
-            # Convert to float and validate it's a positive number
-            try:
-                bus_voltage = float(bus_voltage_raw)
-            except (ValueError, TypeError):
-                error_msg = (
-                    f"Bus '{bus_name_raw}' (ID: {bus_id}) has an invalid 'vn_kv' value: '{bus_voltage_raw}'.\n\n"
-                    f"The voltage must be a positive number in kV.\n"
-                    f"Common values: 110, 30, 20, 10, etc."
-                )
-                raise ValueError(error_msg)
-            
-            # Check if voltage is zero or negative
-            if bus_voltage <= 0:
-                error_msg = (
-                    f"Bus '{bus_name_raw}' (ID: {bus_id}) has an invalid voltage: {bus_voltage} kV.\n\n"
-                    f"The nominal voltage must be a positive number greater than 0.\n"
-                    f"Common values: 110, 30, 20, 10, etc.\n\n"
-                    f"Please correct the 'vn_kv' attribute for this bus element."
-                )
-                raise ValueError(error_msg)
-            
-            bus_elements[bus_name] = bus_name
-            BusbarsDictVoltage[bus_name] = bus_voltage
+    for x in index.keys(*payload_index.BUS_KINDS):
+        bus_name_raw = in_data[x]['name']
+        bus_name = _sanitize_opendss_name(bus_name_raw)
+        bus_id = in_data[x].get('id', bus_name_raw)  # Get ID for error messages
+        bus_voltage_raw = in_data[x].get('vn_kv', None)
+        
+        # Validate bus voltage
+        if bus_voltage_raw is None:
+            error_msg = (
+                f"Bus '{bus_name_raw}' (ID: {bus_id}) is missing the 'vn_kv' (nominal voltage) attribute.\n\n"
+                f"Please set the nominal voltage in kV for this bus element.\n"
+                f"Common values: 110, 30, 20, 10, etc."
+            )
+            raise ValueError(error_msg)
+        
+        # Convert to float and validate it's a positive number
+        bus_voltage = index.number(x, 'vn_kv')
+        if bus_voltage is None:
+            error_msg = (
+                f"Bus '{bus_name_raw}' (ID: {bus_id}) has an invalid 'vn_kv' value: '{bus_voltage_raw}'.\n\n"
+                f"The voltage must be a positive number in kV.\n"
+                f"Common values: 110, 30, 20, 10, etc."
+            )
+            raise ValueError(error_msg)
+        
+        # Check if voltage is zero or negative
+        if bus_voltage <= 0:
+            error_msg = (
+                f"Bus '{bus_name_raw}' (ID: {bus_id}) has an invalid voltage: {bus_voltage} kV.\n\n"
+                f"The nominal voltage must be a positive number greater than 0.\n"
+                f"Common values: 110, 30, 20, 10, etc.\n\n"
+                f"Please correct the 'vn_kv' attribute for this bus element."
+            )
+            raise ValueError(error_msg)
+        
+        bus_elements[bus_name] = bus_name
+        BusbarsDictVoltage[bus_name] = bus_voltage
     
     # Map both bus name and bus id (cell id) to the sanitized bus name for OpenDSS.
     # This ensures that any reference (original name with spaces, sanitized name,
     # cell id with # or _) resolves to the same space-free OpenDSS bus name.
     for bus_name in bus_elements.keys():
         BusbarsDictConnectionToName[bus_name] = bus_name
-    for x in in_data:
-        if "Bus" in in_data[x].get('typ', ''):
-            bus_name_raw = in_data[x].get('name', '')
-            bus_name = _sanitize_opendss_name(bus_name_raw)
-            bus_id = in_data[x].get('id', '')
-            # Map original name (with spaces) to sanitized name
-            if bus_name_raw and bus_name_raw != bus_name:
-                BusbarsDictConnectionToName[bus_name_raw] = bus_name
-            if bus_name and bus_id and bus_id != bus_name:
-                BusbarsDictConnectionToName[bus_id] = bus_name
-                BusbarsDictConnectionToName[bus_id.replace('#', '_')] = bus_name
-                BusbarsDictConnectionToName[bus_id.replace('_', '#')] = bus_name  
-
-    _apply_equipment_bus_voltages(in_data, BusbarsDictVoltage, BusbarsDictConnectionToName)
+    for x in index.keys(*payload_index.BUS_KINDS):
+        bus_name_raw = in_data[x].get('name', '')
+        bus_name = _sanitize_opendss_name(bus_name_raw)
+        bus_id = in_data[x].get('id', '')
+        # Map original name (with spaces) to sanitized name
+        if bus_name_raw and bus_name_raw != bus_name:
+            BusbarsDictConnectionToName[bus_name_raw] = bus_name
+        if bus_name and bus_id and bus_id != bus_name:
+            BusbarsDictConnectionToName[bus_id] = bus_name
+            BusbarsDictConnectionToName[bus_id.replace('#', '_')] = bus_name
+            BusbarsDictConnectionToName[bus_id.replace('_', '#')] = bus_name  
+
+    _apply_equipment_bus_voltages(index, BusbarsDictVoltage, BusbarsDictConnectionToName)
     
     return BusbarsDictVoltage, BusbarsDictConnectionToName
 
-def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName, export_commands=False, opendss_commands=None, execute_dss_command=None):
+def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName, export_commands=False, opendss_commands=None, execute_dss_command=None, index=None):
     """Create other elements in OpenDSS circuit"""
+    index = payload_index.index_payload(in_data, index)
     if opendss_commands is None:
         opendss_commands = []
     
@@ -519,16 +501,11 @@ def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectio
 
     
     # First pass: create External Grid (Vsource) so the slack bus and base voltage are defined before other elements
-    for x in in_data:
+    for x in index.keys('ext_grid'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if "Bus" in element_type or element_type == "PowerFlowOpenDss Parameters":
-                continue
-            if not element_type.startswith("External Grid"):
-                continue
             if 'bus' not in element_data or element_data['bus'] not in BusbarsDictConnectionToName:
                 continue
             create_external_grid_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, created_elements, execute_dss_command)
@@ -547,59 +524,53 @@ def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectio
             break
 
     # Second pass: create Lines and Impedances (establish bus connectivity at same voltage level)
-    for x in in_data:
+    for x in index.keys('line', 'dc_line', 'impedance'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if "Line" in element_type:
-                create_line_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, LinesDict, LinesDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Impedance"):
+            if index.kind(x) == 'impedance':
                 create_impedance_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, LinesDict, LinesDictId, created_elements, execute_dss_command)
+            else:
+                create_line_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, LinesDict, LinesDictId, created_elements, execute_dss_command)
         except ValueError as ve:
             raise
         except Exception as e:
             continue
 
     # Third pass: create 2-winding Transformers (exclude Three Winding Transformer)
-    for x in in_data:
+    for x in index.keys('trafo'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if (element_type.startswith("Transformer") or element_type.startswith("Two Winding Transformer")) and not element_type.startswith("Three Winding Transformer"):
-                create_transformer_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, TransformersDict, TransformersDictId, created_elements, execute_dss_command)
+            create_transformer_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, TransformersDict, TransformersDictId, created_elements, execute_dss_command)
         except ValueError as ve:
             raise
         except Exception as e:
             continue
 
     # Third-b pass: create 3-winding Transformers
-    for x in in_data:
+    for x in index.keys('trafo3w'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if element_type.startswith("Three Winding Transformer"):
-                create_transformer3w_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, Transformers3WDict, Transformers3WDictId, created_elements, execute_dss_command)
+            create_transformer3w_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, Transformers3WDict, Transformers3WDictId, created_elements, execute_dss_command)
         except ValueError as ve:
             raise
         except Exception as e:
             continue
 
     # Fourth pass: create Shunt elements (Reactors, Capacitors) - constant impedance elements
-    for x in in_data:
+    for x in index.keys('shunt_reactor', 'capacitor'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if element_type.startswith("Shunt Reactor"):
+            if index.kind(x) == 'shunt_reactor':
                 create_shunt_reactor_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, ShuntsDict, ShuntsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Capacitor"):
+            else:
                 create_capacitor_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, CapacitorsDict, CapacitorsDictId, created_elements, execute_dss_command)
         except ValueError as ve:
             raise
@@ -607,30 +578,22 @@ def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectio
             continue
 
     # Fifth pass: create power injection elements (Generators, Loads, Storage, PVSystems)
-    for x in in_data:
+    for x in index.keys('load', 'load_dc', 'motor', 'sgen', 'asymmetric_sgen', 'gen', 'storage', 'pvsystem'):
         try:
             element_data = in_data[x]
-            element_type = element_data.get('typ', '')
+            element_kind = index.kind(x)
             element_name = _sanitize_opendss_name(element_data.get('name', ''))
             element_id = element_data.get('id', '')
-            if "Bus" in element_type or element_type == "PowerFlowOpenDss Parameters":
-                continue
-            if element_type.startswith("External Grid") or "Line" in element_type or element_type.startswith("Transformer") or element_type.startswith("Two Winding Transformer") or element_type.startswith("Three Winding") or element_type.startswith("Shunt Reactor") or element_type.startswith("Capacitor"):
-                continue
-            if element_type.startswith("Load"):
-                create_load_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, LoadsDict, LoadsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Motor"):
+            if element_kind in ('load', 'load_dc', 'motor'):
                 # Motors are modeled as Loads in OpenDSS
                 create_load_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, LoadsDict, LoadsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Static Generator"):
+            elif element_kind in ('sgen', 'asymmetric_sgen'):
                 create_static_generator_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, GeneratorsDict, GeneratorsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Asymmetric Static Generator"):
-                create_static_generator_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, GeneratorsDict, GeneratorsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Generator"):
+            elif element_kind == 'gen':
                 create_generator_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, GeneratorsDict, GeneratorsDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("Storage"):
+            elif element_kind == 'storage':
                 create_storage_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, StoragesDict, StoragesDictId, created_elements, execute_dss_command)
-            elif element_type.startswith("PVSystem"):
+            else:
                 create_pvsystem_element(dss, element_data, element_name, element_id, BusbarsDictVoltage, BusbarsDictConnectionToName, PVSystemsDict, PVSystemsDictId, created_elements, execute_dss_command)
         except ValueError as ve:
             raise
@@ -638,13 +601,9 @@ def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectio
             continue
 
     # Sixth pass: create Switch elements (OpenDSS: open/close Lines, disable Transformers, or Reactor for bus-bus)
-    for x in in_data:
+    for x in index.keys('switch'):
         try:
-            element_data = in_data[x]
-            element_type = element_data.get('typ', '')
-            if not element_type.startswith("Switch"):
-                continue
-            create_switch_element(dss, element_data, LinesDict, TransformersDict, BusbarsDictConnectionToName, execute_dss_command)
+            create_switch_element(dss, in_data[x], LinesDict, TransformersDict, BusbarsDictConnectionToName, execute_dss_command)
         except ValueError as ve:
             raise
         except Exception as e:
@@ -654,7 +613,7 @@ def create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectio
     # to every bus (including those with PVSystems/Loads). Running calcv before power
     # injection elements can leave the first solve at zero power until the circuit is rebuilt.
     try:
-        vb_list = _collect_voltage_bases_from_in_data(in_data, BusbarsDictVoltage)
+        vb_list = _collect_voltage_bases_from_in_data(index, BusbarsDictVoltage)
         if vb_list:
             execute_dss_command('set voltagebases=[' + ','.join(str(v) for v in vb_list) + ']')
         execute_dss_command('calcv')
@@ -2519,7 +2478,7 @@ def create_external_grid_element(dss, element_data, element_name, element_id, Bu
         pass
 
 
-def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_results=False):
+def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_results=False, index=None):
     """OpenDSS fault study / short circuit analysis.
 
     Builds the circuit from in_data (same as powerflow), sets Solution.Mode to FaultStudy,
@@ -2538,19 +2497,21 @@ def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_result
             opendss_commands.append(command)
 
     f = int(frequency) if frequency else 50
-    ext_scan = _prescan_external_grid(in_data)
+    index = payload_index.index_payload(in_data, index)
+    ext_scan = _prescan_external_grid(index)
 
     execute_dss_command('clear')
     execute_dss_command(_new_circuit_command(ext_scan))
     execute_dss_command(f'set DefaultBaseFrequency={f}')
 
     try:
-        BusbarsDictVoltage, BusbarsDictConnectionToName = create_busbars(in_data, dss, False, opendss_commands)
-        (LinesDict, LinesDictId, LoadsDict, LoadsDictId, TransformersDict, TransformersDictId,
-         Transformers3WDict, Transformers3WDictId,
-         ShuntsDict, ShuntsDictId, CapacitorsDict, CapacitorsDictId, GeneratorsDict, GeneratorsDictId,
-         StoragesDict, StoragesDictId, PVSystemsDict, PVSystemsDictId, ExternalGridsDict, ExternalGridsDictId,
-         _circuit_source) = create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName, False, opendss_commands, execute_dss_command)
+        with stage_timing.stage('build'):
+            BusbarsDictVoltage, BusbarsDictConnectionToName = create_busbars(in_data, dss, False, opendss_commands, index=index)
+            (LinesDict, LinesDictId, LoadsDict, LoadsDictId, TransformersDict, TransformersDictId,
+             Transformers3WDict, Transformers3WDictId,
+             ShuntsDict, ShuntsDictId, CapacitorsDict, CapacitorsDictId, GeneratorsDict, GeneratorsDictId,
+             StoragesDict, StoragesDictId, PVSystemsDict, PVSystemsDictId, ExternalGridsDict, ExternalGridsDictId,
+             _circuit_source) = create_other_elements(in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName, False, opendss_commands, execute_dss_command, index=index)
     except ValueError as ve:
         return json.dumps({"error": str(ve)})
     except Exception as e:
@@ -2558,7 +2519,7 @@ def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_result
 
     # Set voltage bases (required for fault study and per-unit results)
     try:
-        vb_list = _collect_voltage_bases_from_in_data(in_data, BusbarsDictVoltage)
+        vb_list = _collect_voltage_bases_from_in_data(index, BusbarsDictVoltage)
         if vb_list:
             execute_dss_command('set voltagebases=[' + ','.join(str(v) for v in vb_list) + ']')
         print("[OpenDSS] calcv")
@@ -2570,7 +2531,8 @@ def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_result
     # Fault Study uses these for Isc = Ysc * Voc; some engines need this before FaultStudy
     try:
         dss.Solution.Mode(0)  # 0 = Snapshot
-        dss.Solution.Solve()
+        with stage_timing.stage('solve'):
+            dss.Solution.Solve()
         print(f"[DEBUG] Snapshot solve completed. Converged: {dss.Solution.Converged()}")
         # Check if buses have voltage after snapshot solve
         for bus_name in (dss.Circuit.AllBusNames() or [])[:3]:
@@ -2592,7 +2554,8 @@ def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_result
     try:
         execute_dss_command('set Mode=FaultStudy')
         print("[OpenDSS] solve")
-        dss.Text.Command('solve')
+        with stage_timing.stage('solve'):
+            dss.Text.Command('solve')
         print(f"[DEBUG] FaultStudy solve completed. Solution.Mode: {dss.Solution.Mode()}")
         if hasattr(dss.Solution, 'Converged'):
             print(f"[DEBUG] Solution.Converged: {dss.Solution.Converged()}")
@@ -2772,7 +2735,7 @@ def shortcircuit(in_data, frequency=50, fault_type='3ph', export_open_dss_result
             ))
 
     result = {"busbars": [vars(b) for b in busbarList]}
-    return json.dumps(result, separators=(',', ':'))
+    return result_json.dumps(result)
 
 
 def _opendss_has_power_injections(LoadsDict, GeneratorsDict, StoragesDict, PVSystemsDict):
@@ -2790,7 +2753,7 @@ def _opendss_total_power_is_zero(total_power, threshold_kw=0.01):
     return abs(p_kw) < threshold_kw and abs(q_kvar) < threshold_kw
 
 
-def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, tolerance, controlmode, export_commands=False):
+def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, tolerance, controlmode, export_commands=False, index=None):
     """Main powerflow function for OpenDSS
     
     Parameters based on OpenDSS documentation: https://opendss.epri.com/PowerFlow.html
@@ -2805,6 +2768,7 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
         max_iterations: Maximum number of iterations
         tolerance: Convergence tolerance
         controlmode: Control mode (Static, Event, Time)
+        index: PayloadIndex of in_data, if the caller already built one
     """
     
     # OpenDSSDirect.py is already imported as dss at the module level
@@ -2831,7 +2795,8 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
     # Pre-scan in_data for the first External Grid to embed its Vsource parameters
     # directly into "New Circuit". This avoids relying on "Edit Vsource.source" which
     # can silently fail in some opendssdirect versions, leaving zero voltage everywhere.
-    ext_scan = _prescan_external_grid(in_data)
+    index = payload_index.index_payload(in_data, index)
+    ext_scan = _prescan_external_grid(index)
     
     element_dicts = None
     for build_attempt in range(2):
@@ -2851,12 +2816,13 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
         # Create busbars and other elements using helper functions
         # Wrap in try-except to catch validation errors and return them to frontend
         try:
-            BusbarsDictVoltage, BusbarsDictConnectionToName = create_busbars(
-                in_data, dss, export_commands, opendss_commands)
+            with stage_timing.stage('build'):
+                BusbarsDictVoltage, BusbarsDictConnectionToName = create_busbars(
+                    in_data, dss, export_commands, opendss_commands, index=index)
 
-            element_dicts = create_other_elements(
-                in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName,
-                export_commands, opendss_commands, execute_dss_command)
+                element_dicts = create_other_elements(
+                    in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName,
+                    export_commands, opendss_commands, execute_dss_command, index=index)
         except ValueError as ve:
             error_response = {"error": str(ve)}
             return json.dumps(error_response)
@@ -2867,7 +2833,8 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
         try:
             print("[OpenDSS] solve")
             execute_dss_command('init')
-            dss.Text.Command('solve')
+            with stage_timing.stage('solve'):
+                dss.Text.Command('solve')
         except Exception as e:
             print(f"[OpenDSS] Solve EXCEPTION: {e}")
 
@@ -3972,7 +3939,7 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
 
     try:
         # Optimized: Remove indent=4 to reduce payload size by ~40%
-        response = json.dumps(result, default=safe_json_serializer, separators=(',', ':'))
+        response = result_json.dumps(result, default=safe_json_serializer)
         
         return response
     except Exception as json_error:
@@ -3990,7 +3957,7 @@ def powerflow(in_data, frequency, mode, algorithm, loadmodel, max_iterations, to
         
 def harmonic_analysis(in_data, frequency, mode, algorithm, loadmodel, max_iterations,
                       tolerance, controlmode, harmonics, neglect_load_y=False,
-                      export_commands=False):
+                      export_commands=False, index=None):
     """
     Perform OpenDSS harmonic analysis with full per-bus / per-line results.
 
@@ -4052,6 +4019,7 @@ def harmonic_analysis(in_data, frequency, mode, algorithm, loadmodel, max_iterat
             opendss_commands.append(command)
 
     f = frequency
+    index = payload_index.index_payload(in_data, index)
     execute_dss_command('clear')
     execute_dss_command('New Circuit.OpenDSS_Circuit')
     execute_dss_command(f'set DefaultBaseFrequency={f}')
@@ -4064,7 +4032,7 @@ def harmonic_analysis(in_data, frequency, mode, algorithm, loadmodel, max_iterat
 
     try:
         BusbarsDictVoltage, BusbarsDictConnectionToName = create_busbars(
-            in_data, dss, export_commands, opendss_commands)
+            in_data, dss, export_commands, opendss_commands, index=index)
 
         (LinesDict, LinesDictId, LoadsDict, LoadsDictId,
          TransformersDict, TransformersDictId,
@@ -4075,7 +4043,7 @@ def harmonic_analysis(in_data, frequency, mode, algorithm, loadmodel, max_iterat
          ExternalGridsDict, ExternalGridsDictId,
          circuit_source_element_name) = create_other_elements(
             in_data, dss, BusbarsDictVoltage, BusbarsDictConnectionToName,
-            export_commands, opendss_commands, execute_dss_command)
+            export_commands, opendss_commands, execute_dss_command, index=index)
     except Exception as e:
         return json.dumps({"error": f"Error creating harmonic circuit: {str(e)}"})
 
@@ -4371,42 +4339,9 @@ def harmonic_analysis(in_data, frequency, mode, algorithm, loadmodel, max_iterat
         elif harmonic_text:
             base_result["opendss_commands"] = harmonic_text
 
-    def _to_native_json(obj):
-        """Convert numpy types to native Python for JSON serialization."""
-        try:
-            import numpy as np
-            if isinstance(obj, (np.floating, np.float32, np.float64, np.float16)):
-                return float(obj)
-            if isinstance(obj, (np.integer, np.int32, np.int64)):
-                return int(obj)
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-        except ImportError:
-            pass
-        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
-
-    def _sanitize_nan(obj):
-        """Replace NaN/Inf with null so JSON is parseable by strict parsers (e.g. JSON.parse)."""
-        if isinstance(obj, dict):
-            return {k: _sanitize_nan(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [_sanitize_nan(v) for v in obj]
-        if isinstance(obj, float):
-            if math.isnan(obj) or math.isinf(obj):
-                return None
-            return obj
-        try:
-            import numpy as np
-            if isinstance(obj, (np.floating, np.float32, np.float64, np.float16)):
-                v = float(obj)
-                return None if (math.isnan(v) or math.isinf(v)) else v
-        except ImportError:
-            pass
-        return obj
-
     try:
-        sanitized = _sanitize_nan(base_result)
-        return json.dumps(sanitized, default=_to_native_json, allow_nan=False, separators=(',', ':'))
+        # NaN/Inf become null so JSON is parseable by strict parsers (e.g. JSON.parse)
+        return result_json.dumps(base_result)
     except Exception as json_error:
         return json.dumps(
             {
@@ -10,6 +10,8 @@ import pandapower.topology as top
 from typing import List
 import math
 import json
+import time
+import os
 import numpy as np
 import pandas as pd
 import pandapower.control as control
@@ -17,89 +19,17 @@ import pandapower.timeseries as ts
 from pandapower.timeseries import DFData
 from copy import deepcopy
 
-
-Busbars = {}
-
-
-def _pf_res_row_for_element(net_element_df, res_df, element_index):
-    """
-    Map a net element row (trafo / trafo3w) to its power-flow result row.
-    Prefer matching index; if lengths match, fall back to same position (handles rare index dtype mismatches).
-    """
-    if res_df is None or getattr(res_df, 'empty', True):
-        return None
-    try:
-        if element_index in res_df.index:
-            return res_df.loc[element_index]
-    except (TypeError, KeyError, ValueError):
-        pass
-    if len(res_df) == len(net_element_df):
-        try:
-            pos = list(net_element_df.index).index(element_index)
-            return res_df.iloc[pos]
-        except (ValueError, IndexError, TypeError):
-            pass
-    return None
-
-
-def _trafo_out_id(raw_id, name, index_fallback):
-    """Stable string id for JSON (avoid NaN/null from pandas)."""
-    if raw_id is not None and not pd.isna(raw_id):
-        return str(raw_id)
-    if name is not None and not pd.isna(name):
-        return str(name)
-    return str(index_fallback)
-
-
-def _json_serialize_default(obj):
-    """Handle numpy types and custom objects for json.dumps. Works with NumPy 1.x and 2.x."""
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    # numpy scalars (bool_, int64, float64, etc.) have .item() -> native Python type
-    if hasattr(obj, 'item') and callable(getattr(obj, 'item')):
-        return obj.item()
-    if hasattr(obj, '__dict__'):
-        return obj.__dict__
-    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+import contingency_engine
+import payload_index
+import repeated_powerflow
+import result_columns
+import rpc_sweep
+import result_json
+import stage_timing
+import study_cancellation
 
 
-def _jsonify_safe(obj):
-    """Deep-convert numpy/pandas scalars and arrays so Flask jsonify succeeds."""
-    return json.loads(json.dumps(obj, default=_json_serialize_default))
-
-
-def _sanitize_for_strict_json(obj):
-    """
-    Recursively replace NaN/Inf with None so payloads are valid RFC 8259 JSON.
-    Browser Response.json() / JSON.parse reject unquoted NaN/Infinity tokens.
-    """
-    if obj is None:
-        return None
-    if isinstance(obj, bool):
-        return obj
-    if isinstance(obj, (int, np.integer)):
-        return int(obj)
-    if isinstance(obj, (float, np.floating)):
-        f = float(obj)
-        if math.isnan(f) or math.isinf(f):
-            return None
-        return f
-    if isinstance(obj, str):
-        return obj
-    if isinstance(obj, np.ndarray):
-        return _sanitize_for_strict_json(obj.tolist())
-    if isinstance(obj, dict):
-        return {k: _sanitize_for_strict_json(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple)):
-        return [_sanitize_for_strict_json(v) for v in obj]
-    if hasattr(obj, 'item') and callable(getattr(obj, 'item')):
-        try:
-            return _sanitize_for_strict_json(obj.item())
-        except Exception:
-            return None
-    if hasattr(obj, '__dict__') and not isinstance(obj, type):
-        return _sanitize_for_strict_json(vars(obj))
-    return obj
+Busbars = {}
 
 
 def _electrisim_switch_res_for_output(net, sw_idx, row):
@@ -362,126 +292,6 @@ def _electrisim_switch_res_for_output(net, sw_idx, row):
         return _fin(i_ka), _fin(p_from), _fin(q_from), _fin(p_to), _fin(q_to), _fin(loading)
 
 
-def _electrisim_bus_branch_p_q_sum(net, bus_idx):
-    """
-    Compute "through power" for ``bus_idx`` from AC branch results (lines, 2W/3W trafos, impedances).
-
-    pandapower ``res_bus.p_mw`` / ``q_mvar`` are *lumped* injections (load, sgen, ext_grid, …) at that bus.
-    On a pass-through bus (e.g. LV node with trafo + gen behind a bus–bus switch on an aux bus) net
-    ``res_bus`` injection can be **zero** while line/trafo terminals still carry power.
-
-    Terminal convention: ``p_from_mw`` / ``p_to_mw`` / ``p_hv_mw`` / ``p_lv_mw`` is the active power
-    **from the bus into the branch** (positive ⇒ leaves the bus). We accumulate:
-
-    - **inflow** ``(p_in, q_in)``: contribution when ``p < 0`` (or ``q < 0``) — power/var flowing into the bus.
-    - **outflow** ``(p_out, q_out)``: contribution when ``p > 0`` (or ``q > 0``) — leaving the bus.
-
-    At a pass-through node, inflow and outflow magnitudes match (Kirchhoff). Earlier code only kept
-    *inflow*, so buses that **only** export into a trafo (``p_lv > 0``, gen behind an aux switch) got
-    ``p_branch_mw = 0``. We return the pair from whichever side has larger |P| so the UI shows the
-    correct through-power **magnitude**.
-
-    **Sign:** pandapower ``res_bus.p_mw`` on a bus with local generation is typically **negative** (same
-    sign as ``P_from`` on an intervening bus–bus switch). Branch outflow uses terminal ``p > 0`` (power
-    *leaving* the bus into the branch), so it comes out **positive**. When outflow dominates
-    (``p_out > p_in``), we **negate** P and Q so the bus label matches the normal ``res_bus`` convention
-    and stays consistent with the “no aux / no switch” case.
-    """
-    p_in = 0.0
-    p_out = 0.0
-    q_in_s = 0.0  # signed Σ Q at terminals with P flowing into the bus (p < 0)
-    q_out_s = 0.0  # signed Σ Q at terminals with P flowing out of the bus (p > 0)
-
-    def _f(v, default=0.0):
-        try:
-            x = float(v)
-            if math.isnan(x) or math.isinf(x):
-                return default
-            return x
-        except (TypeError, ValueError):
-            return default
-
-    def _add_in_out(p_term, q_term):
-        nonlocal p_in, p_out, q_in_s, q_out_s
-        pt = _f(p_term)
-        qt = _f(q_term)
-        if pt < 0:
-            p_in += -pt
-            q_in_s += qt
-        elif pt > 0:
-            p_out += pt
-            q_out_s += qt
-
-    try:
-        if hasattr(net, "line") and net.line is not None and not net.line.empty \
-                and hasattr(net, "res_line") and net.res_line is not None and not net.res_line.empty:
-            for i in net.line.index:
-                if i not in net.res_line.index:
-                    continue
-                fr = net.line.at[i, "from_bus"]
-                to = net.line.at[i, "to_bus"]
-                rl = net.res_line.loc[i]
-                if fr == bus_idx:
-                    _add_in_out(rl.get("p_from_mw", 0.0), rl.get("q_from_mvar", 0.0))
-                if to == bus_idx:
-                    _add_in_out(rl.get("p_to_mw", 0.0), rl.get("q_to_mvar", 0.0))
-    except Exception:
-        pass
-
-    try:
-        if hasattr(net, "trafo") and net.trafo is not None and not net.trafo.empty \
-                and hasattr(net, "res_trafo") and net.res_trafo is not None and not net.res_trafo.empty:
-            for i in net.trafo.index:
-                if i not in net.res_trafo.index:
-                    continue
-                hv = net.trafo.at[i, "hv_bus"]
-                lv = net.trafo.at[i, "lv_bus"]
-                rt = net.res_trafo.loc[i]
-                if hv == bus_idx:
-                    _add_in_out(rt.get("p_hv_mw", 0.0), rt.get("q_hv_mvar", 0.0))
-                if lv == bus_idx:
-                    _add_in_out(rt.get("p_lv_mw", 0.0), rt.get("q_lv_mvar", 0.0))
-    except Exception:
-        pass
-
-    try:
-        if hasattr(net, "trafo3w") and net.trafo3w is not None and not net.trafo3w.empty \
-                and hasattr(net, "res_trafo3w") and net.res_trafo3w is not None and not net.res_trafo3w.empty:
-            for i in net.trafo3w.index:
-                if i not in net.res_trafo3w.index:
-                    continue
-                row = net.trafo3w.loc[i]
-                r3 = net.res_trafo3w.loc[i]
-                if row["hv_bus"] == bus_idx:
-                    _add_in_out(r3.get("p_hv_mw", 0.0), r3.get("q_hv_mvar", 0.0))
-                if row["mv_bus"] == bus_idx:
-                    _add_in_out(r3.get("p_mv_mw", 0.0), r3.get("q_mv_mvar", 0.0))
-                if row["lv_bus"] == bus_idx:
-                    _add_in_out(r3.get("p_lv_mw", 0.0), r3.get("q_lv_mvar", 0.0))
-    except Exception:
-        pass
-
-    try:
-        if hasattr(net, "impedance") and net.impedance is not None and not net.impedance.empty \
-                and hasattr(net, "res_impedance") and net.res_impedance is not None and not net.res_impedance.empty:
-            for i in net.impedance.index:
-                if i not in net.res_impedance.index:
-                    continue
-                fr = net.impedance.at[i, "from_bus"]
-                to = net.impedance.at[i, "to_bus"]
-                r = net.res_impedance.loc[i]
-                if fr == bus_idx:
-                    _add_in_out(r.get("p_from_mw", 0.0), r.get("q_from_mvar", 0.0))
-                if to == bus_idx:
-                    _add_in_out(r.get("p_to_mw", 0.0), r.get("q_to_mvar", 0.0))
-    except Exception:
-        pass
-
-    if p_in >= p_out:
-        return p_in, q_in_s
-    return -p_out, -q_out_s
-
-
 def generate_pandapower_python_code(net, in_data, Busbars, algorithm, calculate_voltage_angles, init):
     """Generate Python code to recreate the pandapower network"""
     lines = []
@@ -1061,8 +871,143 @@ def generate_pandapower_python_code(net, in_data, Busbars, algorithm, calculate_
     
     return '\n'.join(lines)
 
-def create_busbars(in_data, net):
+
+# Bulk element creation: with ELECTRISIM_BULK_BUILD enabled (default) the builders queue the
+# keyword arguments of their per-row pp.create_* calls for the most numerous element types and
+# flush them through the vectorised pp.create_*s functions. The flush sets the columns where the
+# two paths differ explicitly (defaults, empty-cell values, column order), so the tables match the
+# per-row build cell for cell; pass bulk=False to the builders to compare.
+ELECTRISIM_BULK_BUILD = os.getenv('ELECTRISIM_BULK_BUILD', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+_BULK_CREATE_FUNCS = {
+    # table: (single-row create, bulk create, single-row kwarg -> bulk kwarg renames)
+    'bus': (pp.create_bus, pp.create_buses, {}),
+    'line': (pp.create_line_from_parameters, pp.create_lines_from_parameters,
+             {'from_bus': 'from_buses', 'to_bus': 'to_buses'}),
+    'load': (pp.create_load, pp.create_loads, {'bus': 'buses'}),
+    'sgen': (pp.create_sgen, pp.create_sgens, {'bus': 'buses'}),
+    'trafo': (pp.create_transformer_from_parameters, pp.create_transformers_from_parameters,
+              {'hv_bus': 'hv_buses', 'lv_bus': 'lv_buses'}),
+}
+
+# Single-row defaults the bulk functions do not share (a non-empty default also adds its column with the first row)
+_BULK_DEFAULTS = {
+    'line': {'g0_us_per_km': 0.0},
+    'sgen': {'reactive_capability_curve': False},
+    'trafo': {'tap_dependency_table': False, 'oltc': False},
+}
+
+# What the single-row functions store when a row leaves these columns empty (the bulk functions store NaN)
+_BULK_EMPTY_CELLS = {
+    'bus': {'zone': None},
+    'line': {'std_type': None},
+    'trafo': {'std_type': None},
+    'sgen': {'curve_style': np.nan},
+}
+
+# Optional columns in the order the single-row functions add them (after any extra keyword columns
+# such as 'id'); a new column appears with the first row that sets it
+_BULK_OPTIONAL_COLUMNS = {
+    'bus': ['min_vm_pu', 'max_vm_pu'],
+    'line': ['r0_ohm_per_km', 'x0_ohm_per_km', 'c0_nf_per_km', 'g0_us_per_km', 'max_loading_percent',
+             'alpha', 'temperature_degree_celsius', 'endtemp_degree', 'tdpf'],
+    'load': ['min_p_mw', 'max_p_mw', 'min_q_mvar', 'max_q_mvar', 'controllable'],
+    'sgen': ['min_p_mw', 'max_p_mw', 'min_q_mvar', 'max_q_mvar', 'controllable',
+             'id_q_capability_characteristic', 'reactive_capability_curve', 'curve_style', 'rx', 'kappa',
+             'generator_type', 'k', 'lrc_pu', 'max_ik_ka'],
+    'trafo': ['id_characteristic_table', 'tap_changer_type', 'tap_dependency_table', 'tap2_side',
+              'tap2_neutral', 'tap2_min', 'tap2_max', 'tap2_step_percent', 'tap2_step_degree', 'tap2_pos',
+              'tap2_changer_type', 'vk0_percent', 'vkr0_percent', 'mag0_percent', 'mag0_rx',
+              'si0_hv_partial', 'vector_group', 'max_loading_percent', 'pt_percent', 'oltc', 'xn_ohm'],
+}
+
+
+class _ElectrisimElementQueue:
+    """Creates bus/line/load/sgen/trafo rows one by one (legacy) or queued for bulk creation."""
+
+    def __init__(self, net, bulk=None):
+        self.net = net
+        self.bulk = ELECTRISIM_BULK_BUILD if bulk is None else bool(bulk)
+        self.pending = {}
+        self.next_index = {}
+
+    def create(self, table, **kwargs):
+        """Create (or queue) one element; returns its pandapower index either way."""
+        if not self.bulk:
+            return _BULK_CREATE_FUNCS[table][0](self.net, **kwargs)
+        if table not in self.pending:
+            df = self.net[table]
+            self.next_index[table] = int(df.index.max()) + 1 if len(df) else 0
+            self.pending[table] = []
+        idx = self.next_index[table]
+        self.next_index[table] += 1
+        if table == 'sgen':
+            # create_sgen stores only the short-circuit parameter of the row's generator_type,
+            # create_sgens stores it for every row as soon as one row has that type
+            gen_type = kwargs.get('generator_type')
+            for key, types in (('k', (None, 'current_source')), ('lrc_pu', ('async',)),
+                               ('max_ik_ka', ('async_doubly_fed',))):
+                if key in kwargs and gen_type not in types:
+                    kwargs[key] = np.nan
+        for key, value in _BULK_DEFAULTS.get(table, {}).items():
+            kwargs.setdefault(key, value)
+        self.pending[table].append(kwargs)
+        return idx
+
+    def flush(self):
+        """Create all queued rows; must run before anything reads the queued tables."""
+        for table, rows in self.pending.items():
+            _, bulk, renames = _BULK_CREATE_FUNCS[table]
+            start = self.next_index[table] - len(rows)
+            index = list(range(start, start + len(rows)))
+            before = list(self.net[table].columns)
+            keys = []
+            for row in rows:
+                for key in row:
+                    if key not in keys:
+                        keys.append(key)
+            kwargs = {}
+            for key in keys:
+                values = [row.get(key) for row in rows]
+                values = [np.nan if value is None else value for value in values]
+                # Uniform optional columns go in as scalars: some bulk functions (e.g. kappa in create_sgens)
+                # take scalars only. Buses and the other per-row columns always go in as lists.
+                if key in _BULK_OPTIONAL_COLUMNS[table] and all(repr(value) == repr(values[0]) for value in values):
+                    values = values[0]
+                kwargs[renames.get(key, key)] = values
+            if table == 'bus':
+                kwargs['nr_buses'] = len(rows)
+            bulk(self.net, index=index, **kwargs)
+
+            df = self.net[table]
+            for col, value in _BULK_EMPTY_CELLS.get(table, {}).items():
+                for idx, row in zip(index, rows):
+                    if _electrisim_is_null(row.get(col)):
+                        df.at[idx, col] = value
+
+            optional = _BULK_OPTIONAL_COLUMNS[table]
+
+            def column_rank(col):
+                if col in optional:
+                    first = next((n for n, row in enumerate(rows) if not _electrisim_is_null(row.get(col))), len(rows))
+                    return first, 1, optional.index(col)
+                first = next((n for n, row in enumerate(rows) if col in row), len(rows))
+                return first, 0, keys.index(col) if col in keys else len(keys)
+
+            added = sorted((col for col in df.columns if col not in before), key=column_rank)
+            self.net[table] = df[before + added]
+        self.pending = {}
+        self.next_index = {}
+
+
+def _electrisim_is_null(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+def create_busbars(in_data, net, bulk=None, index=None):
     Busbars = {}
+    index = payload_index.index_payload(in_data, index)
+    _elements = _ElectrisimElementQueue(net, bulk)
     # Store user-friendly names mapping for later use
     net.user_friendly_names = {}
     
@@ -1077,8 +1022,8 @@ def create_busbars(in_data, net):
         print("   You can still use 'DC Line' which connects two AC buses directly.")
         print("   Upgrade to pandapower 3.1+ for full DC grid support.")
     
-    for x in in_data:
-        if "DC Bus" in in_data[x]['typ']:
+    for x in index.keys('dc_bus', 'bus'):
+        if index.kind(x) == 'dc_bus':
             # Handle DC Bus separately - requires pandapower 3.1+
             if not has_dc_bus_support:
                 user_friendly_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -1102,7 +1047,7 @@ def create_busbars(in_data, net):
             
             # Store the user-friendly name mapping
             net.user_friendly_names[dc_bus_name] = user_friendly_name
-        elif "Bus" in in_data[x]['typ']:
+        else:
             bus_name = in_data[x]['name']
             user_friendly_name = in_data[x].get('userFriendlyName', bus_name)
             
@@ -1111,24 +1056,21 @@ def create_busbars(in_data, net):
             if 'in_service' in in_data[x]:
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             
+            vn_kv = index.number(x, 'vn_kv')
+            if vn_kv is None:
+                vn_kv = float(in_data[x]['vn_kv'])  # missing / invalid vn_kv: raise as before
             bus_kw = dict(
                 name=bus_name,
                 id=in_data[x]['id'],
-                vn_kv=float(in_data[x]['vn_kv']),
+                vn_kv=vn_kv,
                 type='b',
                 in_service=in_service,
             )
             for vm_key in ('min_vm_pu', 'max_vm_pu'):
-                raw = in_data[x].get(vm_key)
-                if raw is None or str(raw).strip().lower() in ('', 'none', 'null'):
-                    continue
-                try:
-                    v = float(raw)
-                    if v == v and math.isfinite(v) and v >= 0.0:
-                        bus_kw[vm_key] = v
-                except (TypeError, ValueError):
-                    pass
-            bus_idx = pp.create_bus(net, **bus_kw)
+                v = index.number(x, vm_key)
+                if v is not None and math.isfinite(v) and v >= 0.0:
+                    bus_kw[vm_key] = v
+            bus_idx = _elements.create('bus', **bus_kw)
             Busbars[bus_name] = bus_idx
             # Diagram XML often stores the pandapower semantic name as userFriendlyName while `name`
             # stays as mxObjectId — duplicate the mapping so Switch payloads resolve either key.
@@ -1139,6 +1081,8 @@ def create_busbars(in_data, net):
             # Store the user-friendly name mapping
             net.user_friendly_names[bus_name] = user_friendly_name
     
+    _elements.flush()
+
     # Store DC buses in Busbars dict for compatibility
     Busbars.update(DcBuses)
     
@@ -1552,7 +1496,7 @@ def _electrisim_attach_line_flow_shunt_controllers(net):
             print(f"Warning: Line-flow shunt controller registration failed for spec {spec!r}: {ex}")
 
 
-def create_other_elements(in_data,net,x, Busbars):
+def create_other_elements(in_data,net,x, Busbars, bulk=None, index=None):
 
     #tworzymy zmienne ktorych nazwa odpowiada modelowi z js - np.Hwap0ntfbV98zYtkLMVm-8
 
@@ -1565,6 +1509,11 @@ def create_other_elements(in_data,net,x, Busbars):
         except (ValueError, TypeError):
             return default
 
+    index = payload_index.index_payload(in_data, index)
+
+    # Lines, loads, static generators and transformers are queued and created in bulk (see _ElectrisimElementQueue)
+    _elements = _ElectrisimElementQueue(net, bulk)
+
     # Maps for Switch element lookup: line/trafo name -> pandapower index
     LinesDict = {}
     TrafoDict = {}
@@ -1585,29 +1534,22 @@ def create_other_elements(in_data,net,x, Busbars):
             return 'b'
         return et_lower[0] if et_lower else 'l'
 
-    _payload_keys = list(in_data.keys())
-    _key_pos = {k: i for i, k in enumerate(_payload_keys)}
-
-    def _creation_order_key(k):
-        row = in_data.get(k)
-        if not isinstance(row, dict):
-            return (1, _key_pos.get(k, 0))
-        typ = str(row.get('typ', ''))
-        if typ.startswith('Switch'):
-            return (2, _key_pos.get(k, 0))
-        if typ.startswith('Line'):
-            return (0, _key_pos.get(k, 0))
-        return (1, _key_pos.get(k, 0))
-
-    _ordered_keys = sorted(_payload_keys, key=_creation_order_key)
+    # Lines first, switches last (they reference lines/trafos), everything else in payload order
+    _ordered_keys = (
+        index.keys('line')
+        + [k for k in index.element_keys()
+           if index.kind(k) not in ('line', 'switch', 'bus', 'dc_bus', payload_index.OTHER)]
+        + index.keys('switch')
+    )
 
     for name,value in Busbars.items():
         globals()[name] = value    
        
     for x in _ordered_keys:
+        _kind = index.kind(x)
       
         #eval - rozwiazuje problem z wartosciami NaN
-        if (in_data[x]['typ'].startswith("Line")):
+        if _kind == 'line':
             try:
                 # Lines have busFrom and busTo fields directly
                 bus_from = in_data[x].get('busFrom')
@@ -1722,7 +1664,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 line_params['max_loading_percent'] = _mlp_line
 
             # Call the function with the prepared parameters
-            line_idx = pp.create_line_from_parameters(net, **line_params)
+            line_idx = _elements.create('line', **line_params)
             LinesDict[in_data[x]['name']] = line_idx
             _ufn_ln = in_data[x].get('userFriendlyName')
             if _ufn_ln not in (None, '') and str(_ufn_ln) != str(in_data[x]['name']):
@@ -1742,7 +1684,7 @@ def create_other_elements(in_data,net,x, Busbars):
             #w specyfikacji zapisano, że poniższe parametry są typu nan. Wartosci składowych zerowych mogą być wprowadzone przez funkcję create line.
             #r0_ohm_per_km= in_data[x]['r0_ohm_per_km'], x0_ohm_per_km= in_data[x]['x0_ohm_per_km'], c0_nf_per_km= in_data[x]['c0_nf_per_km'], max_loading_percent=in_data[x]['max_loading_percent'], endtemp_degree=in_data[x]['endtemp_degree'],
         
-        if (in_data[x]['typ'].startswith("External Grid") or in_data[x]['typ'].startswith("ExternalGrid")):
+        if _kind == 'ext_grid':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -1863,7 +1805,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[ext_grid_name] = user_friendly_name
        
-        if (in_data[x]['typ'].startswith("Generator")):
+        if _kind == 'gen':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -1988,7 +1930,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[gen_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("Static Generator")):      
+        if _kind == 'sgen':      
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -2024,7 +1966,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 float_keys=('min_p_mw', 'max_p_mw', 'min_q_mvar', 'max_q_mvar'),
                 bool_keys=('controllable',),
             )
-            pp.create_sgen(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], p_mw=safe_float(in_data[x]['p_mw']), q_mvar=safe_float(in_data[x]['q_mvar']), sn_mva=safe_float(in_data[x]['sn_mva']), scaling=safe_float(in_data[x].get('scaling'), 1.0), type=in_data[x]['type'],
+            _elements.create('sgen', bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], p_mw=safe_float(in_data[x]['p_mw']), q_mvar=safe_float(in_data[x]['q_mvar']), sn_mva=safe_float(in_data[x]['sn_mva']), scaling=safe_float(in_data[x].get('scaling'), 1.0), type=in_data[x]['type'],
                            k=1.1, rx=safe_float(in_data[x]['rx']), generator_type=in_data[x]['generator_type'], lrc_pu=safe_float(in_data[x]['lrc_pu']), max_ik_ka=safe_float(in_data[x]['max_ik_ka']), current_source=in_data[x]['current_source'], kappa = 1.5, in_service=in_service,
                            **_sgen_opf)
             
@@ -2035,7 +1977,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[sgen_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("Asymmetric Static Generator")):
+        if _kind == 'asymmetric_sgen':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2051,8 +1993,7 @@ def create_other_elements(in_data,net,x, Busbars):
             #mag0_rx**  - zero sequence magnetizing r/x  ratio
             #si0_hv_partial** - zero sequence short circuit impedance  distribution in hv side
             #vk0_percent=in_data[x]['vk0_percent'], vkr0_percent=in_data[x]['vkr0_percent'], mag0_percent=in_data[x]['mag0_percent'], si0_hv_partial=in_data[x]['si0_hv_partial'],
-        _typ = in_data[x].get('typ') or ''
-        if (_typ.startswith("Transformer") or _typ.startswith("Two Winding Transformer")) and not _typ.startswith("Three Winding Transformer"):
+        if _kind == 'trafo':
             # Get values with default fallbacks and proper type conversion
             parallel_value = safe_int(in_data[x].get('parallel', 1), 1)
             vector_group_raw = in_data[x].get('vector_group', None)
@@ -2160,7 +2101,7 @@ def create_other_elements(in_data,net,x, Busbars):
             if _mlp_t2 is not None:
                 transformer_params['max_loading_percent'] = _mlp_t2
 
-            trafo_idx = pp.create_transformer_from_parameters(net, **transformer_params)
+            trafo_idx = _elements.create('trafo', **transformer_params)
             TrafoDict[in_data[x]['name']] = trafo_idx
             _ufn_tr = in_data[x].get('userFriendlyName')
             if _ufn_tr not in (None, '') and str(_ufn_tr) != str(in_data[x]['name']):
@@ -2181,12 +2122,11 @@ def create_other_elements(in_data,net,x, Busbars):
                 vm_lo = 0.99 if vm_lo is None else float(vm_lo)
                 vm_hi = 1.01 if vm_hi is None else float(vm_hi)
                 control_side = in_data[x].get('control_side', 'lv')  # Default to 'lv' if not specified
-                trafo_idx = int(net.trafo.index[-1])
                 if not hasattr(net, 'trafo_discrete_tap_controllers'):
                     net.trafo_discrete_tap_controllers = []
                 net.trafo_discrete_tap_controllers.append((trafo_idx, control_side, vm_lo, vm_hi))
        
-        if (in_data[x]['typ'].startswith("Three Winding Transformer")):  
+        if _kind == 'trafo3w':  
             # Parse vector group to separate base group from phase shift
             vector_group_raw = in_data[x].get('vector_group', None)
             vector_group, phase_shift_from_group = parse_vector_group(vector_group_raw)
@@ -2297,7 +2237,7 @@ def create_other_elements(in_data,net,x, Busbars):
                     net.trafo3w_discrete_tap_controllers = []
                 net.trafo3w_discrete_tap_controllers.append((t3_idx, control_side_3w, vm_lo, vm_hi))
         
-        if (in_data[x]['typ'].startswith("Shunt Reactor")):
+        if _kind == 'shunt_reactor':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2375,7 +2315,7 @@ def create_other_elements(in_data,net,x, Busbars):
                     'name': in_data[x].get('name', '?'),
                 })
         
-        if (in_data[x]['typ'].startswith("Capacitor")):
+        if _kind == 'capacitor':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2385,7 +2325,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_shunt_as_capacitor(net, typ="capacitor", bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], q_mvar=safe_float(in_data[x]['q_mvar']), loss_factor=safe_float(in_data[x]['loss_factor']), vn_kv=safe_float(in_data[x]['vn_kv']), step=float(safe_float(in_data[x].get('step', 1)) or 1), max_step=float(safe_float(in_data[x].get('max_step', 1)) or 1), in_service=in_service)        
         
-        if (in_data[x]['typ'].startswith("Load")):
+        if _kind == 'load':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -2425,7 +2365,7 @@ def create_other_elements(in_data,net,x, Busbars):
             if not load_ctrl:
                 for _lk in ('min_p_mw', 'max_p_mw', 'min_q_mvar', 'max_q_mvar'):
                     _load_opf.pop(_lk, None)
-            pp.create_load(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], p_mw=safe_float(in_data[x]['p_mw']),q_mvar=safe_float(in_data[x]['q_mvar']),const_z_percent=safe_float(in_data[x]['const_z_percent']),const_i_percent=safe_float(in_data[x]['const_i_percent']), sn_mva=safe_float(in_data[x]['sn_mva']),scaling=safe_float(in_data[x].get('scaling'), 1.0),type=in_data[x]['type'], in_service=in_service,
+            _elements.create('load', bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], p_mw=safe_float(in_data[x]['p_mw']),q_mvar=safe_float(in_data[x]['q_mvar']),const_z_percent=safe_float(in_data[x]['const_z_percent']),const_i_percent=safe_float(in_data[x]['const_i_percent']), sn_mva=safe_float(in_data[x]['sn_mva']),scaling=safe_float(in_data[x].get('scaling'), 1.0),type=in_data[x]['type'], in_service=in_service,
                            **_load_opf)
             
             # Store user-friendly name for load
@@ -2435,7 +2375,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[load_name] = user_friendly_name
       
-        if (in_data[x]['typ'].startswith("Asymmetric Load")):
+        if _kind == 'asymmetric_load':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2445,7 +2385,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_asymmetric_load(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], p_a_mw=in_data[x]['p_a_mw'],p_b_mw=in_data[x]['p_b_mw'],p_c_mw=in_data[x]['p_c_mw'],q_a_mvar=in_data[x]['q_a_mvar'], q_b_mvar=in_data[x]['q_b_mvar'], q_c_mvar=in_data[x]['q_c_mvar'], sn_mva=in_data[x]['sn_mva'], scaling=in_data[x]['scaling'],type=in_data[x]['type'], in_service=in_service)         
    
-        if (in_data[x]['typ'].startswith("Impedance")):
+        if _kind == 'impedance':
             from_bus_idx = Busbars.get(in_data[x]['busFrom'])
             to_bus_idx = Busbars.get(in_data[x]['busTo'])
             if from_bus_idx is None:
@@ -2458,7 +2398,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_impedance(net, from_bus=from_bus_idx, to_bus=to_bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], rft_pu=in_data[x]['rft_pu'],xft_pu=in_data[x]['xft_pu'],sn_mva=in_data[x]['sn_mva'], in_service=in_service)         
          
-        if (in_data[x]['typ'].startswith("Ward")):
+        if _kind == 'ward':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2468,7 +2408,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_ward(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], ps_mw=in_data[x]['ps_mw'],qs_mvar=in_data[x]['qs_mvar'], pz_mw=in_data[x]['pz_mw'], qz_mvar=in_data[x]['qz_mvar'], in_service=in_service)         
    
-        if (in_data[x]['typ'].startswith("Extended Ward")):
+        if _kind == 'xward':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2478,7 +2418,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_xward(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], ps_mw=in_data[x]['ps_mw'], qs_mvar=in_data[x]['qs_mvar'], pz_mw=in_data[x]['pz_mw'], qz_mvar=in_data[x]['qz_mvar'], r_ohm =in_data[x]['r_ohm'], x_ohm=in_data[x]['x_ohm'],vm_pu=in_data[x]['vm_pu'], in_service=in_service)         
    
-        if (in_data[x]['typ'].startswith("Motor")):
+        if _kind == 'motor':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2508,7 +2448,7 @@ def create_other_elements(in_data,net,x, Busbars):
                             in_service=in_service)         
    
         
-        if (in_data[x]['typ'].startswith("SVC")):
+        if _kind == 'svc':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2518,7 +2458,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_svc(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], x_l_ohm=in_data[x]['x_l_ohm'], x_cvar_ohm=in_data[x]['x_cvar_ohm'], set_vm_pu=in_data[x]['set_vm_pu'], thyristor_firing_angle_degree=in_data[x]['thyristor_firing_angle_degree'], controllable=in_data[x]['controllable'], min_angle_degree=in_data[x]['min_angle_degree'], max_angle_degree=in_data[x]['max_angle_degree'], in_service=in_service)
          
-        if (in_data[x]['typ'].startswith("TCSC")):
+        if _kind == 'tcsc':
             from_bus_idx = Busbars.get(in_data[x]['busFrom'])
             to_bus_idx = Busbars.get(in_data[x]['busTo'])
             if from_bus_idx is None:
@@ -2531,7 +2471,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 in_service = bool(in_data[x]['in_service']) if isinstance(in_data[x]['in_service'], bool) else (in_data[x]['in_service'] == 'true' or in_data[x]['in_service'] == True)
             pp.create_tcsc(net, from_bus=from_bus_idx, to_bus=to_bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], x_l_ohm=in_data[x]['x_l_ohm'], x_cvar_ohm=in_data[x]['x_cvar_ohm'], set_p_to_mw=in_data[x]['set_p_to_mw'], thyristor_firing_angle_degree=in_data[x]['thyristor_firing_angle_degree'], controllable=in_data[x]['controllable'], min_angle_degree=in_data[x]['min_angle_degree'], max_angle_degree=in_data[x]['max_angle_degree'], in_service=in_service)
                    
-        if (in_data[x]['typ'].startswith("SSC")):
+        if _kind == 'ssc':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2542,7 +2482,7 @@ def create_other_elements(in_data,net,x, Busbars):
             pp.create_ssc(net, bus=bus_idx, name=in_data[x]['name'], id=in_data[x]['id'], r_ohm=in_data[x]['r_ohm'], x_ohm=in_data[x]['x_ohm'], set_vm_pu=in_data[x]['set_vm_pu'], vm_internal_pu=in_data[x]['vm_internal_pu'], va_internal_degree=in_data[x]['va_internal_degree'], controllable=in_data[x]['controllable'], in_service=in_service)
         
 
-        if (in_data[x]['typ'].startswith("Storage")):
+        if _kind == 'storage':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2600,7 +2540,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[stor_nm] = uf_storage
    
-        if (in_data[x]['typ'].startswith("Load DC")):
+        if _kind == 'load_dc':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2617,7 +2557,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[load_dc_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("Source DC")):
+        if _kind == 'source_dc':
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 continue
@@ -2634,7 +2574,8 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[source_dc_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("Switch")):
+        if _kind == 'switch':
+            _elements.flush()  # pp.create_switch checks that the switched line/trafo exists
             bus_idx = Busbars.get(in_data[x]['bus'])
             if bus_idx is None:
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -2691,7 +2632,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[switch_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("VSC")):
+        if _kind == 'vsc':
             # VSC requires pandapower 3.1+ with DC grid support
             if not hasattr(pp, 'create_vsc'):
                 element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
@@ -2743,7 +2684,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[vsc_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("B2B VSC")):
+        if _kind == 'b2b_vsc':
             element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
             
             # B2B VSC can work in two modes:
@@ -2830,7 +2771,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[b2b_vsc_name] = user_friendly_name
         
-        if (in_data[x]['typ'].startswith("DC Line")):
+        if _kind == 'dc_line':
             element_name = in_data[x].get('userFriendlyName', in_data[x].get('name', 'Unknown'))
             bus_from = in_data[x].get('busFrom')
             bus_to = in_data[x].get('busTo')
@@ -2939,6 +2880,7 @@ def create_other_elements(in_data,net,x, Busbars):
                 net.user_friendly_names = {}
             net.user_friendly_names[dcline_name] = element_name
 
+    _elements.flush()
     _electrisim_finalize_pending_line_flow_shunts(net)
     apply_sgen_q_capability_curves(net, in_data)
 
@@ -2993,7 +2935,8 @@ def _resolve_controller_family_flags(payload, legacy_key='run_control'):
 
 
 def powerflow(net, algorithm, calculate_voltage_angles, init, export_python=False, in_data=None, Busbars=None,
-              run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False):
+              run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False,
+              result_format=result_columns.ROWS):
             #pandapower - rozpływ mocy
             # Initialize tap_control_results before try block so it's accessible in else block
             tap_control_results = []
@@ -3011,7 +2954,8 @@ def powerflow(net, algorithm, calculate_voltage_angles, init, export_python=Fals
             
             try:
                 # Check for isolated buses before running power flow
-                isolated_buses = pp.topology.unsupplied_buses(net)
+                with stage_timing.stage('topology'):
+                    isolated_buses = pp.topology.unsupplied_buses(net)
                 if len(isolated_buses) > 0:
                     raise ValueError(f"Isolated buses found: {isolated_buses}. Check your network connectivity.")
                 
@@ -3153,8 +3097,9 @@ def powerflow(net, algorithm, calculate_voltage_angles, init, export_python=Fals
                 else:
                     print(f"Running power flow WITHOUT controllers (run_pp_control={run_pp_control})")
                 
-                pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init,
-                         run_control=run_pp_control, **_electrisim_enforce_q_lims_kw(net))
+                with stage_timing.stage('solve'):
+                    pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init,
+                             run_control=run_pp_control, **_electrisim_enforce_q_lims_kw(net))
                 
                 # Check if tap positions changed
                 if run_pp_control and (initial_tap_positions or initial_tap3w_positions):
@@ -3592,1109 +3537,20 @@ def powerflow(net, algorithm, calculate_voltage_angles, init, export_python=Fals
                         diagnostic_response["message"] = f"Network connectivity issue: {num_isolated} isolated bus(es) found. All buses must be connected to an External Grid."
                 
                 # Convert diagnostic response to JSON string (same format as successful response)
-                # Use a custom encoder to handle numpy types
-                def convert_numpy_types(obj):
-                    """Recursively convert numpy types to native Python types for JSON serialization"""
-                    if isinstance(obj, (np.integer, np.int64, np.int32, np.int16, np.int8)):
-                        return int(obj)
-                    elif isinstance(obj, (np.floating, np.float64, np.float32, np.float16)):
-                        return float(obj)
-                    elif isinstance(obj, np.ndarray):
-                        return obj.tolist()
-                    elif isinstance(obj, dict):
-                        return {key: convert_numpy_types(value) for key, value in obj.items()}
-                    elif isinstance(obj, (list, tuple)):
-                        return [convert_numpy_types(item) for item in obj]
-                    elif isinstance(obj, set):
-                        return [convert_numpy_types(item) for item in obj]
-                    return obj
-                
-                # Convert any remaining numpy types
-                diagnostic_response = convert_numpy_types(diagnostic_response)
-                return json.dumps(
-                    _sanitize_for_strict_json(diagnostic_response),
-                    separators=(',', ':'),
-                    allow_nan=False,
-                )
+                return result_json.dumps(diagnostic_response)
             else:
                 # Restore stdout/stderr after successful power flow
                 sys.stdout = _orig_stdout
                 sys.stderr = _orig_stderr
-                
-                class BusbarOut(object):
-                    def __init__(self, name: str, id: str, vm_pu: float, va_degree: float, p_mw: float, q_mvar: float, pf: float, q_p: float,
-                                 p_branch_mw: float = 0.0, q_branch_mvar: float = 0.0, vm_kv: float = None):
-                        self.name = name
-                        self.id = id
-                        self.vm_pu = vm_pu
-                        self.va_degree = va_degree   
-                        self.p_mw = p_mw
-                        self.q_mvar = q_mvar  
-                        self.pf = pf #p_mw/math.sqrt(math.pow(p_mw,2)+math.pow(q_mvar,2))  
-                        self.q_p = q_p
-                        self.p_branch_mw = p_branch_mw
-                        self.q_branch_mvar = q_branch_mvar
-                        self.vm_kv = vm_kv
-                        
-                class BusbarsOut(object):
-                    def __init__(self, busbars: List[BusbarOut]):
-                        self.busbars = busbars                
-                
-                busbarList = list() 
-                
-                class LineOut(object):
-                    def __init__(self, name: str, id: str, p_from_mw: float, q_from_mvar: float, p_to_mw: float, q_to_mvar: float, i_from_ka: float, i_to_ka: float, loading_percent: float):          
-                        self.name = name 
-                        self.id = id                      
-                        self.p_from_mw = p_from_mw
-                        self.q_from_mvar = q_from_mvar 
-                        self.p_to_mw = p_to_mw 
-                        self.q_to_mvar = q_to_mvar            
-                        self.i_from_ka = i_from_ka 
-                        self.i_to_ka = i_to_ka               
-                        self.loading_percent = loading_percent 
-                       
-                class LinesOut(object):
-                    def __init__(self, lines: List[BusbarOut]):
-                        self.lines = lines
-                linesList = list()                              
-                         
-                class ExternalGridOut(object):
-                    def __init__(self,  name: str, id: str, p_mw: float, q_mvar: float, pf: float, q_p:float):        
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar  
-                        self.pf = pf            
-                        self.q_p=q_p              
-                       
-                class ExternalGridsOut(object):
-                    def __init__(self, externalgrids: List[ExternalGridOut]):
-                        self.externalgrids = externalgrids              
-                externalgridsList = list() 
-                
-                class GeneratorOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float, q_mvar: float, va_degree: float, vm_pu: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar  
-                        self.va_degree = va_degree 
-                        self.vm_pu = vm_pu                         
-                       
-                class GeneratorsOut(object):
-                    def __init__(self, generators: List[GeneratorOut]):
-                        self.generators = generators             
-                generatorsList = list()
-                
-                
-                class StaticGeneratorOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float, q_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar                                       
-                       
-                class StaticGeneratorsOut(object):
-                    def __init__(self, staticgenerators: List[StaticGeneratorOut]):
-                        self.staticgenerators = staticgenerators             
-                staticgeneratorsList = list()
-                
-                
-                class AsymmetricStaticGeneratorOut(object):
-                    def __init__(self, name: str, id: str,  p_a_mw: float, q_a_mvar: float, p_b_mw: float, q_b_mvar: float, p_c_mw: float, q_c_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_a_mw = p_a_mw 
-                        self.q_a_mvar = q_a_mvar    
-                        self.p_b_mw = p_b_mw 
-                        self.q_b_mvar = q_b_mvar  
-                        self.p_c_mw = p_c_mw 
-                        self.q_c_mvar = q_c_mvar                                     
-                       
-                class AsymmetricStaticGeneratorsOut(object):
-                    def __init__(self, asymmetricstaticgenerators: List[AsymmetricStaticGeneratorOut]):
-                        self.asymmetricstaticgenerators = asymmetricstaticgenerators             
-                asymmetricstaticgeneratorsList = list()  
-                
-                
-                class TransformerOut(object):
-                    def __init__(self, name: str, id: str, p_hv_mw: float, q_hv_mvar: float, p_lv_mw: float, q_lv_mvar: float, pl_mw: float, ql_mvar: float, i_hv_ka: float, i_lv_ka: float, vm_hv_pu: float, vm_lv_pu: float, va_hv_degree: float, va_lv_degree: float, loading_percent: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_hv_mw = p_hv_mw 
-                        self.q_hv_mvar = q_hv_mvar
-                        self.p_lv_mw = p_lv_mw                            
-                        self.q_lv_mvar = q_lv_mvar 
-                        self.pl_mw = pl_mw  
-                        self.ql_mvar = ql_mvar                         
-                        self.i_hv_ka = i_hv_ka 
-                        self.i_lv_ka = i_lv_ka
-                        self.vm_hv_pu = vm_hv_pu
-                        self.vm_lv_pu = vm_lv_pu
-                        self.va_hv_degree = va_hv_degree
-                        self.va_lv_degree = va_lv_degree
-                        self.loading_percent = loading_percent
-                                                             
-                       
-                class TransformersOut(object):
-                    def __init__(self, transformers: List[TransformerOut]):
-                        self.transformers = transformers             
-                transformersList = list() 
-                
-                
-                class Transformer3WOut(object):
-                    def __init__(self, name: str, id: str, p_hv_mw: float, q_hv_mvar: float, p_mv_mw: float, q_mv_mvar: float, 
-                                 p_lv_mw: float, q_lv_mvar: float, pl_mw: float, ql_mvar: float, i_hv_ka: float, 
-                                 i_mv_ka: float, i_lv_ka: float, vm_hv_pu: float, vm_mv_pu: float, 
-                                 vm_lv_pu: float, va_hv_degree: float, va_mv_degree: float, va_lv_degree: float, loading_percent: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_hv_mw = p_hv_mw 
-                        self.q_hv_mvar = q_hv_mvar
-                        self.p_mv_mw = p_mv_mw                            
-                        self.q_mv_mvar = q_mv_mvar 
-                        self.p_lv_mw = p_lv_mw  
-                        self.q_lv_mvar = q_lv_mvar                         
-                        self.pl_mw = pl_mw 
-                        self.ql_mvar = ql_mvar
-                        self.i_hv_ka = i_hv_ka
-                        self.i_mv_ka = i_mv_ka
-                        self.i_lv_ka = i_lv_ka
-                        self.vm_hv_pu = vm_hv_pu
-                        self.vm_mv_pu = vm_mv_pu
-                        self.vm_lv_pu = vm_lv_pu
-                        self.va_hv_degree = va_hv_degree
-                        self.va_mv_degree = va_mv_degree
-                        self.va_lv_degree = va_lv_degree
-                        self.loading_percent = loading_percent                                                             
-                       
-                class Transformers3WOut(object):
-                    def __init__(self, transformers3W: List[Transformer3WOut]):
-                        self.transformers3W = transformers3W             
-                transformers3WList = list()                 
-                
-                
-                class ShuntOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float, q_mvar: float, vm_pu: float,
-                                step=None, max_step=None):
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw
-                        self.q_mvar = q_mvar
-                        self.vm_pu = vm_pu
-                        # Discrete tap / CharacteristicControl / fixed: final step after PF (for UI Result Box)
-                        self.step = step
-                        self.max_step = max_step
-                       
-                class ShuntsOut(object):
-                    def __init__(self, shunts: List[ShuntOut]):
-                        self.shunts = shunts              
-                shuntsList = list() 
-                
-                
-                class CapacitorOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float, vm_pu: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar  
-                        self.vm_pu = vm_pu                          
-                       
-                class CapacitorsOut(object):
-                    def __init__(self, capacitors: List[CapacitorOut]):
-                        self.capacitors = capacitors              
-                capacitorsList = list()                 
-                
-                
-                class LoadOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar 
-                                                                    
-                class LoadsOut(object):
-                    def __init__(self, loads: List[LoadOut]):
-                        self.loads = loads              
-                loadsList = list() 
-                
-                
-                class AsymmetricLoadOut(object):
-                    def __init__(self, name: str, id:str, p_a_mw: float, q_a_mvar: float, p_b_mw: float, q_b_mvar: float, p_c_mw: float, q_c_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_a_mw = p_a_mw 
-                        self.q_a_mvar = q_a_mvar 
-                        self.p_b_mw = p_b_mw 
-                        self.q_b_mvar = q_b_mvar
-                        self.p_c_mw = p_c_mw 
-                        self.q_c_mvar = q_c_mvar
-                                                                    
-                class AsymmetricLoadsOut(object):
-                    def __init__(self, asymmetricloads: List[AsymmetricLoadOut]):
-                        self.asymmetricloads = asymmetricloads              
-                asymmetricloadsList = list() 
-                
-                
-                class ImpedanceOut(object):
-                    def __init__(self, name: str, id:str, p_from_mw: float, q_from_mvar: float, p_to_mw: float, q_to_mvar: float, pl_mw: float, ql_mvar: float, i_from_ka: float, i_to_ka: float ):          
-                        self.name = name
-                        self.id = id
-                        self.p_from_mw = p_from_mw 
-                        self.q_from_mvar = q_from_mvar 
-                        self.p_to_mw = p_to_mw 
-                        self.q_to_mvar = q_to_mvar
-                        self.pl_mw = pl_mw 
-                        self.ql_mvar = ql_mvar
-                        self.i_from_ka = i_from_ka 
-                        self.i_to_ka = i_to_ka                        
-                                                                    
-                class ImpedancesOut(object):
-                    def __init__(self, impedances: List[ImpedanceOut]):
-                        self.impedances = impedances              
-                impedancesList = list() 
-                
-                
-                class WardOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float, vm_pu: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar 
-                        self.vm_pu = vm_pu 
-                       
-                class WardsOut(object):
-                    def __init__(self, wards: List[WardOut]):
-                        self.wards = wards              
-                wardsList = list() 
-                
-                
-                class ExtendedWardOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float, vm_pu: float):          
-                        self.name = name                        
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar 
-                        self.vm_pu = vm_pu 
-                       
-                class ExtendedWardsOut(object):
-                    def __init__(self, extendedwards: List[ExtendedWardOut]):
-                        self.extendedwards = extendedwards              
-                extendedwardsList = list() 
-                
-                
-                class MotorOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar 
-                       
-                       
-                class MotorsOut(object):
-                    def __init__(self, motors: List[MotorOut]):
-                        self.motors = motors              
-                motorsList = list()
-
-                class SVCOut(object):
-                    def __init__(self, name: str, id:str, thyristor_firing_angle_degree: float, x_ohm: float, q_mvar: float, vm_pu: float, va_degree: float):          
-                        self.name = name
-                        self.id = id
-                        self.thyristor_firing_angle_degree = thyristor_firing_angle_degree 
-                        self.x_ohm = x_ohm   
-                        self.q_mvar = q_mvar
-                        self.vm_pu = vm_pu
-                        self.va_degree = va_degree      
-                       
-                class SVCsOut(object):
-                    def __init__(self, svcs: List[SVCOut]):
-                        self.svcs = svcs              
-                SVCsList = list()
-
-                class TCSCOut(object):
-                    def __init__(self, name: str, id:str, thyristor_firing_angle_degree: float, x_ohm: float, p_from_mw: float, q_from_mvar: float, p_to_mw: float, q_to_mvar: float, p_l_mw: float, q_l_mvar: float, vm_from_pu: float, va_from_degree: float, vm_to_pu: float, va_to_degree: float ):          
-                        self.name = name
-                        self.id = id
-                        self.thyristor_firing_angle_degree = thyristor_firing_angle_degree 
-                        self.x_ohm = x_ohm
-                        self.p_from_mw = p_from_mw 
-                        self.q_from_mvar = q_from_mvar
-                        self.p_to_mw = p_to_mw 
-                        self.q_to_mvar = q_to_mvar
-                        self.p_l_mw = p_l_mw 
-                        self.q_l_mvar = q_l_mvar
-                        self.vm_from_pu = vm_from_pu 
-                        self.va_from_degree = va_from_degree
-                        self.vm_to_pu = vm_to_pu 
-                        self.va_to_degree = va_to_degree                        
-                       
-                class TCSCsOut(object):
-                    def __init__(self, tcscs: List[TCSCOut]):
-                        self.tcscs = tcscs              
-                TCSCsList = list()
 
-                
-                class SSCOut(object):
-                    def __init__(self, name: str, id:str, q_mvar: float, vm_internal_pu: float, va_internal_degree: float, vm_pu: float, va_degree: float):          
-                        self.name = name
-                        self.id = id
-                        self.q_mvar = q_mvar 
-                        self.vm_internal_pu = vm_internal_pu
-                        self.va_internal_degree = va_internal_degree
-                        self.vm_pu = vm_pu
-                        self.va_degree = va_degree                       
-                       
-                class SSCsOut(object):
-                    def __init__(self, sscs: List[SSCOut]):
-                        self.sscs = sscs              
-                sscsList = list()
-                
-                
-                
-                class StorageOut(object):
-                    def __init__(self, name: str, id:str, p_mw: float, q_mvar: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw 
-                        self.q_mvar = q_mvar 
-                       
-                       
-                class StoragesOut(object):
-                    def __init__(self, storages: List[StorageOut]):
-                        self.storages = storages              
-                storagesList = list() 
-                
-                
-                class DClineOut(object):
-                    def __init__(self, name: str, id:str, p_from_mw: float, q_from_mvar: float, p_to_mw: float, q_to_mvar: float, pl_mw: float, vm_from_pu: float, va_from_degree: float, vm_to_pu: float, va_to_degree: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_from_mw = p_from_mw 
-                        self.q_from_mvar = q_from_mvar 
-                        self.p_to_mw = p_to_mw 
-                        self.q_to_mvar = q_to_mvar
-                        self.pl_mw = pl_mw                       
-                        self.vm_from_pu = vm_from_pu 
-                        self.va_from_degree = va_from_degree 
-                        self.vm_to_pu = vm_to_pu 
-                        self.va_to_degree = va_to_degree                           
-                                                                    
-                class DClinesOut(object):
-                    def __init__(self, dclines: List[DClineOut]):
-                        self.dclines = dclines              
-                dclinesList = list()
-                
-                class DcBusOut(object):
-                    def __init__(self, name: str, id: str, vm_pu: float, p_mw: float):          
-                        self.name = name
-                        self.id = id
-                        self.vm_pu = vm_pu
-                        self.p_mw = p_mw
-                       
-                class DcBusesOut(object):
-                    def __init__(self, dcbuses: List[DcBusOut]):
-                        self.dcbuses = dcbuses              
-                dcbusesList = list()
-                
-                class LoadDcOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw
-                       
-                class LoadsDcOut(object):
-                    def __init__(self, loadsdc: List[LoadDcOut]):
-                        self.loadsdc = loadsdc              
-                loadsdcList = list()
-                
-                class SourceDcOut(object):
-                    def __init__(self, name: str, id: str, vm_pu: float, p_mw: float):          
-                        self.name = name
-                        self.id = id
-                        self.vm_pu = vm_pu
-                        self.p_mw = p_mw
-                       
-                class SourcesDcOut(object):
-                    def __init__(self, sourcesdc: List[SourceDcOut]):
-                        self.sourcesdc = sourcesdc              
-                sourcesdcList = list()
-                
-                class SwitchOut(object):
-                    def __init__(self, name: str, id: str, closed: bool, i_ka: float,
-                                 p_from_mw: float = 0.0, q_from_mvar: float = 0.0,
-                                 p_to_mw: float = 0.0, q_to_mvar: float = 0.0,
-                                 loading_percent: float = 0.0):
-                        self.name = name
-                        self.id = id
-                        self.closed = closed
-                        self.i_ka = i_ka
-                        self.p_from_mw = p_from_mw
-                        self.q_from_mvar = q_from_mvar
-                        self.p_to_mw = p_to_mw
-                        self.q_to_mvar = q_to_mvar
-                        self.loading_percent = loading_percent
-                       
-                class SwitchesOut(object):
-                    def __init__(self, switches: List[SwitchOut]):
-                        self.switches = switches              
-                switchesList = list()
-                
-                class VSCOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float, vm_pu: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw
-                        self.vm_pu = vm_pu
-                       
-                class VSCsOut(object):
-                    def __init__(self, vscs: List[VSCOut]):
-                        self.vscs = vscs              
-                vscsList = list()
-                
-                class B2bVSCOut(object):
-                    def __init__(self, name: str, id: str, p_mw: float, vm1_pu: float, vm2_pu: float):          
-                        self.name = name
-                        self.id = id
-                        self.p_mw = p_mw
-                        self.vm1_pu = vm1_pu
-                        self.vm2_pu = vm2_pu
-                       
-                class B2bVSCsOut(object):
-                    def __init__(self, b2bvscs: List[B2bVSCOut]):
-                        self.b2bvscs = b2bvscs              
-                b2bvscsList = list() 
-                
-                
-                #Bus
-                for index, row in net.res_bus.iterrows():
-                    p_mw = row['p_mw']
-                    q_mvar = row['q_mvar']
-                    denom_pf = math.sqrt(math.pow(p_mw, 2) + math.pow(q_mvar, 2))
-                    if denom_pf != 0 and not math.isnan(denom_pf):
-                        pf = p_mw / denom_pf
-                    else:
-                        pf = 0.0
-                    if math.isnan(pf):
-                        pf = 0.0
-                    if p_mw != 0 and not math.isnan(p_mw):
-                        q_p = q_mvar / p_mw
+                # One vectorized pass over net.res_* joined with the static tables; the columnar layout
+                # (resultFormat='columnar') sends the same tables as one array per field.
+                with stage_timing.stage('extract'):
+                    if result_format == result_columns.COLUMNAR:
+                        result = result_columns.powerflow_tables(net, _electrisim_switch_res_for_output)
                     else:
-                        q_p = 0.0
-                    if math.isnan(q_p) or math.isinf(q_p):
-                        q_p = 0.0
-                    p_br, q_br = _electrisim_bus_branch_p_q_sum(net, index)
-                    _vm_pu = row['vm_pu']
-                    _vn_kv = float(net.bus.at[index, 'vn_kv'])
-                    _vm_kv = None
-                    if _vn_kv > 0 and _vm_pu == _vm_pu and not math.isnan(_vm_pu):
-                        _vm_kv = float(_vm_pu) * _vn_kv
-                    busbar = BusbarOut(
-                        name=net.bus._get_value(index, 'name'), id=net.bus._get_value(index, 'id'),
-                        vm_pu=_vm_pu, va_degree=row['va_degree'],
-                        p_mw=p_mw, q_mvar=q_mvar, pf=pf, q_p=q_p,
-                        p_branch_mw=p_br, q_branch_mvar=q_br,
-                        vm_kv=_vm_kv,
-                    )
-                    busbarList.append(busbar) 
-                    busbars = BusbarsOut(busbars = busbarList)
-                
-                #Line
-                if(net.res_line.empty):
-                        result = {**busbars.__dict__}                  
-                else:                    
-                        for index, row in net.res_line.iterrows():    
-                            line = LineOut(name=net.line._get_value(index, 'name'), id = net.line._get_value(index, 'id'), p_from_mw=row['p_from_mw'], q_from_mvar=row['q_from_mvar'], p_to_mw=row['p_to_mw'], q_to_mvar=row['q_to_mvar'], i_from_ka=row['i_from_ka'], i_to_ka=row['i_to_ka'], loading_percent=row['loading_percent'])        
-                            linesList.append(line) 
-                            lines = LinesOut(lines = linesList)
-                            
-                            result = {**busbars.__dict__, **lines.__dict__} #łączenie dwóch dictionaries                        
-                     
-                
-                #External Grid
-                if(net.res_ext_grid.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_ext_grid.iterrows():    
-                            externalgrid = ExternalGridOut(name=net.ext_grid._get_value(index, 'name'), id = net.ext_grid._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'], pf = row['p_mw']/math.sqrt(math.pow(row['p_mw'],2)+math.pow(row['q_mvar'],2)), q_p=row['q_mvar']/row['p_mw'])        
-                            externalgridsList.append(externalgrid) 
-                            externalgrids = ExternalGridsOut(externalgrids = externalgridsList) 
-                        result = {**result, **externalgrids.__dict__}          
-                             
-                #Generator         
-                if(net.res_gen.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_gen.iterrows():    
-                            generator = GeneratorOut(name=net.gen._get_value(index, 'name'), id = net.gen._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'], va_degree=row['va_degree'], vm_pu=row['vm_pu'])        
-                            generatorsList.append(generator) 
-                            generators = GeneratorsOut(generators = generatorsList)
-                        
-                        result = {**result, **generators.__dict__}
-                        
-                #Static Generator                     
-                if(net.res_sgen.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_sgen.iterrows():    
-                            staticgenerator = StaticGeneratorOut(name=net.sgen._get_value(index, 'name'), id = net.sgen._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'])        
-                            staticgeneratorsList.append(staticgenerator) 
-                            staticgenerators = StaticGeneratorsOut(staticgenerators = staticgeneratorsList)
-                        
-                        result = {**result, **staticgenerators.__dict__}
-                        
-                        
-                
-                #Asymmetric Static Generator                     
-                if(net.res_asymmetric_sgen.empty):
-                    pass
-                else:
-                        available_columns = net.res_asymmetric_sgen.columns.tolist()
-                        
-                        # Check if phase-specific columns exist
-                        has_phase_specific = all(col in available_columns for col in ['p_a_mw', 'q_a_mvar', 'p_b_mw', 'q_b_mvar', 'p_c_mw', 'q_c_mvar'])
-                        has_aggregate = all(col in available_columns for col in ['p_mw', 'q_mvar'])
-                        
-                        if has_phase_specific:
-                            # Use phase-specific results if available
-                            for index, row in net.res_asymmetric_sgen.iterrows():    
-                                asymmetricstaticgenerator = AsymmetricStaticGeneratorOut(
-                                    name=net.asymmetric_sgen._get_value(index, 'name'), 
-                                    id=net.asymmetric_sgen._get_value(index, 'id'), 
-                                    p_a_mw=row['p_a_mw'], 
-                                    q_a_mvar=row['q_a_mvar'], 
-                                    p_b_mw=row['p_b_mw'], 
-                                    q_b_mvar=row['q_b_mvar'], 
-                                    p_c_mw=row['p_c_mw'], 
-                                    q_c_mvar=row['q_c_mvar']
-                                )        
-                                asymmetricstaticgeneratorsList.append(asymmetricstaticgenerator)
-                        elif has_aggregate:
-                            # If only aggregate results available, distribute based on input phase distribution
-                            for index, row in net.res_asymmetric_sgen.iterrows():
-                                # Get input phase values to determine distribution
-                                p_a_input = float(net.asymmetric_sgen._get_value(index, 'p_a_mw'))
-                                p_b_input = float(net.asymmetric_sgen._get_value(index, 'p_b_mw'))
-                                p_c_input = float(net.asymmetric_sgen._get_value(index, 'p_c_mw'))
-                                q_a_input = float(net.asymmetric_sgen._get_value(index, 'q_a_mvar'))
-                                q_b_input = float(net.asymmetric_sgen._get_value(index, 'q_b_mvar'))
-                                q_c_input = float(net.asymmetric_sgen._get_value(index, 'q_c_mvar'))
-                                
-                                # Calculate total input power for distribution
-                                p_total_input = abs(p_a_input) + abs(p_b_input) + abs(p_c_input)
-                                q_total_input = abs(q_a_input) + abs(q_b_input) + abs(q_c_input)
-                                
-                                # Get aggregate results
-                                p_total = float(row['p_mw'])
-                                q_total = float(row['q_mvar'])
-                                
-                                # Distribute results proportionally based on input phase distribution
-                                if p_total_input > 0:
-                                    p_a_mw = p_total * (abs(p_a_input) / p_total_input)
-                                    p_b_mw = p_total * (abs(p_b_input) / p_total_input)
-                                    p_c_mw = p_total * (abs(p_c_input) / p_total_input)
-                                else:
-                                    # If no input power, distribute equally
-                                    p_a_mw = p_total / 3.0
-                                    p_b_mw = p_total / 3.0
-                                    p_c_mw = p_total / 3.0
-                                
-                                if q_total_input > 0:
-                                    q_a_mvar = q_total * (abs(q_a_input) / q_total_input)
-                                    q_b_mvar = q_total * (abs(q_b_input) / q_total_input)
-                                    q_c_mvar = q_total * (abs(q_c_input) / q_total_input)
-                                else:
-                                    # If no input reactive power, distribute equally
-                                    q_a_mvar = q_total / 3.0
-                                    q_b_mvar = q_total / 3.0
-                                    q_c_mvar = q_total / 3.0
-                                
-                                asymmetricstaticgenerator = AsymmetricStaticGeneratorOut(
-                                    name=net.asymmetric_sgen._get_value(index, 'name'), 
-                                    id=net.asymmetric_sgen._get_value(index, 'id'), 
-                                    p_a_mw=p_a_mw, 
-                                    q_a_mvar=q_a_mvar, 
-                                    p_b_mw=p_b_mw, 
-                                    q_b_mvar=q_b_mvar, 
-                                    p_c_mw=p_c_mw, 
-                                    q_c_mvar=q_c_mvar
-                                )        
-                                asymmetricstaticgeneratorsList.append(asymmetricstaticgenerator)
-                        else:
-                            print(f"Warning: res_asymmetric_sgen has unexpected column structure. Available columns: {available_columns}")
-                            pass
-                        
-                        if asymmetricstaticgeneratorsList:
-                            asymmetricstaticgenerators = AsymmetricStaticGeneratorsOut(asymmetricstaticgenerators = asymmetricstaticgeneratorsList)
-                            result = {**result, **asymmetricstaticgenerators.__dict__}
-                        
-               
-                # Transformer — one JSON row per net.trafo (frontend updates every 2W trafo on the diagram).
-                # net.res_trafo can omit rows (out-of-service, unsupplied, etc.); iterating only res_trafo left those shapes without results.
-                if not net.trafo.empty:
-                    res_tf = getattr(net, 'res_trafo', None)
-                    for trafo_index in net.trafo.index:
-                        t_name = net.trafo._get_value(trafo_index, 'name')
-                        t_raw_id = net.trafo._get_value(trafo_index, 'id')
-                        t_name_s = str(t_name) if t_name is not None and not pd.isna(t_name) else str(trafo_index)
-                        t_id = _trafo_out_id(t_raw_id, t_name, trafo_index)
-                        row = _pf_res_row_for_element(net.trafo, res_tf, trafo_index)
-                        if row is not None:
-                            transformer = TransformerOut(
-                                name=t_name_s,
-                                id=t_id,
-                                p_hv_mw=row['p_hv_mw'],
-                                q_hv_mvar=row['q_hv_mvar'],
-                                p_lv_mw=row['p_lv_mw'],
-                                q_lv_mvar=row['q_lv_mvar'],
-                                pl_mw=row['pl_mw'],
-                                ql_mvar=row['ql_mvar'],
-                                i_hv_ka=row['i_hv_ka'],
-                                i_lv_ka=row['i_lv_ka'],
-                                vm_hv_pu=row['vm_hv_pu'],
-                                vm_lv_pu=row['vm_lv_pu'],
-                                va_hv_degree=row['va_hv_degree'],
-                                va_lv_degree=row['va_lv_degree'],
-                                loading_percent=row['loading_percent'],
-                            )
-                        else:
-                            transformer = TransformerOut(
-                                name=t_name_s,
-                                id=t_id,
-                                p_hv_mw=0.0,
-                                q_hv_mvar=0.0,
-                                p_lv_mw=0.0,
-                                q_lv_mvar=0.0,
-                                pl_mw=0.0,
-                                ql_mvar=0.0,
-                                i_hv_ka=0.0,
-                                i_lv_ka=0.0,
-                                vm_hv_pu=1.0,
-                                vm_lv_pu=1.0,
-                                va_hv_degree=0.0,
-                                va_lv_degree=0.0,
-                                loading_percent=0.0,
-                            )
-                        transformersList.append(transformer)
-                    if transformersList:
-                        transformers = TransformersOut(transformers=transformersList)
-                        result = {**result, **transformers.__dict__}
-
-                # Three-winding transformer — same pattern as 2W
-                if hasattr(net, 'trafo3w') and not net.trafo3w.empty:
-                    res_t3 = getattr(net, 'res_trafo3w', None)
-                    for t3_index in net.trafo3w.index:
-                        t_name = net.trafo3w._get_value(t3_index, 'name')
-                        t_raw_id = net.trafo3w._get_value(t3_index, 'id')
-                        t_name_s = str(t_name) if t_name is not None and not pd.isna(t_name) else str(t3_index)
-                        t_id = _trafo_out_id(t_raw_id, t_name, t3_index)
-                        row = _pf_res_row_for_element(net.trafo3w, res_t3, t3_index)
-                        if row is not None:
-                            transformer3W = Transformer3WOut(
-                                name=t_name_s,
-                                id=t_id,
-                                p_hv_mw=row['p_hv_mw'],
-                                q_hv_mvar=row['q_hv_mvar'],
-                                p_mv_mw=row['p_mv_mw'],
-                                q_mv_mvar=row['q_mv_mvar'],
-                                p_lv_mw=row['p_lv_mw'],
-                                q_lv_mvar=row['q_lv_mvar'],
-                                pl_mw=row['pl_mw'],
-                                ql_mvar=row['ql_mvar'],
-                                i_hv_ka=row['i_hv_ka'],
-                                i_mv_ka=row['i_mv_ka'],
-                                i_lv_ka=row['i_lv_ka'],
-                                vm_hv_pu=row['vm_hv_pu'],
-                                vm_mv_pu=row['vm_mv_pu'],
-                                vm_lv_pu=row['vm_lv_pu'],
-                                va_hv_degree=row['va_hv_degree'],
-                                va_mv_degree=row['va_mv_degree'],
-                                va_lv_degree=row['va_lv_degree'],
-                                loading_percent=row['loading_percent'],
-                            )
-                        else:
-                            transformer3W = Transformer3WOut(
-                                name=t_name_s,
-                                id=t_id,
-                                p_hv_mw=0.0,
-                                q_hv_mvar=0.0,
-                                p_mv_mw=0.0,
-                                q_mv_mvar=0.0,
-                                p_lv_mw=0.0,
-                                q_lv_mvar=0.0,
-                                pl_mw=0.0,
-                                ql_mvar=0.0,
-                                i_hv_ka=0.0,
-                                i_mv_ka=0.0,
-                                i_lv_ka=0.0,
-                                vm_hv_pu=1.0,
-                                vm_mv_pu=1.0,
-                                vm_lv_pu=1.0,
-                                va_hv_degree=0.0,
-                                va_mv_degree=0.0,
-                                va_lv_degree=0.0,
-                                loading_percent=0.0,
-                            )
-                        transformers3WList.append(transformer3W)
-                    if transformers3WList:
-                        transformers3W = Transformers3WOut(transformers3W=transformers3WList)
-                        result = {**result, **transformers3W.__dict__}
-               
-               
-
-                
-                #Shunt reactor
-                if(net.res_shunt.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_shunt.iterrows():
-                            #if (row['q_mvar'] >= 0):
-                            if (net.shunt._get_value(index, 'typ') == 'shuntreactor'):
-                                try:
-                                    sw = net.shunt._get_value(index, 'step')
-                                    smx = net.shunt._get_value(index, 'max_step')
-                                    step_pf = float(sw) if sw is not None and not pd.isna(sw) else None
-                                    max_pf = float(smx) if smx is not None and not pd.isna(smx) else None
-                                except Exception:
-                                    step_pf = max_pf = None
-                                shunt = ShuntOut(
-                                    name=net.shunt._get_value(index, 'name'), id = net.shunt._get_value(index, 'id'),
-                                    p_mw=row['p_mw'], q_mvar=row['q_mvar'], vm_pu = row['vm_pu'],
-                                    step=step_pf, max_step=max_pf,
-                                )
-                                shuntsList.append(shunt)
-                                shunts = ShuntsOut(shunts = shuntsList) 
-                                result = {**result, **shunts.__dict__}  
-                        
-                #Capacitor
-                if(net.res_shunt.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_shunt.iterrows(): 
-                            if (net.shunt._get_value(index, 'typ') == 'capacitor'):  # q is always negative for capacitor
-                                capacitor = CapacitorOut(name=net.shunt._get_value(index, 'name'), id = net.shunt._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'], vm_pu = row['vm_pu'])        
-                                capacitorsList.append(capacitor) 
-                                capacitors = CapacitorsOut(capacitors = capacitorsList) 
-                                result = {**result, **capacitors.__dict__}  
-                
-               
-                #Load
-                if(net.res_load.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_load.iterrows():    
-                            load = LoadOut(name=net.load._get_value(index, 'name'), id = net.load._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'])        
-                            # print(load)  # Comment out this debug line
-                            loadsList.append(load) 
-                            # print(loadsList)  # Comment out this debug line
-                            loads = LoadsOut(loads = loadsList) 
-                        result = {**result, **loads.__dict__}        
-                        
-                #Asymmetric Load
-                if(net.res_asymmetric_load.empty):
-                    pass
-                else:
-                        available_columns = net.res_asymmetric_load.columns.tolist()
-                        
-                        # Check if phase-specific columns exist
-                        has_phase_specific = all(col in available_columns for col in ['p_a_mw', 'q_a_mvar', 'p_b_mw', 'q_b_mvar', 'p_c_mw', 'q_c_mvar'])
-                        has_aggregate = all(col in available_columns for col in ['p_mw', 'q_mvar'])
-                        
-                        if has_phase_specific:
-                            # Use phase-specific results if available
-                            for index, row in net.res_asymmetric_load.iterrows():    
-                                asymmetricload = AsymmetricLoadOut(
-                                    name=net.asymmetric_load._get_value(index, 'name'), 
-                                    id=net.asymmetric_load._get_value(index, 'id'), 
-                                    p_a_mw=row['p_a_mw'], 
-                                    q_a_mvar=row['q_a_mvar'], 
-                                    p_b_mw=row['p_b_mw'], 
-                                    q_b_mvar=row['q_b_mvar'], 
-                                    p_c_mw=row['p_c_mw'], 
-                                    q_c_mvar=row['q_c_mvar']
-                                )        
-                                asymmetricloadsList.append(asymmetricload)
-                        elif has_aggregate:
-                            # If only aggregate results available, distribute based on input phase distribution
-                            for index, row in net.res_asymmetric_load.iterrows():
-                                # Get input phase values to determine distribution
-                                p_a_input = float(net.asymmetric_load._get_value(index, 'p_a_mw'))
-                                p_b_input = float(net.asymmetric_load._get_value(index, 'p_b_mw'))
-                                p_c_input = float(net.asymmetric_load._get_value(index, 'p_c_mw'))
-                                q_a_input = float(net.asymmetric_load._get_value(index, 'q_a_mvar'))
-                                q_b_input = float(net.asymmetric_load._get_value(index, 'q_b_mvar'))
-                                q_c_input = float(net.asymmetric_load._get_value(index, 'q_c_mvar'))
-                                
-                                # Calculate total input power for distribution
-                                p_total_input = abs(p_a_input) + abs(p_b_input) + abs(p_c_input)
-                                q_total_input = abs(q_a_input) + abs(q_b_input) + abs(q_c_input)
-                                
-                                # Get aggregate results
-                                p_total = float(row['p_mw'])
-                                q_total = float(row['q_mvar'])
-                                
-                                # Distribute results proportionally based on input phase distribution
-                                if p_total_input > 0:
-                                    p_a_mw = p_total * (abs(p_a_input) / p_total_input)
-                                    p_b_mw = p_total * (abs(p_b_input) / p_total_input)
-                                    p_c_mw = p_total * (abs(p_c_input) / p_total_input)
-                                else:
-                                    # If no input power, distribute equally
-                                    p_a_mw = p_total / 3.0
-                                    p_b_mw = p_total / 3.0
-                                    p_c_mw = p_total / 3.0
-                                
-                                if q_total_input > 0:
-                                    q_a_mvar = q_total * (abs(q_a_input) / q_total_input)
-                                    q_b_mvar = q_total * (abs(q_b_input) / q_total_input)
-                                    q_c_mvar = q_total * (abs(q_c_input) / q_total_input)
-                                else:
-                                    # If no input reactive power, distribute equally
-                                    q_a_mvar = q_total / 3.0
-                                    q_b_mvar = q_total / 3.0
-                                    q_c_mvar = q_total / 3.0
-                                
-                                asymmetricload = AsymmetricLoadOut(
-                                    name=net.asymmetric_load._get_value(index, 'name'), 
-                                    id=net.asymmetric_load._get_value(index, 'id'), 
-                                    p_a_mw=p_a_mw, 
-                                    q_a_mvar=q_a_mvar, 
-                                    p_b_mw=p_b_mw, 
-                                    q_b_mvar=q_b_mvar, 
-                                    p_c_mw=p_c_mw, 
-                                    q_c_mvar=q_c_mvar
-                                )        
-                                asymmetricloadsList.append(asymmetricload)
-                        else:
-                            print(f"Warning: res_asymmetric_load has unexpected column structure. Available columns: {available_columns}")
-                            pass
-                        
-                        if asymmetricloadsList:
-                            asymmetricloads = AsymmetricLoadsOut(asymmetricloads = asymmetricloadsList) 
-                            result = {**result, **asymmetricloads.__dict__}    
-                        
-                        
-                #Impedance
-                if(net.res_impedance.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_impedance.iterrows():    
-                            impedance = ImpedanceOut(name=net.impedance._get_value(index, 'name'), id = net.impedance._get_value(index, 'id'), p_from_mw=row['p_from_mw'], q_from_mvar=row['q_from_mvar'], p_to_mw=row['p_to_mw'], q_to_mvar=row['q_to_mvar'], pl_mw=row['pl_mw'], ql_mvar=row['ql_mvar'], i_from_ka=row['i_from_ka'], i_to_ka=row['i_to_ka'])        
-                            impedancesList.append(impedance) 
-                            impedances = ImpedancesOut(impedances = impedancesList) 
-                        result = {**result, **impedances.__dict__} 
-                        
-                
-                #Ward
-                if(net.res_ward.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_ward.iterrows():    
-                            ward = WardOut(name=net.ward._get_value(index, 'name'), id = net.ward._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'], vm_pu=row['vm_pu'])        
-                            wardsList.append(ward) 
-                            wards = WardsOut(wards = wardsList) 
-                        result = {**result, **wards.__dict__} 
-                        
-                        
-                #Extended Ward
-                if(net.res_xward.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_xward.iterrows():    
-                            extendedward = ExtendedWardOut(name=net.xward._get_value(index, 'name'), id = net.xward._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'], vm_pu=row['vm_pu'])        
-                            extendedwardsList.append(extendedward) 
-                            extendedwards = ExtendedWardsOut(extendedwards = extendedwardsList) 
-                        result = {**result, **extendedwards.__dict__} 
-                        
-                        
-                #Motor
-                if(net.res_motor.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_motor.iterrows():    
-                            motor = MotorOut(name=net.motor._get_value(index, 'name'), id = net.motor._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'])        
-                            motorsList.append(motor) 
-                            motors = MotorsOut(motors = motorsList) 
-                        result = {**result, **motors.__dict__} 
-                        
-                #Storage
-                if(net.res_storage.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_storage.iterrows():    
-                            storage = StorageOut(name=net.storage._get_value(index, 'name'), id = net.storage._get_value(index, 'id'), p_mw=row['p_mw'], q_mvar=row['q_mvar'])        
-                            storagesList.append(storage) 
-                            storages = StoragesOut(storages = storagesList) 
-                        result = {**result, **storages.__dict__}
-
-
-                #SVC
-                try:                    
-                    for index, row in net.res_svc.iterrows():    
-                        svc = SVCOut(name=net.svc._get_value(index, 'name'), id = net.svc._get_value(index, 'id'), thyristor_firing_angle_degree=row['thyristor_firing_angle_degree'], x_ohm=row['x_ohm'], q_mvar=row['q_mvar'], vm_pu=row['vm_pu'], va_degree=row['va_degree'] )        
-                        SVCsList.append(svc) 
-                        svcs = SVCsOut(svcs = SVCsList) 
-                    result = {**result, **svcs.__dict__}
-                       
-                except AttributeError:  
-                    pass
-                except UnboundLocalError:
-                    pass
-                        
-                #TCSC   
-                try:
-                    for index, row in net.res_tcsc.iterrows():    
-                            tcsc = TCSCOut(name=net.tcsc._get_value(index, 'name'), id = net.tcsc._get_value(index, 'id'), thyristor_firing_angle_degree=row['thyristor_firing_angle_degree'], x_ohm=row['x_ohm'], p_from_mw=row['p_from_mw'], q_from_mvar=row['q_from_mvar'], p_to_mw=row['p_to_mw'], q_to_mvar=row['q_to_mvar'], p_l_mw=row['p_l_mw'], q_l_mvar=row['q_l_mvar'], vm_from_pu=row['vm_from_pu'], va_from_degree=row['va_from_degree'], vm_to_pu=row['vm_to_pu'], va_to_degree=row['va_to_degree']  )        
-                            TCSCsList.append(tcsc) 
-                            tcscs = TCSCsOut(tcscs = TCSCsList) 
-                    result = {**result, **tcscs.__dict__} 
-                     
-                except AttributeError:  
-                    pass
-                except UnboundLocalError:
-                    pass
+                        result = result_columns.powerflow_rows(net, _electrisim_switch_res_for_output)
 
-                                               
-                #SSC
-                
-                #try:
-                #    for index, row in net.res_ssc.iterrows():    
-                #            ssc = SSCOut(name=net.ssc._get_value(index, 'name'), id = net.ssc._get_value(index, 'id'), q_mvar=row['q_mvar'], vm_internal_pu=row['vm_internal_pu'], va_internal_degree=row['va_internal_degree'], vm_pu=row['vm_pu'], va_degree=row['va_degree'])        
-                #            sscsList.append(ssc) 
-                #            sscs = SSCsOut(sscs = sscsList) 
-                #    result = {**result, **sscs.__dict__}
-                #except AttributeError:  
-                #SSC    print("no SSC in the model")  
-                     
-                #SSC
-                if(net.res_ssc.empty):
-                    pass
-                else:                    
-                    for index, row in net.res_ssc.iterrows():    
-                        ssc = SSCOut(name=net.ssc._get_value(index, 'name'), id = net.ssc._get_value(index, 'id'), q_mvar=row['q_mvar'], vm_internal_pu=row['vm_internal_pu'], va_internal_degree=row['va_internal_degree'], vm_pu=row['vm_pu'], va_degree=row['va_degree'])        
-                        sscsList.append(ssc) 
-                        sscs = SSCsOut(sscs = sscsList) 
-                    result = {**result, **sscs.__dict__}                    
-                       
-                                        
-                #DC Bus
-                if(hasattr(net, 'res_dc_bus') and not net.res_dc_bus.empty):
-                    for index, row in net.res_dc_bus.iterrows():    
-                        dcbus = DcBusOut(name=net.dc_bus._get_value(index, 'name'), id = net.dc_bus._get_value(index, 'id'), vm_pu=row['vm_pu'], p_mw=row['p_mw'])        
-                        dcbusesList.append(dcbus) 
-                        dcbuses = DcBusesOut(dcbuses = dcbusesList) 
-                    result = {**result, **dcbuses.__dict__}
-                
-                #Load DC
-                if(hasattr(net, 'res_load_dc') and not net.res_load_dc.empty):
-                    for index, row in net.res_load_dc.iterrows():    
-                        loaddc = LoadDcOut(name=net.load_dc._get_value(index, 'name'), id = net.load_dc._get_value(index, 'id'), p_mw=row['p_mw'])        
-                        loadsdcList.append(loaddc) 
-                        loadsdc = LoadsDcOut(loadsdc = loadsdcList) 
-                    result = {**result, **loadsdc.__dict__}
-                
-                #Source DC
-                if(hasattr(net, 'res_source_dc') and not net.res_source_dc.empty):
-                    for index, row in net.res_source_dc.iterrows():    
-                        sourcedc = SourceDcOut(name=net.source_dc._get_value(index, 'name'), id = net.source_dc._get_value(index, 'id'), vm_pu=row['vm_pu'], p_mw=row['p_mw'])        
-                        sourcesdcList.append(sourcedc) 
-                        sourcesdc = SourcesDcOut(sourcesdc = sourcesdcList) 
-                    result = {**result, **sourcesdc.__dict__}
-                
-                #Switch (net.res_switch: p_from_mw, q_from_mvar, p_to_mw, q_to_mvar, i_ka, loading_percent)
-                if(hasattr(net, 'res_switch') and not net.res_switch.empty):
-                    for index, row in net.res_switch.iterrows():    
-                        sw_name = net.switch._get_value(index, 'name')
-                        sw_id = net.switch._get_value(index, 'id') if 'id' in net.switch.columns else str(index)
-                        sw_closed = net.switch._get_value(index, 'closed') if 'closed' in net.switch.columns else True
-                        fk, fpf, fqff, fpt, fqtf, fld = _electrisim_switch_res_for_output(net, index, row)
-                        switch = SwitchOut(
-                            name=sw_name, id=sw_id, closed=sw_closed,
-                            i_ka=fk,
-                            p_from_mw=fpf, q_from_mvar=fqff,
-                            p_to_mw=fpt, q_to_mvar=fqtf,
-                            loading_percent=fld
-                        )
-                        switchesList.append(switch) 
-                        switches = SwitchesOut(switches = switchesList) 
-                    result = {**result, **switches.__dict__}
-                
-                #VSC
-                if(hasattr(net, 'res_vsc') and not net.res_vsc.empty):
-                    for index, row in net.res_vsc.iterrows():
-                        vsc_name = net.vsc.at[index, 'name'] if 'name' in net.vsc.columns else f'VSC_{index}'
-                        vsc_id = net.vsc.at[index, 'id'] if 'id' in net.vsc.columns else str(index)
-                        vsc = VSCOut(name=vsc_name, id=vsc_id, p_mw=row['p_mw'], vm_pu=row.get('vm_pu', 0.0))        
-                        vscsList.append(vsc) 
-                        vscs = VSCsOut(vscs = vscsList) 
-                    result = {**result, **vscs.__dict__}
-                
-                #B2B VSC
-                if(hasattr(net, 'res_b2b_vsc') and not net.res_b2b_vsc.empty):
-                    for index, row in net.res_b2b_vsc.iterrows():    
-                        b2b_name = net.b2b_vsc.at[index, 'name'] if 'name' in net.b2b_vsc.columns else f'B2B_VSC_{index}'
-                        b2b_id = net.b2b_vsc.at[index, 'id'] if 'id' in net.b2b_vsc.columns else str(index)
-                        b2bvsc = B2bVSCOut(name=b2b_name, id=b2b_id, p_mw=row['p_mw'], vm1_pu=row['vm1_pu'], vm2_pu=row['vm2_pu'])        
-                        b2bvscsList.append(b2bvsc) 
-                        b2bvscs = B2bVSCsOut(b2bvscs = b2bvscsList) 
-                    result = {**result, **b2bvscs.__dict__}
-                
-                #DCLine (old HVDC link element - pp.create_dcline)
-                if(net.res_dcline.empty):
-                    pass
-                else:                    
-                        for index, row in net.res_dcline.iterrows():    
-                            dcline = ImpedanceOut(name=net.dcline._get_value(index, 'name'), id = net.dcline._get_value(index, 'id'), p_from_mw=row['p_from_mw'], q_from_mvar=row['q_from_mvar'], p_to_mw=row['p_to_mw'], q_to_mvar=row['q_to_mvar'], pl_mw=row['pl_mw'], vm_from_pu=row['vm_from_pu'], va_from_degree=row['va_from_degree'], vm_to_pu=row['vm_to_pu'], va_to_degree=row['va_to_degree'] )        
-                            dclinesList.append(dcline) 
-                            dclines = ImpedancesOut(dclines = dclinesList) 
-                        result = {**result, **dclines.__dict__}         
-                
-                # DC Grid Line (line_dc element - pp.create_line_dc)
-                # This is part of DC grid modeling (bus_dc + line_dc + vsc)
-                if hasattr(net, 'res_line_dc') and not net.res_line_dc.empty:
-                    print(f"Processing res_line_dc results: {len(net.res_line_dc)} items")
-                    
-                    class LineDcOut(object):
-                        def __init__(self, name: str, id: str, p_from_mw: float, p_to_mw: float, pl_mw: float, 
-                                     vm_from_pu: float, vm_to_pu: float, i_from_ka: float, i_to_ka: float, loading_percent: float):
-                            self.name = name
-                            self.id = id
-                            self.p_from_mw = p_from_mw
-                            self.p_to_mw = p_to_mw
-                            self.pl_mw = pl_mw
-                            self.vm_from_pu = vm_from_pu
-                            self.vm_to_pu = vm_to_pu
-                            self.i_from_ka = i_from_ka
-                            self.i_to_ka = i_to_ka
-                            self.loading_percent = loading_percent
-                    
-                    class LineDcsOut(object):
-                        def __init__(self, linedcs: List[LineDcOut]):
-                            self.linedcs = linedcs
-                    
-                    linedcsList = []
-                    for index, row in net.res_line_dc.iterrows():
-                        line_dc_name = net.line_dc.at[index, 'name'] if 'name' in net.line_dc.columns else f'LineDC_{index}'
-                        line_dc_id = net.line_dc.at[index, 'id'] if 'id' in net.line_dc.columns else str(index)
-                        
-                        linedc = LineDcOut(
-                            name=line_dc_name,
-                            id=line_dc_id,
-                            p_from_mw=row.get('p_from_mw', 0.0),
-                            p_to_mw=row.get('p_to_mw', 0.0),
-                            pl_mw=row.get('pl_mw', 0.0),
-                            vm_from_pu=row.get('vm_from_pu', 0.0),
-                            vm_to_pu=row.get('vm_to_pu', 0.0),
-                            i_from_ka=row.get('i_from_ka', 0.0),
-                            i_to_ka=row.get('i_to_ka', 0.0),
-                            loading_percent=row.get('loading_percent', 0.0)
-                        )
-                        linedcsList.append(linedc)
-                    
-                    linedcs = LineDcsOut(linedcs=linedcsList)
-                    result = {**result, **linedcs.__dict__}
-                    print(f"Added {len(linedcsList)} line_dc results to response")
-                           
                 # Generate Python code if export is requested
                 if export_python and in_data and Busbars:
                     python_code = generate_pandapower_python_code(net, in_data, Busbars, algorithm, calculate_voltage_angles, init)
@@ -4714,12 +3570,7 @@ def powerflow(net, algorithm, calculate_voltage_angles, init, export_python=Fals
                 #default: If specified, default should be a function that gets called for objects that can't otherwise be serialized. It should return a JSON encodable version of the object or raise a TypeError. If not specified, TypeError is raised. 
                 # OPTIMIZED: Removed indent=4, using compact separators for ~40% size reduction
                 # Sanitize NaN/Inf so the body is strict JSON (browser JSON.parse rejects NaN tokens).
-                response = json.dumps(
-                    _sanitize_for_strict_json(result),
-                    default=_json_serialize_default,
-                    allow_nan=False,
-                    separators=(',', ':'),
-                ) 
+                response = result_json.dumps(result)
             
                 print("Response to FRONTEND CORRECT")   
                    
@@ -4819,11 +3670,13 @@ def shortcircuit(net, in_data, in_data_full=None):
   
     #print(net.line[net.line.isna().any(axis=1)])
     
-    isolated_buses = top.unsupplied_buses(net)
+    with stage_timing.stage('topology'):
+        isolated_buses = top.unsupplied_buses(net)
     if len(isolated_buses) > 0:
         raise ValueError(f"Isolated buses found: {isolated_buses}. Check your network connectivity.")
     
-    pp.diagnostic(net)
+    with stage_timing.stage('topology'):
+        pp.diagnostic(net)
     
     
     # Validate network before running calculations
@@ -4878,21 +3731,22 @@ def shortcircuit(net, in_data, in_data_full=None):
         # NOTE: return_all_currents=False (default) gives max/min per branch (simple index).
         #       return_all_currents=True gives results per (branch, fault_bus) combination (MultiIndex).
         #       For UI display, we want max/min per branch, so keep return_all_currents=False.
-        sc.calc_sc(
-            net,
-            fault=fault_type,
-            case=fault_location,
-            bus=bus,
-            ip=ip,
-            ith=ith,
-            tk_s=tk_s,
-            kappa_method='C',
-            r_fault_ohm=r_fault_ohm,
-            x_fault_ohm=x_fault_ohm,
-            check_connectivity=False,
-            branch_results=True,
-            return_all_currents=False,  # Changed: False gives max/min per branch with simple index
-        )
+        with stage_timing.stage('solve'):
+            sc.calc_sc(
+                net,
+                fault=fault_type,
+                case=fault_location,
+                bus=bus,
+                ip=ip,
+                ith=ith,
+                tk_s=tk_s,
+                kappa_method='C',
+                r_fault_ohm=r_fault_ohm,
+                x_fault_ohm=x_fault_ohm,
+                check_connectivity=False,
+                branch_results=True,
+                return_all_currents=False,  # Changed: False gives max/min per branch with simple index
+            )
         
         # Check if ip_ka and ith_ka calculations failed (all NaN) for single-phase faults
         if fault_type == '1ph' and net.res_bus_sc['ip_ka'].isna().all() and net.res_bus_sc['ith_ka'].isna().all():
@@ -4972,7 +3826,7 @@ def shortcircuit(net, in_data, in_data_full=None):
             }
         }
         # OPTIMIZED: Compact JSON for faster transfer
-        return json.dumps(diagnostic_response, separators=(',', ':'))
+        return result_json.dumps(diagnostic_response)
     #print(net.res_line_sc) # nie uwzględniam ze względu na: Branch results are in beta mode and might not always be reliable, especially for transformers
                 
     #wyrzuciłem skss_mw bo wyskakiwał błąd przy zwarciu jednofazowym
@@ -5200,7 +4054,7 @@ def shortcircuit(net, in_data, in_data_full=None):
         print(f"Short Circuit: Sending {len(result['trafos3w_sc'])} trafo3w SC results")
 
     # OPTIMIZED: Compact JSON for faster transfer
-    response = json.dumps(result, default=_json_serialize_default, separators=(",", ":"))
+    response = result_json.dumps(result)
     return response
 
 
@@ -5297,47 +4151,338 @@ def _contingency_friendly_name(net, raw_name):
     return name
 
 
-def contingency_analysis(net, contingency_params):
+_CONTINGENCY_SCREEN_PREFIX = {'line': 'Line', 'trafo': 'Trafo'}
+
+
+def _contingency_screen(net, contingency_cases, base_results, band_percent, voltage_band_pu,
+                        max_loading_percent, min_vm_pu, max_vm_pu, thermal_limits, voltage_limits):
     """
-    Perform contingency analysis on the network.
-    
-    Parameters:
-    net: pandapower network
-    contingency_params: dictionary containing contingency analysis parameters
+    Split contingency cases into (cases needing AC, screened-out case summaries) using the DC-LODF
+    loading estimate. A line / trafo outage is screened out when its estimated worst loading stays
+    more than band_percent below the loading limit and the base-case voltages at the outaged
+    element's buses keep more than voltage_band_pu margin to the voltage limits (the DC model says
+    nothing about voltages; if the base case already violates them, every case is run in AC since
+    each one would report those violations). Generator outages and outages that island part of the
+    network always go to AC.
     """
+    branch_cases = [case for case in contingency_cases if case['type'] in _CONTINGENCY_SCREEN_PREFIX]
     try:
-        # Extract parameters
-        contingency_type = contingency_params.get('contingency_type', 'N-1')
-        element_type = contingency_params.get('element_type', 'line')
-        elements_to_analyze = contingency_params.get('elements_to_analyze', 'all')
-        voltage_limits = contingency_params.get('voltage_limits', 'true') == 'true'
-        thermal_limits = contingency_params.get('thermal_limits', 'true') == 'true'
-        min_vm_pu = float(contingency_params.get('min_vm_pu', 0.95))
-        max_vm_pu = float(contingency_params.get('max_vm_pu', 1.05))
-        max_loading_percent = float(contingency_params.get('max_loading_percent', 100))
-        
-        # Validate network connectivity
-        isolated_buses = top.unsupplied_buses(net)
-        if len(isolated_buses) > 0:
-            raise ValueError(f"Isolated buses found: {isolated_buses}. Check your network connectivity.")
-        
-        # Check if network has elements
-        
-        # Run base case power flow
-        pp.runpp(net, algorithm='nr', calculate_voltage_angles=True)
-        
-        # Define contingency cases based on element type
-        contingency_cases = []
-        
-        if element_type == 'line' or element_type == 'all':
-            # Add line contingencies
-            for line_idx in net.line.index:
-                if net.line.loc[line_idx, 'in_service']:
-                    line_name = _contingency_friendly_name(net, net.line.loc[line_idx, 'name'])
+        with stage_timing.stage('solve'):
+            estimates = contingency_engine.screen_branch_outages(
+                net, [(case['type'], case['element_idx']) for case in branch_cases], base_results)
+    except Exception as e:
+        print(f"Contingency screening unavailable, all cases run in AC: {e}")
+        estimates = [None] * len(branch_cases)
+    estimate_by_case = {id(case): estimate for case, estimate in zip(branch_cases, estimates)}
+
+    vm_pu = base_results['res_bus'].vm_pu
+    base_voltage_violation = voltage_limits and bool(((vm_pu < min_vm_pu) | (vm_pu > max_vm_pu)).any())
+    ac_cases = []
+    screened_out = []
+    for case in contingency_cases:
+        estimate = estimate_by_case.get(id(case))
+        if estimate is None:
+            ac_cases.append(case)
+            continue
+        loading, limiting = estimate
+        case['estimated_max_loading_percent'] = loading
+        near_thermal = thermal_limits and loading >= max_loading_percent - band_percent
+        near_voltage = base_voltage_violation
+        if voltage_limits and not near_voltage:
+            element = net[case['type']].loc[case['element_idx']]
+            buses = (element.from_bus, element.to_bus) if case['type'] == 'line' else (element.hv_bus, element.lv_bus)
+            vm = vm_pu.reindex(list(buses)).to_numpy(dtype=float)
+            near_voltage = not np.all(np.isfinite(vm)) or min(
+                np.min(vm - min_vm_pu), np.min(max_vm_pu - vm)) < voltage_band_pu
+        if near_thermal or near_voltage:
+            ac_cases.append(case)
+            continue
+        limiting_name = None
+        if limiting is not None:
+            table, idx = limiting
+            limiting_name = f"{_CONTINGENCY_SCREEN_PREFIX[table]}_{_contingency_friendly_name(net, net[table].at[idx, 'name'])}"
+        screened_out.append({
+            'name': case['name'],
+            'description': case['description'],
+            'estimated_max_loading_percent': loading,
+            'limiting_element': limiting_name
+        })
+    return ac_cases, screened_out
+
+
+_OUTAGE_GROUP_TABLES = ('line', 'trafo', 'trafo3w', 'gen', 'sgen', 'bus')
+
+
+def _contingency_group_cases(net, outage_groups):
+    """
+    Cases for user-defined outage groups, e.g. a double-circuit line or a busbar section with its
+    feeders: [{"name": ..., "elements": [<diagram id or cell name>, ...]}, ...] (or that list as a
+    JSON string). Raises ValueError for elements that are not in the network.
+    """
+    if isinstance(outage_groups, str):
+        outage_groups = json.loads(outage_groups) if outage_groups.strip() else []
+    if not outage_groups:
+        return []
+    lookup = {}
+    for table in _OUTAGE_GROUP_TABLES:
+        df = net[table]
+        if df.empty:
+            continue
+        for column in ('id', 'name'):
+            if column in df.columns:
+                for idx, ref in zip(df.index, df[column]):
+                    lookup.setdefault(str(ref), (table, idx))
+    cases = []
+    for number, group in enumerate(outage_groups, start=1):
+        refs = [str(ref) for ref in group.get('elements', [])]
+        group_name = str(group.get('name') or f"Group_{number}")
+        missing = [ref for ref in refs if ref not in lookup]
+        if missing:
+            raise ValueError(f"Outage group {group_name}: unknown elements {missing}")
+        if not refs:
+            continue
+        cases.append({
+            'name': group_name,
+            'type': 'group',
+            'elements': [lookup[ref] for ref in refs],
+            'description': f"Outage of group {group_name} ({len(refs)} elements)"
+        })
+    return cases
+
+
+def _contingency_severity(net, limits):
+    """
+    Severity index of a solved case: the largest of worst loading / loading limit and worst
+    voltage deviation / half the allowed voltage band (above 1 means a limit is violated). Buses
+    left without supply count as a violation (at least 1).
+    """
+    severity = 0.0
+    unsupplied = net.res_bus.vm_pu.isna() & net.bus.in_service.reindex(net.res_bus.index, fill_value=False)
+    if unsupplied.any():
+        severity = 1.0
+    if limits['thermal_limits']:
+        for table in ('res_line', 'res_trafo'):
+            if not net[table].empty:
+                severity = max(severity, float(np.nan_to_num(net[table].loading_percent.max())) / limits['max_loading_percent'])
+    if limits['voltage_limits'] and not net.res_bus.empty:
+        middle = (limits['max_vm_pu'] + limits['min_vm_pu']) / 2.0
+        half_band = (limits['max_vm_pu'] - limits['min_vm_pu']) / 2.0
+        deviation = float(np.nan_to_num((net.res_bus.vm_pu - middle).abs().max()))
+        severity = max(severity, deviation / half_band if half_band > 0 else 0.0)
+    return severity
+
+
+def _contingency_case_result(net, contingency_case, base_results, limits):
+    """
+    Solve one contingency case (its 'elements' out of service, warm-started from base_results) and
+    collect its violations and bus / line / trafo results. Returns (contingency result, critical
+    contingency entry or None).
+    """
+    voltage_limits = limits['voltage_limits']
+    thermal_limits = limits['thermal_limits']
+    min_vm_pu = limits['min_vm_pu']
+    max_vm_pu = limits['max_vm_pu']
+    max_loading_percent = limits['max_loading_percent']
+    try:
+        # Run power flow for contingency case
+        with stage_timing.stage('solve'):
+            contingency_engine.run_case(
+                net, contingency_case['elements'], base_results,
+                algorithm='nr', calculate_voltage_angles=True)
+
+        # Check for violations
+        case_violations = []
+
+        # Check voltage violations
+        if voltage_limits:
+            voltage_violations = net.res_bus[
+                (net.res_bus.vm_pu < min_vm_pu) | 
+                (net.res_bus.vm_pu > max_vm_pu)
+            ]
+            for bus_idx, bus_data in voltage_violations.iterrows():
+                bus_name = _contingency_friendly_name(net, net.bus.loc[bus_idx, 'name'])
+                case_violations.append({
+                    'type': 'voltage',
+                    'element': f"Bus_{bus_name}",
+                    'description': f"Voltage violation: {bus_data.vm_pu:.3f} p.u.",
+                    'severity': 'high' if bus_data.vm_pu < 0.9 or bus_data.vm_pu > 1.1 else 'medium'
+                })
+
+        # Check thermal violations
+        if thermal_limits:
+            # Check line loading
+            if not net.res_line.empty:
+                line_overloads = net.res_line[
+                    net.res_line.loading_percent > max_loading_percent
+                ]
+                for line_idx, line_data in line_overloads.iterrows():
+                    line_name = _contingency_friendly_name(net, net.line.loc[line_idx, 'name'])
+                    case_violations.append({
+                        'type': 'thermal',
+                        'element': f"Line_{line_name}",
+                        'description': f"Line overload: {line_data.loading_percent:.1f}%",
+                        'severity': 'high' if line_data.loading_percent > 120 else 'medium'
+                    })
+
+            # Check transformer loading
+            if not net.res_trafo.empty:
+                trafo_overloads = net.res_trafo[
+                    net.res_trafo.loading_percent > max_loading_percent
+                ]
+                for trafo_idx, trafo_data in trafo_overloads.iterrows():
+                    trafo_name = _contingency_friendly_name(net, net.trafo.loc[trafo_idx, 'name'])
+                    case_violations.append({
+                        'type': 'thermal',
+                        'element': f"Trafo_{trafo_name}",
+                        'description': f"Transformer overload: {trafo_data.loading_percent:.1f}%",
+                        'severity': 'high' if trafo_data.loading_percent > 120 else 'medium'
+                    })
+
+        # Store results for this contingency
+        contingency_result = {
+            'name': contingency_case['name'],
+            'description': contingency_case['description'],
+            'converged': True,
+            'violations': case_violations,
+            'bus_results': [],
+            'line_results': [],
+            'trafo_results': [],
+            'severity_index': _contingency_severity(net, limits)
+        }
+        if 'estimated_max_loading_percent' in contingency_case:
+            contingency_result['estimated_max_loading_percent'] = contingency_case['estimated_max_loading_percent']
+
+        # Store bus results
+        for bus_idx, bus_data in net.res_bus.iterrows():
+            contingency_result['bus_results'].append({
+                'bus_id': net.bus.loc[bus_idx, 'id'],
+                'name': _contingency_friendly_name(net, net.bus.loc[bus_idx, 'name']),
+                'vm_pu': bus_data.vm_pu,
+                'va_degree': bus_data.va_degree,
+                'p_mw': bus_data.p_mw,
+                'q_mvar': bus_data.q_mvar
+            })
+
+        # Store line results
+        for line_idx, line_data in net.res_line.iterrows():
+            contingency_result['line_results'].append({
+                'line_id': net.line.loc[line_idx, 'id'],
+                'name': _contingency_friendly_name(net, net.line.loc[line_idx, 'name']),
+                'loading_percent': line_data.loading_percent,
+                'p_from_mw': line_data.p_from_mw,
+                'q_from_mvar': line_data.q_from_mvar,
+                'p_to_mw': line_data.p_to_mw,
+                'q_to_mvar': line_data.q_to_mvar
+            })
+
+        # Store transformer results
+        for trafo_idx, trafo_data in net.res_trafo.iterrows():
+            contingency_result['trafo_results'].append({
+                'trafo_id': net.trafo.loc[trafo_idx, 'id'],
+                'name': _contingency_friendly_name(net, net.trafo.loc[trafo_idx, 'name']),
+                'loading_percent': trafo_data.loading_percent,
+                'p_hv_mw': trafo_data.p_hv_mw,
+                'q_hv_mvar': trafo_data.q_hv_mvar,
+                'p_lv_mw': trafo_data.p_lv_mw,
+                'q_lv_mvar': trafo_data.q_lv_mvar
+            })
+
+        critical = None
+        if any(v['severity'] == 'high' for v in case_violations):
+            critical = {
+                'name': contingency_case['name'],
+                'description': contingency_case['description'],
+                'violations': len(case_violations)
+            }
+        return contingency_result, critical
+
+    except Exception as e:
+        err_text = str(e)
+        err_lower = err_text.lower()
+        is_convergence = 'did not converge' in err_lower
+        try:
+            from pandapower.auxiliary import LoadFlowNotConverged
+            is_convergence = is_convergence or isinstance(e, LoadFlowNotConverged)
+        except ImportError:
+            pass
+
+        if is_convergence:
+            failure_desc = 'Non-convergent case'
+            violation_desc = 'Power flow did not converge'
+            violation_type = 'convergence'
+        else:
+            failure_desc = err_text
+            violation_desc = err_text
+            violation_type = 'error'
+
+        contingency_result = {
+            'name': contingency_case['name'],
+            'description': contingency_case['description'],
+            'converged': False,
+            'error': err_text,
+            'violations': [{
+                'type': violation_type,
+                'element': 'System',
+                'description': violation_desc,
+                'severity': 'high'
+            }]
+        }
+        return contingency_result, {
+            'name': contingency_case['name'],
+            'description': failure_desc,
+            'violations': 1
+        }
+
+
+def contingency_analysis(net, contingency_params):
+    """
+    Perform contingency analysis on the network.
+    
+    Parameters:
+    net: pandapower network
+    contingency_params: dictionary containing contingency analysis parameters
+    """
+    try:
+        # Extract parameters
+        contingency_type = contingency_params.get('contingency_type', 'N-1')
+        element_type = contingency_params.get('element_type', 'line')
+        elements_to_analyze = contingency_params.get('elements_to_analyze', 'all')
+        voltage_limits = contingency_params.get('voltage_limits', 'true') == 'true'
+        thermal_limits = contingency_params.get('thermal_limits', 'true') == 'true'
+        min_vm_pu = float(contingency_params.get('min_vm_pu', 0.95))
+        max_vm_pu = float(contingency_params.get('max_vm_pu', 1.05))
+        max_loading_percent = float(contingency_params.get('max_loading_percent', 100))
+        screening = contingency_params.get('screening', 'false') == 'true'
+        screening_band_percent = float(contingency_params.get('screening_band_percent', 20))
+        screening_voltage_band_pu = float(contingency_params.get('screening_voltage_band_pu', 0.02))
+        n2_top_k = int(contingency_params.get('n2_top_k', 30))
+        n2_time_budget_s = float(contingency_params.get('n2_time_budget_s', 120))
+        
+        # Validate network connectivity
+        with stage_timing.stage('topology'):
+            isolated_buses = top.unsupplied_buses(net)
+        if len(isolated_buses) > 0:
+            raise ValueError(f"Isolated buses found: {isolated_buses}. Check your network connectivity.")
+        
+        # Check if network has elements
+        
+        # Run base case power flow
+        with stage_timing.stage('solve'):
+            pp.runpp(net, algorithm='nr', calculate_voltage_angles=True)
+        
+        # Define contingency cases based on element type
+        contingency_cases = []
+        
+        if element_type == 'line' or element_type == 'all':
+            # Add line contingencies
+            for line_idx in net.line.index:
+                if net.line.loc[line_idx, 'in_service']:
+                    line_name = _contingency_friendly_name(net, net.line.loc[line_idx, 'name'])
                     contingency_cases.append({
                         'name': f"Line_{line_name}",
                         'type': 'line',
                         'element_idx': line_idx,
+                        'elements': [('line', line_idx)],
                         'description': f"Outage of line {line_name}"
                     })
         
@@ -5350,6 +4495,7 @@ def contingency_analysis(net, contingency_params):
                         'name': f"Trafo_{trafo_name}",
                         'type': 'trafo',
                         'element_idx': trafo_idx,
+                        'elements': [('trafo', trafo_idx)],
                         'description': f"Outage of transformer {trafo_name}"
                     })
         
@@ -5362,9 +4508,12 @@ def contingency_analysis(net, contingency_params):
                         'name': f"Gen_{gen_name}",
                         'type': 'gen',
                         'element_idx': gen_idx,
+                        'elements': [('gen', gen_idx)],
                         'description': f"Outage of generator {gen_name}"
                     })
         
+        group_cases = _contingency_group_cases(net, contingency_params.get('outage_groups'))
+        
         # Results storage
         contingency_results = []
         violations = []
@@ -5378,175 +4527,111 @@ def contingency_analysis(net, contingency_params):
             'trafo_loading_percent': net.res_trafo.loading_percent.copy() if not net.res_trafo.empty else pd.Series()
         }
         
-        # Run contingency analysis
-        for i, contingency_case in enumerate(contingency_cases):
-            try:
-                # Deep copy required — net.copy() returns a plain dict without .line / .bus accessors
-                net_cont = deepcopy(net)
-                
-                # Apply contingency
-                if contingency_case['type'] == 'line':
-                    net_cont.line.loc[contingency_case['element_idx'], 'in_service'] = False
-                elif contingency_case['type'] == 'trafo':
-                    net_cont.trafo.loc[contingency_case['element_idx'], 'in_service'] = False
-                elif contingency_case['type'] == 'gen':
-                    net_cont.gen.loc[contingency_case['element_idx'], 'in_service'] = False
-                
-                # Run power flow for contingency case
-                pp.runpp(net_cont, algorithm='nr', calculate_voltage_angles=True)
-                
-                # Check for violations
-                case_violations = []
-                
-                # Check voltage violations
-                if voltage_limits:
-                    voltage_violations = net_cont.res_bus[
-                        (net_cont.res_bus.vm_pu < min_vm_pu) | 
-                        (net_cont.res_bus.vm_pu > max_vm_pu)
-                    ]
-                    for bus_idx, bus_data in voltage_violations.iterrows():
-                        bus_name = _contingency_friendly_name(net, net_cont.bus.loc[bus_idx, 'name'])
-                        case_violations.append({
-                            'type': 'voltage',
-                            'element': f"Bus_{bus_name}",
-                            'description': f"Voltage violation: {bus_data.vm_pu:.3f} p.u.",
-                            'severity': 'high' if bus_data.vm_pu < 0.9 or bus_data.vm_pu > 1.1 else 'medium'
-                        })
-                
-                # Check thermal violations
-                if thermal_limits:
-                    # Check line loading
-                    if not net_cont.res_line.empty:
-                        line_overloads = net_cont.res_line[
-                            net_cont.res_line.loading_percent > max_loading_percent
-                        ]
-                        for line_idx, line_data in line_overloads.iterrows():
-                            line_name = _contingency_friendly_name(net, net_cont.line.loc[line_idx, 'name'])
-                            case_violations.append({
-                                'type': 'thermal',
-                                'element': f"Line_{line_name}",
-                                'description': f"Line overload: {line_data.loading_percent:.1f}%",
-                                'severity': 'high' if line_data.loading_percent > 120 else 'medium'
-                            })
-                    
-                    # Check transformer loading
-                    if not net_cont.res_trafo.empty:
-                        trafo_overloads = net_cont.res_trafo[
-                            net_cont.res_trafo.loading_percent > max_loading_percent
-                        ]
-                        for trafo_idx, trafo_data in trafo_overloads.iterrows():
-                            trafo_name = _contingency_friendly_name(net, net_cont.trafo.loc[trafo_idx, 'name'])
-                            case_violations.append({
-                                'type': 'thermal',
-                                'element': f"Trafo_{trafo_name}",
-                                'description': f"Transformer overload: {trafo_data.loading_percent:.1f}%",
-                                'severity': 'high' if trafo_data.loading_percent > 120 else 'medium'
-                            })
-                
-                # Store results for this contingency
-                contingency_result = {
-                    'name': contingency_case['name'],
-                    'description': contingency_case['description'],
-                    'converged': True,
-                    'violations': case_violations,
-                    'bus_results': [],
-                    'line_results': [],
-                    'trafo_results': []
-                }
-                
-                # Store bus results
-                for bus_idx, bus_data in net_cont.res_bus.iterrows():
-                    contingency_result['bus_results'].append({
-                        'bus_id': net_cont.bus.loc[bus_idx, 'id'],
-                        'name': _contingency_friendly_name(net, net_cont.bus.loc[bus_idx, 'name']),
-                        'vm_pu': bus_data.vm_pu,
-                        'va_degree': bus_data.va_degree,
-                        'p_mw': bus_data.p_mw,
-                        'q_mvar': bus_data.q_mvar
-                    })
-                
-                # Store line results
-                for line_idx, line_data in net_cont.res_line.iterrows():
-                    contingency_result['line_results'].append({
-                        'line_id': net_cont.line.loc[line_idx, 'id'],
-                        'name': _contingency_friendly_name(net, net_cont.line.loc[line_idx, 'name']),
-                        'loading_percent': line_data.loading_percent,
-                        'p_from_mw': line_data.p_from_mw,
-                        'q_from_mvar': line_data.q_from_mvar,
-                        'p_to_mw': line_data.p_to_mw,
-                        'q_to_mvar': line_data.q_to_mvar
-                    })
-                
-                # Store transformer results
-                for trafo_idx, trafo_data in net_cont.res_trafo.iterrows():
-                    contingency_result['trafo_results'].append({
-                        'trafo_id': net_cont.trafo.loc[trafo_idx, 'id'],
-                        'name': _contingency_friendly_name(net, net_cont.trafo.loc[trafo_idx, 'name']),
-                        'loading_percent': trafo_data.loading_percent,
-                        'p_hv_mw': trafo_data.p_hv_mw,
-                        'q_hv_mvar': trafo_data.q_hv_mvar,
-                        'p_lv_mw': trafo_data.p_lv_mw,
-                        'q_lv_mvar': trafo_data.q_lv_mvar
-                    })
-                
-                # Add to violations list if any violations found
-                if case_violations:
-                    violations.extend(case_violations)
-                    if any(v['severity'] == 'high' for v in case_violations):
-                        critical_contingencies.append({
-                            'name': contingency_case['name'],
-                            'description': contingency_case['description'],
-                            'violations': len(case_violations)
-                        })
-                
-                contingency_results.append(contingency_result)
-                
-            except Exception as e:
-                err_text = str(e)
-                err_lower = err_text.lower()
-                is_convergence = 'did not converge' in err_lower
-                try:
-                    from pandapower.auxiliary import LoadFlowNotConverged
-                    is_convergence = is_convergence or isinstance(e, LoadFlowNotConverged)
-                except ImportError:
-                    pass
-
-                if is_convergence:
-                    failure_desc = 'Non-convergent case'
-                    violation_desc = 'Power flow did not converge'
-                    violation_type = 'convergence'
-                else:
-                    failure_desc = err_text
-                    violation_desc = err_text
-                    violation_type = 'error'
-
-                contingency_result = {
-                    'name': contingency_case['name'],
-                    'description': contingency_case['description'],
-                    'converged': False,
-                    'error': err_text,
-                    'violations': [{
-                        'type': violation_type,
-                        'element': 'System',
-                        'description': violation_desc,
-                        'severity': 'high'
-                    }]
-                }
+        # Run contingency analysis: each case toggles its element in place on the shared net
+        # (restored afterwards) and warm-starts from the base-case voltages
+        base_results = contingency_engine.snapshot_results(net)
+        ac_cases = contingency_cases
+        screened_out = []
+        if screening:
+            ac_cases, screened_out = _contingency_screen(
+                net, contingency_cases, base_results, screening_band_percent, screening_voltage_band_pu,
+                max_loading_percent, min_vm_pu, max_vm_pu, thermal_limits, voltage_limits)
+        limits = {
+            'voltage_limits': voltage_limits,
+            'thermal_limits': thermal_limits,
+            'min_vm_pu': min_vm_pu,
+            'max_vm_pu': max_vm_pu,
+            'max_loading_percent': max_loading_percent
+        }
+        # Streaming (NDJSON) callers get every case result as soon as it is solved instead of in
+        # contingency_results; only the worst case is kept for the summary tables
+        progress_cb = contingency_params.get('_progress_callback')
+        partial_cb = contingency_params.get('_partial_callback')
+        cancel = contingency_params.get('_cancel_token')
+        worst_case = {}
+        solved_count = 0
+        
+        def record(contingency_case, outcome):
+            nonlocal worst_case, solved_count
+            contingency_result, critical = outcome
+            solved_count += 1
+            if partial_cb:
+                partial_cb({'contingency_results': [contingency_result]})
+            else:
                 contingency_results.append(contingency_result)
-                critical_contingencies.append({
-                    'name': contingency_case['name'],
-                    'description': failure_desc,
-                    'violations': 1
+            if contingency_result['converged']:
+                violations.extend(contingency_result['violations'])
+            if critical:
+                critical_contingencies.append(critical)
+            if not worst_case or len(contingency_result.get('violations', [])) > len(worst_case.get('violations', [])):
+                worst_case = contingency_result
+            contingency_case['severity_index'] = contingency_result.get('severity_index')
+        
+        def solve(cases, deadline=None):
+            """Solve cases (in-process or on the contingency pool); returns how many were solved."""
+            return contingency_engine.solve_cases(
+                net, cases, base_results, _contingency_case_result, record, (limits,), deadline=deadline,
+                cancel=cancel)
+        
+        if progress_cb:
+            progress_cb(f"Solving {len(ac_cases) + len(group_cases)} contingency cases"
+                        + (f" ({len(screened_out)} screened out)" if screening else ""))
+        solve(ac_cases + group_cases)
+        
+        # N-2: pair up the most severe N-1 outages (screened-out cases ranked by their estimate,
+        # non-convergent ones dropped), most severe pairs first, within the time budget
+        n2_summary = None
+        if contingency_type == 'N-2':
+            severities = [
+                case.get('severity_index') if 'severity_index' in case
+                else case['estimated_max_loading_percent'] / max_loading_percent
+                for case in contingency_cases
+            ]
+            pairs = contingency_engine.n2_pairs(severities, n2_top_k)
+            pair_cases = []
+            for first, second in pairs:
+                case_a, case_b = contingency_cases[first], contingency_cases[second]
+                pair_cases.append({
+                    'name': f"{case_a['name']}+{case_b['name']}",
+                    'type': 'n-2',
+                    'elements': case_a['elements'] + case_b['elements'],
+                    'description': f"Simultaneous outage: {case_a['description']}; {case_b['description']}"
                 })
+            deadline = time.perf_counter() + n2_time_budget_s if n2_time_budget_s > 0 else None
+            if progress_cb:
+                progress_cb(f"Solving up to {len(pair_cases)} N-2 pairs")
+            analyzed = solve(pair_cases, deadline)
+            n2_summary = {
+                'top_k': n2_top_k,
+                'time_budget_s': n2_time_budget_s,
+                'excluded_nonconvergent': sum(1 for value in severities if value is None),
+                'pairs_total': len(pairs),
+                'pairs_analyzed': analyzed,
+                'pairs_skipped_time_budget': len(pairs) - analyzed
+            }
         
+        # Leave the net with its base-case results
+        contingency_engine.restore_results(net, base_results)
+
         # Prepare summary
         summary = {
-            'contingencies_analyzed': len(contingency_cases),
+            'contingencies_analyzed': len(contingency_cases) + len(group_cases) + (n2_summary['pairs_analyzed'] if n2_summary else 0),
             'violations': violations,
             'critical_contingencies': critical_contingencies,
             'total_violations': len(violations),
             'total_critical': len(critical_contingencies)
         }
+        if n2_summary:
+            summary['n2'] = n2_summary
+        if screening:
+            summary['screening'] = {
+                'method': 'dc_lodf',
+                'band_percent': screening_band_percent,
+                'voltage_band_pu': screening_voltage_band_pu,
+                'ac_verified': len(ac_cases),
+                'screened_out': len(screened_out),
+                'screened_out_cases': screened_out
+            }
         
         # Prepare output classes for consistent formatting
         class ContingencyBusOut(object):
@@ -5584,17 +4669,15 @@ def contingency_analysis(net, contingency_params):
         trafo_out_list = []
         
         # Check if we have contingency results
-        if not contingency_cases:
+        if not contingency_cases and not group_cases:
             error_message = f"No contingency cases found. Network has {len(net.line)} lines, {len(net.trafo)} transformers, {len(net.gen)} generators."
             return json.dumps({'error': error_message}, separators=(',', ':'))
         
-        if not contingency_results:
+        if not solved_count and not screened_out:
             error_message = f"No contingency results generated. All {len(contingency_cases)} cases failed to converge."
             return json.dumps({'error': error_message}, separators=(',', ':'))
         
-        # Use the worst-case scenario results for display
-        worst_case = max(contingency_results, key=lambda x: len(x.get('violations', [])))
-        
+        # The worst-case scenario results (most violations, first one on ties) are used for display
         for bus_result in worst_case.get('bus_results', []):
             bus_out = ContingencyBusOut(
                 bus_id=bus_result['bus_id'],
@@ -5640,12 +4723,7 @@ def contingency_analysis(net, contingency_params):
         }
         
         # Sanitize NaN/Inf so the body is strict JSON (browser JSON.parse rejects NaN tokens).
-        response = json.dumps(
-            _sanitize_for_strict_json(result),
-            default=_json_serialize_default,
-            allow_nan=False,
-            separators=(',', ':'),
-        )
+        response = result_json.dumps(result)
         
         return response
         
@@ -5728,7 +4806,8 @@ def optimalPowerFlow(net, opf_params):
             dcline_cost_cp2 = {}
         
         # Check for isolated buses
-        isolated_buses = top.unsupplied_buses(net)
+        with stage_timing.stage('topology'):
+            isolated_buses = top.unsupplied_buses(net)
         if len(isolated_buses) > 0:
             raise ValueError(f"Isolated buses found: {isolated_buses}. Check your network connectivity.")
         
@@ -6131,7 +5210,8 @@ def optimalPowerFlow(net, opf_params):
                         with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
                             _pp_opf_core.stdout = sys.stdout
                             try:
-                                _run_opf_once(use_init, use_numba, verbose_solver=True)
+                                with stage_timing.stage('solve'):
+                                    _run_opf_once(use_init, use_numba, verbose_solver=True)
                                 break
                             except _OPFNotConverged:
                                 if attempt_idx == len(_solver_attempts) - 1:
@@ -6142,7 +5222,8 @@ def optimalPowerFlow(net, opf_params):
             else:
                 for attempt_idx, (use_init, use_numba) in enumerate(_solver_attempts):
                     try:
-                        _run_opf_once(use_init, use_numba, verbose_solver=False)
+                        with stage_timing.stage('solve'):
+                            _run_opf_once(use_init, use_numba, verbose_solver=False)
                         break
                     except _OPFNotConverged:
                         if attempt_idx == len(_solver_attempts) - 1:
@@ -6204,7 +5285,7 @@ def optimalPowerFlow(net, opf_params):
         if solver_verbose_text.strip():
             diagnostic_response["solver_verbose_log"] = _truncate_solver_verbose_log(solver_verbose_text)
         
-        return _jsonify_safe(diagnostic_response)
+        return result_json.dumps(diagnostic_response)
     
     # Build response with OPF results
     else:
@@ -6717,7 +5798,7 @@ def optimalPowerFlow(net, opf_params):
         # Label for UI: study currency from OPF payload (coefficient column names stay EUR-style in pandapower).
         response_data['cost_currency'] = str(opf_params.get('cost_currency') or 'EUR')
 
-        return _jsonify_safe(response_data)
+        return result_json.dumps(response_data)
 
 
 def _lookup_generator_cost_scalar(cost_by_id, gen_row_id, default):
@@ -7802,28 +6883,11 @@ def _ts_resolve_profile_mode(mode, values, orig_p):
     return mode
 
 
-def _ts_set_pq(table, idx, orig_p, orig_q, value, mode):
-    op = float(orig_p.loc[idx])
-    oq = float(orig_q.loc[idx]) if orig_q is not None else 0.0
-    if mode == 'absolute':
-        new_p = float(value)
-        if op != 0:
-            net_q = oq * (new_p / op)
-        elif oq != 0:
-            net_q = oq
-        else:
-            net_q = new_p * 0.66
-    else:
-        scale = float(value)
-        new_p = op * scale
-        net_q = oq * scale
-    table.loc[idx, 'p_mw'] = new_p
-    if 'q_mvar' in table.columns:
-        table.loc[idx, 'q_mvar'] = net_q
-
-
 def _ts_run_powerflow(net, timeseries_params, time_index, prev_converged):
-    """Run PF for one time step; warm-start from previous step when possible (pandapower timeseries style)."""
+    """
+    Run PF for one time step; warm-start from previous step when possible (pandapower timeseries style).
+    Steps only change injections, so repeated_powerflow reuses the previous step's ppc and Ybus.
+    """
     algorithm = timeseries_params.get('algorithm', 'nr')
     cva = timeseries_params.get('calculate_voltage_angles', 'auto')
     init_param = timeseries_params.get('init') or timeseries_params.get('initialization') or 'auto'
@@ -7835,23 +6899,185 @@ def _ts_run_powerflow(net, timeseries_params, time_index, prev_converged):
         pf_init = 'results'
 
     try:
-        pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=cva, init=pf_init, **pf_kwargs)
+        repeated_powerflow.runpp(net, algorithm=algorithm, calculate_voltage_angles=cva, init=pf_init, **pf_kwargs)
     except Exception:
         if pf_init == 'results':
-            pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=cva, init='auto', **pf_kwargs)
+            repeated_powerflow.runpp(net, algorithm=algorithm, calculate_voltage_angles=cva, init='auto', **pf_kwargs)
         else:
             raise
     return bool(net.converged)
 
 
+# Output lists of a time series result: (key, element table, display name prefix, logged res_* columns)
+_TS_OUTPUTS = (
+    ('busbars', 'bus', 'Bus', ('vm_pu', 'va_degree', 'p_mw', 'q_mvar')),
+    ('lines', 'line', 'Line', ('loading_percent', 'p_from_mw', 'p_to_mw')),
+    ('loads', 'load', 'Load', ('p_mw', 'q_mvar')),
+    ('sgens', 'sgen', 'Static Generator', ('p_mw', 'q_mvar')),
+)
+
+
+def _ts_profile_matrix(table, element_type, orig_p, orig_q, global_values, time_steps, resolved_profiles):
+    """
+    (steps × elements) P and Q setpoints of one element table. Elements with a custom profile
+    (matched by name and element type) follow its values, the others the global preset scale.
+    'scale' profiles multiply the original P and Q; 'absolute' profiles set P in MW and keep the
+    original power factor (Q = P * tan(phi) = 0.66 * P when the original P and Q are both zero,
+    the original Q when only P is zero).
+    """
+    op = orig_p.to_numpy(dtype=float)
+    oq = orig_q.to_numpy(dtype=float) if orig_q is not None else np.zeros(len(op))
+    global_col = np.asarray([global_values[t % len(global_values)] for t in range(time_steps)], dtype=float)
+    values = np.repeat(global_col[:, None], len(op), axis=1)
+    absolute = np.zeros(len(op), dtype=bool)
+    for j, name in enumerate(table['name'].tolist()):
+        spec = resolved_profiles.get(str(name))
+        if spec and spec.get('element_type') == element_type:
+            values[:, j] = np.asarray(spec['values'], dtype=float)
+            absolute[j] = spec.get('mode', 'scale') == 'absolute'
+
+    p = np.where(absolute, values, op * values)
+    q_absolute = np.where(op != 0, oq * (values / np.where(op != 0, op, 1.0)),
+                          np.where(oq != 0, oq, values * 0.66))
+    q = np.where(absolute, q_absolute, oq * values)
+    return p, q
+
+
+class _TimeSeriesStepHook(control.basic_controller.Controller):
+    """Remembers the current run_timeseries step and checks the study's cancel token there."""
+
+    def __init__(self, net, cancel):
+        # recycle dict without any refresh flags, so the ConstControls' recycle settings apply
+        super().__init__(net, recycle={'trafo': False, 'bus_pq': False, 'gen': False}, initial_run=False)
+        self.cancel = cancel
+        self.time = None
+
+    def time_step(self, net, time):
+        self.time = time
+        study_cancellation.check(self.cancel)
+
+    def is_converged(self, net):
+        return True
+
+
+def _ts_run_native(net, timeseries_params, profiles, store, cancel):
+    """
+    Time steps through pandapower.timeseries.run_timeseries: one ConstControl + DFData per profiled
+    table column (profiles: {(table, column): (steps × elements) matrix}), a step hook for the cancel
+    token and an OutputWriter logging the store's columns into its preallocated numpy arrays, which
+    then become the store's arrays. Raises like the loop engine when a step does not converge.
+    """
+    for (table, column), matrix in profiles.items():
+        columns = list(range(matrix.shape[1]))
+        control.ConstControl(net, element=table, variable=column, element_index=net[table].index,
+                             data_source=DFData(pd.DataFrame(matrix, columns=columns)), profile_name=columns)
+    hook = _TimeSeriesStepHook(net, cancel)
+
+    log_variables = [('res_' + table, column) for table, columns in store.columns() for column in columns]
+    ow = ts.OutputWriter(net, time_steps=range(store.time_steps), output_path=None, log_variables=log_variables)
+
+    init_param = timeseries_params.get('init') or timeseries_params.get('initialization') or 'auto'
+    try:
+        ts.run_timeseries(net, time_steps=range(store.time_steps), continue_on_divergence=False, verbose=False,
+                          algorithm=timeseries_params.get('algorithm', 'nr'),
+                          calculate_voltage_angles=timeseries_params.get('calculate_voltage_angles', 'auto'),
+                          init=init_param if init_param != 'results' else 'auto',
+                          **_electrisim_enforce_q_lims_kw(net))
+    except pp.LoadflowNotConverged as e:
+        # run_timeseries re-raises the bare exception class
+        if str(e):
+            raise
+        raise pp.LoadflowNotConverged('Power flow did not converge at time step %s' % hook.time) from e
+
+    for table, column in log_variables:
+        store.arrays[table[len('res_'):]][column] = ow.output['%s.%s' % (table, column)].to_numpy(dtype=float)
+
+
+class _TimeSeriesResultStore:
+    """
+    Results of a time series study as one (steps × elements) float array per reported res_* column
+    (_TS_OUTPUTS), filled in place step by step or taken over from an OutputWriter. The output rows
+    and statistics are serialized from the arrays in the loop engine's layout; NaN results are
+    reported as 0.0 like safe_float.
+    """
+
+    def __init__(self, net, time_steps):
+        self.time_steps = time_steps
+        ufn = getattr(net, 'user_friendly_names', {})
+        self._tables = []
+        self.arrays = {}
+        for key, table, prefix, columns in _TS_OUTPUTS:
+            if len(net[table]) == 0:
+                continue
+            names = net[table]['name'].tolist()
+            display = [get_display_name(ufn.get(name, name), name, prefix, idx, 'timeseries')
+                       for idx, name in zip(net[table].index, names)]
+            self._tables.append((key, table, columns, display, [str(name) for name in names]))
+            self.arrays[table] = {column: np.zeros((time_steps, len(names))) for column in columns}
+
+    def columns(self):
+        return [(table, columns) for _key, table, columns, _display, _ids in self._tables]
+
+    def record(self, net, t):
+        """Copy the res_* columns of the power flow of step t into row t."""
+        for _key, table, columns, _display, _ids in self._tables:
+            res = net['res_' + table]
+            for column in columns:
+                self.arrays[table][column][t] = res[column].to_numpy(dtype=float)
+
+    def _values(self, table, column, t=None):
+        values = self.arrays[table][column] if t is None else self.arrays[table][column][t]
+        return np.nan_to_num(values, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+    def rows(self, t):
+        """{output list key: rows of step t}, every key of _TS_OUTPUTS present."""
+        step = {key: [] for key, _table, _prefix, _columns in _TS_OUTPUTS}
+        for key, table, columns, display, ids in self._tables:
+            values = zip(*(self._values(table, column, t).tolist() for column in columns))
+            step[key] = [dict(zip(('name', 'id', 'time_step') + columns, (display[j], ids[j], t) + row))
+                         for j, row in enumerate(values)]
+        return step
+
+    def lists(self):
+        out = {key: [] for key, _table, _prefix, _columns in _TS_OUTPUTS}
+        for t in range(self.time_steps):
+            for key, rows in self.rows(t).items():
+                out[key].extend(rows)
+        return out
+
+    def _stats(self, key, column, label):
+        stats = {}
+        for key_, table, _columns, display, _ids in self._tables:
+            if key_ != key:
+                continue
+            values = self._values(table, column)
+            by_name = {}
+            for j, name in enumerate(display):
+                by_name.setdefault(name, []).append(j)
+            for name, cols in by_name.items():
+                # time-major like the per-step lists, so the averages sum in the same order
+                series = values[:, cols].ravel().tolist()
+                if series:
+                    stats[name] = {'min_' + label: min(series), 'max_' + label: max(series),
+                                   'avg_' + label: sum(series) / len(series)}
+                else:
+                    stats[name] = {'min_' + label: 0.0, 'max_' + label: 0.0, 'avg_' + label: 0.0}
+        return stats
+
+    def statistics(self):
+        """(voltage statistics per bus display name, loading statistics per line display name)"""
+        return self._stats('busbars', 'vm_pu', 'vm_pu'), self._stats('lines', 'loading_percent', 'loading_percent')
+
+
 def time_series_simulation(net, timeseries_params):
     """
     Sequential AC power flow over time steps with scaled loads and generators.
 
-    Electrisim uses repeated pandapower ``runpp`` calls with profile shapes (similar in spirit to
-    `pandapower.timeseries <https://pandapower.readthedocs.io/en/v3.4.0/timeseries.html>`_ but
-    without ``run_timeseries`` / OutputWriter). Imports of ``pandapower.timeseries`` are optional
-    and do not change this execution path.
+    The default engine ('loop') applies the profiles and runs ``runpp`` step by step. With
+    ``engine='native'`` the profiles are resolved into (steps × elements) matrices up front and the
+    steps run through `pandapower.timeseries <https://pandapower.readthedocs.io/en/v3.4.0/timeseries.html>`_
+    ``run_timeseries`` with ConstControl / DFData and an OutputWriter; the response is the same, but
+    streamed rows are only emitted once all steps are solved.
     """
     try:
         time_steps = int(timeseries_params.get('time_steps', 24))
@@ -7861,7 +7087,7 @@ def time_series_simulation(net, timeseries_params):
         element_profiles = timeseries_params.get('element_profiles') or {}
 
         import datetime
-        time_stamps = [datetime.datetime(2024, 1, 1, hour=h) for h in range(time_steps)]
+        time_stamps = [datetime.datetime(2024, 1, 1) + datetime.timedelta(hours=h) for h in range(time_steps)]
 
         orig_load_p = net.load['p_mw'].copy() if len(net.load) > 0 else None
         orig_load_q = net.load['q_mvar'].copy() if len(net.load) > 0 else None
@@ -7901,189 +7127,56 @@ def time_series_simulation(net, timeseries_params):
                     'id': str(elem_name),
                 }
 
-        def _element_profile(name, element_type, t, global_values):
-            spec = resolved_profiles.get(str(name))
-            if spec and spec.get('element_type') == element_type:
-                return spec['values'][t], spec.get('mode', 'scale')
-            return global_values[t % len(global_values)], 'scale'
-
-        all_results = []
-        prev_converged = False
-
-        for t in range(time_steps):
-            if orig_load_p is not None:
-                for idx in net.load.index:
-                    elem_name = str(net.load.loc[idx, 'name'])
-                    val, mode = _element_profile(elem_name, 'load', t, load_profile_values)
-                    _ts_set_pq(net.load, idx, orig_load_p, orig_load_q, val, mode)
-
-            if orig_sgen_p is not None:
-                for idx in net.sgen.index:
-                    elem_name = str(net.sgen.loc[idx, 'name'])
-                    val, mode = _element_profile(elem_name, 'sgen', t, gen_profile_values)
-                    _ts_set_pq(net.sgen, idx, orig_sgen_p, orig_sgen_q, val, mode)
-
-            if orig_gen_p is not None:
-                for idx in net.gen.index:
-                    elem_name = str(net.gen.loc[idx, 'name'])
-                    val, mode = _element_profile(elem_name, 'gen', t, gen_profile_values)
-                    _ts_set_pq(net.gen, idx, orig_gen_p, orig_gen_q, val, mode)
-
-            prev_converged = _ts_run_powerflow(net, timeseries_params, t, prev_converged)
-
-            all_results.append({
-                'time_step': t,
-                'converged': net.converged,
-                'bus_results': net.res_bus.copy(),
-                'line_results': net.res_line.copy(),
-                'gen_results': net.res_gen.copy() if len(net.gen) > 0 else None,
-                'sgen_results': net.res_sgen.copy() if len(net.sgen) > 0 else None,
-                'load_results': net.res_load.copy() if len(net.load) > 0 else None,
-            })
-
-        # Prepare results
-        class TimeSeriesBusOut(object):
-            def __init__(self, name: str, id: str, time_step: int, vm_pu: float, va_degree: float, p_mw: float, q_mvar: float):
-                self.name = name
-                self.id = id
-                self.time_step = time_step
-                self.vm_pu = vm_pu
-                self.va_degree = va_degree
-                self.p_mw = p_mw
-                self.q_mvar = q_mvar
-        
-        class TimeSeriesLineOut(object):
-            def __init__(self, name: str, id: str, time_step: int, loading_percent: float, p_from_mw: float, p_to_mw: float):
-                self.name = name
-                self.id = id
-                self.time_step = time_step
-                self.loading_percent = loading_percent
-                self.p_from_mw = p_from_mw
-                self.p_to_mw = p_to_mw
-
-        class TimeSeriesLoadOut(object):
-            def __init__(self, name: str, id: str, time_step: int, p_mw: float, q_mvar: float):
-                self.name = name
-                self.id = id
-                self.time_step = time_step
-                self.p_mw = p_mw
-                self.q_mvar = q_mvar
-
-        class TimeSeriesSgenOut(object):
-            def __init__(self, name: str, id: str, time_step: int, p_mw: float, q_mvar: float):
-                self.name = name
-                self.id = id
-                self.time_step = time_step
-                self.p_mw = p_mw
-                self.q_mvar = q_mvar
-        
-        # Collect results for each time step (from sequential runpp snapshots)
-        all_busbars = []
-        all_lines = []
-        all_loads = []
-        all_sgens = []
-
-        for result in all_results:
-            t = result['time_step']
-            bus_results = result['bus_results']
-            line_results = result['line_results']
-            load_results = result.get('load_results')
-            sgen_results = result.get('sgen_results')
-
-            for idx, bus in bus_results.iterrows():
-                bus_name = net.bus.loc[idx, 'name']
-                user_friendly_name = getattr(net, 'user_friendly_names', {}).get(bus_name, bus_name)
-                all_busbars.append(TimeSeriesBusOut(
-                    name=get_display_name(user_friendly_name, bus_name, 'Bus', idx, 'timeseries'),
-                    id=str(bus_name),
-                    time_step=t,
-                    vm_pu=safe_float(bus['vm_pu']),
-                    va_degree=safe_float(bus['va_degree']),
-                    p_mw=safe_float(bus['p_mw']),
-                    q_mvar=safe_float(bus['q_mvar'])
-                ))
-
-            for idx, line in line_results.iterrows():
-                line_name = net.line.loc[idx, 'name']
-                user_friendly_name = getattr(net, 'user_friendly_names', {}).get(line_name, line_name)
-                all_lines.append(TimeSeriesLineOut(
-                    name=get_display_name(user_friendly_name, line_name, 'Line', idx, 'timeseries'),
-                    id=str(line_name),
-                    time_step=t,
-                    loading_percent=safe_float(line['loading_percent']),
-                    p_from_mw=safe_float(line['p_from_mw']),
-                    p_to_mw=safe_float(line['p_to_mw'])
-                ))
-
-            if load_results is not None:
-                for idx, load in load_results.iterrows():
-                    load_name = net.load.loc[idx, 'name']
-                    user_friendly_name = getattr(net, 'user_friendly_names', {}).get(load_name, load_name)
-                    all_loads.append(TimeSeriesLoadOut(
-                        name=get_display_name(user_friendly_name, load_name, 'Load', idx, 'timeseries'),
-                        id=str(load_name),
-                        time_step=t,
-                        p_mw=safe_float(load['p_mw']),
-                        q_mvar=safe_float(load['q_mvar'])
-                    ))
-
-            if sgen_results is not None:
-                for idx, sgen in sgen_results.iterrows():
-                    sgen_name = net.sgen.loc[idx, 'name']
-                    user_friendly_name = getattr(net, 'user_friendly_names', {}).get(sgen_name, sgen_name)
-                    all_sgens.append(TimeSeriesSgenOut(
-                        name=get_display_name(user_friendly_name, sgen_name, 'Static Generator', idx, 'timeseries'),
-                        id=str(sgen_name),
-                        time_step=t,
-                        p_mw=safe_float(sgen['p_mw']),
-                        q_mvar=safe_float(sgen['q_mvar'])
-                    ))
+        # Results are kept as (steps × elements) arrays and serialized into the output rows at the end;
+        # streaming (NDJSON) callers get the rows per step through the partial callback instead.
+        partial_cb = timeseries_params.get('_partial_callback')
+        cancel = timeseries_params.get('_cancel_token')
+
+        # Profiles are resolved once into (steps × elements) setpoint matrices per table column
+        profiles = {}
+        for table, element_type, orig_p, orig_q, global_values in (
+                ('load', 'load', orig_load_p, orig_load_q, load_profile_values),
+                ('sgen', 'sgen', orig_sgen_p, orig_sgen_q, gen_profile_values),
+                ('gen', 'gen', orig_gen_p, orig_gen_q, gen_profile_values)):
+            if orig_p is None:
+                continue
+            p, q = _ts_profile_matrix(net[table], element_type, orig_p, orig_q, global_values,
+                                      time_steps, resolved_profiles)
+            profiles[(table, 'p_mw')] = p
+            if 'q_mvar' in net[table].columns:
+                profiles[(table, 'q_mvar')] = q
+
+        store = _TimeSeriesResultStore(net, time_steps)
+
+        if timeseries_params.get('engine', 'loop') == 'native':
+            _ts_run_native(net, timeseries_params, profiles, store, cancel)
+            step_converged = [True] * time_steps
+            if partial_cb:
+                for t in range(time_steps):
+                    partial_cb(store.rows(t))
+        else:
+            step_converged = []
+            prev_converged = False
+            for t in range(time_steps):
+                study_cancellation.check(cancel)
+                for (table, column), matrix in profiles.items():
+                    net[table][column] = matrix[t]
+
+                prev_converged = _ts_run_powerflow(net, timeseries_params, t, prev_converged)
+                step_converged.append(net.converged)
+                store.record(net, t)
+                if partial_cb:
+                    partial_cb(store.rows(t))
+
+        # Streaming (NDJSON) callers got the rows per step through the partial callback
+        if partial_cb:
+            lists = {key: [] for key, _table, _prefix, _columns in _TS_OUTPUTS}
+        else:
+            lists = store.lists()
+        vm_stats, loading_stats = store.statistics()
 
-        # Summary statistics with display names (user-friendly + technical ID)
-        vm_stats = {}
-        for idx, bus in net.bus.iterrows():
-            bus_name = bus['name']
-            user_friendly_name = getattr(net, 'user_friendly_names', {}).get(bus_name, bus_name)
-            display_name = get_display_name(user_friendly_name, bus_name, 'Bus', idx, 'timeseries')
-            vm_values = [all_busbars[i].vm_pu for i in range(len(all_busbars)) 
-                        if all_busbars[i].name == display_name]
-            if vm_values:  # Check if list is not empty
-                vm_stats[display_name] = {
-                    'min_vm_pu': min(vm_values),
-                    'max_vm_pu': max(vm_values),
-                    'avg_vm_pu': sum(vm_values) / len(vm_values)
-                }
-            else:
-                vm_stats[display_name] = {
-                    'min_vm_pu': 0.0,
-                    'max_vm_pu': 0.0,
-                    'avg_vm_pu': 0.0
-                }
-        
-        loading_stats = {}
-        for idx, line in net.line.iterrows():
-            line_name = line['name']
-            user_friendly_name = getattr(net, 'user_friendly_names', {}).get(line_name, line_name)
-            display_name = get_display_name(user_friendly_name, line_name, 'Line', idx, 'timeseries')
-            loading_values = [all_lines[i].loading_percent for i in range(len(all_lines)) 
-                             if all_lines[i].name == display_name]
-            if loading_values:  # Check if list is not empty
-                loading_stats[display_name] = {
-                    'min_loading_percent': min(loading_values),
-                    'max_loading_percent': max(loading_values),
-                    'avg_loading_percent': sum(loading_values) / len(loading_values)
-                }
-            else:
-                loading_stats[display_name] = {
-                    'min_loading_percent': 0.0,
-                    'max_loading_percent': 0.0,
-                    'avg_loading_percent': 0.0
-                }
-        
-        timeseries_converged = all(result['converged'] for result in all_results)
-        
         return {
-            'timeseries_converged': timeseries_converged,
+            'timeseries_converged': all(step_converged),
             'time_steps': time_steps,
             'profile_mode': profile_mode,
             'load_profile': load_profile,
@@ -8091,10 +7184,7 @@ def time_series_simulation(net, timeseries_params):
             'load_profile_values': load_profile_values,
             'generation_profile_values': gen_profile_values,
             'profiles_used': profiles_used,
-            'busbars': [vars(bus) for bus in all_busbars],
-            'lines': [vars(line) for line in all_lines],
-            'loads': [vars(ld) for ld in all_loads],
-            'sgens': [vars(sg) for sg in all_sgens],
+            **lists,
             'voltage_statistics': vm_stats,
             'loading_statistics': loading_stats,
             'time_stamps': [str(ts) for ts in time_stamps]
@@ -8194,10 +7284,11 @@ class BESSControlForTargetBus(control.basic_controller.Controller):
         if self.iteration == 0:
             print(f"  DEBUG: Storage AFTER setting: p_mw={net.storage.at[self.element_index, 'p_mw']}, q_mvar={net.storage.at[self.element_index, 'q_mvar']}")
         
-        # Run power flow to get current state (with sufficient iterations)
+        # Run power flow to get current state (with sufficient iterations); only the storage
+        # setpoint changed since the last iteration, so the previous ppc / Ybus are reused
         try:
-            pp.runpp(net, algorithm='nr', calculate_voltage_angles=True, 
-                    init='auto', verbose=False)
+            repeated_powerflow.runpp(net, algorithm='nr', calculate_voltage_angles=True,
+                                     init='auto', verbose=False)
         except Exception as e:
             # If power flow fails, don't update - keep current values
             # This can happen if the network is infeasible
@@ -8431,7 +7522,9 @@ def bess_sizing(net, bess_params):
         )
         
         # Run iterative control loop
+        cancel = bess_params.get('_cancel_token')
         for iteration in range(max_iterations):
+            study_cancellation.check(cancel)
             bess_ctrl.applied = False
             # Call control_step which will run power flow and adjust BESS power
             bess_ctrl.control_step(net_ctrl)
@@ -8776,12 +7869,18 @@ def economic_analysis(net, in_data, params):
             orig_sgen_p = net.sgen['p_mw'].copy() if len(net.sgen) > 0 else None
             orig_sgen_q = net.sgen['q_mvar'].copy() if len(net.sgen) > 0 and 'q_mvar' in net.sgen.columns else None
 
+            # Streaming (NDJSON) callers get each sampled lookup point as it is solved
+            partial_cb = params.get('_partial_callback')
+            cancel = params.get('_cancel_token')
+
             # Lookup table: precompute power flows for (load_scale, gen_scale) grid; interpolate per hour
+            loss_points = []  # the sampled lookup points, returned as result['loss_grid']
             use_1d = (load_profile == 'constant')
             if use_1d:
                 gen_vals = np.linspace(0, 1, 21)
                 loss_vals = np.zeros(21)
                 for i, gs in enumerate(gen_vals):
+                    study_cancellation.check(cancel)
                     if orig_load_p is not None:
                         net.load['p_mw'] = orig_load_p
                         net.load['q_mvar'] = orig_load_q
@@ -8793,11 +7892,14 @@ def economic_analysis(net, in_data, params):
                             net.sgen['q_mvar'] = orig_sgen_q * gs
                     try:
                         init_this = init if i == 0 else "results"
-                        pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init_this,
+                        repeated_powerflow.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init_this,
                                  **_electrisim_enforce_q_lims_kw(net))
                         loss_vals[i] = _economic_get_loss_mw(net) if net.converged else 0.0
                     except Exception:
                         loss_vals[i] = 0.0
+                    loss_points.append({'load_scale': 1.0, 'gen_scale': float(gs), 'loss_mw': float(loss_vals[i])})
+                    if partial_cb:
+                        partial_cb({'loss_grid': loss_points[-1:]})
                 losses_per_hour = np.interp(gen_scale, gen_vals, loss_vals)
             else:
                 load_vals = np.linspace(0.1, 1.2, 11)
@@ -8805,6 +7907,7 @@ def economic_analysis(net, in_data, params):
                 loss_grid = np.zeros((11, 11))
                 for i, ls in enumerate(load_vals):
                     for j, gs in enumerate(gen_vals):
+                        study_cancellation.check(cancel)
                         if orig_load_p is not None:
                             net.load['p_mw'] = orig_load_p * ls
                             net.load['q_mvar'] = orig_load_q * ls
@@ -8816,11 +7919,14 @@ def economic_analysis(net, in_data, params):
                                 net.sgen['q_mvar'] = orig_sgen_q * gs
                         try:
                             init_this = init if (i == 0 and j == 0) else "results"
-                            pp.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init_this,
+                            repeated_powerflow.runpp(net, algorithm=algorithm, calculate_voltage_angles=calculate_voltage_angles, init=init_this,
                                      **_electrisim_enforce_q_lims_kw(net))
                             loss_grid[i, j] = _economic_get_loss_mw(net) if net.converged else 0.0
                         except Exception:
                             loss_grid[i, j] = 0.0
+                        loss_points.append({'load_scale': float(ls), 'gen_scale': float(gs), 'loss_mw': float(loss_grid[i, j])})
+                        if partial_cb:
+                            partial_cb({'loss_grid': loss_points[-1:]})
                 from scipy.interpolate import RegularGridInterpolator
                 interp = RegularGridInterpolator((load_vals, gen_vals), loss_grid, method='linear', bounds_error=False, fill_value=0.0)
                 pts = np.column_stack((load_scale, gen_scale))
@@ -8864,6 +7970,8 @@ def economic_analysis(net, in_data, params):
             result['calculation_mode'] = calculation_mode
             result['load_profile_values'] = load_scale.tolist()
             result['generation_profile_values'] = gen_scale.tolist()
+            # Streamed points were sent as partials already
+            result['loss_grid'] = [] if partial_cb else loss_points
         return result
         
     except Exception as e:
@@ -8893,10 +8001,10 @@ def _rpc_q_curve_table_subset(qtbl, cid):
     return qtbl.loc[col == cnum]
 
 
-def _rpc_interp_sgen_pq_limits(net, sgen_idx, p_mw):
+def _rpc_sgen_q_curve(net, sgen_idx):
     """
-    Interpolate (q_min_mvar, q_max_mvar) at p_mw from net.q_capability_curve_table for the
-    characteristic linked to net.sgen row sgen_idx. Returns None if unavailable.
+    (p_mw, q_min_mvar, q_max_mvar) float arrays sorted by P of the net.q_capability_curve_table
+    characteristic linked to net.sgen row sgen_idx; None unless it has at least two points.
     """
     try:
         if not hasattr(net, 'sgen') or net.sgen.empty:
@@ -8915,68 +8023,88 @@ def _rpc_interp_sgen_pq_limits(net, sgen_idx, p_mw):
         if len(sub) < 2:
             return None
         sub = sub.sort_values('p_mw')
-        p = sub['p_mw'].astype(float).values
-        qmin = sub['q_min_mvar'].astype(float).values
-        qmax = sub['q_max_mvar'].astype(float).values
-        p_m = float(p_mw)
-        q_mi = float(np.interp(p_m, p, qmin))
-        q_ma = float(np.interp(p_m, p, qmax))
-        return (q_mi, q_ma)
+        return (sub['p_mw'].astype(float).values,
+                sub['q_min_mvar'].astype(float).values,
+                sub['q_max_mvar'].astype(float).values)
     except Exception:
         return None
 
 
-def _rpc_sgen_has_q_curve(net, sgen_idx):
-    """True if this sgen row is linked to at least two points in q_capability_curve_table."""
-    try:
-        if not hasattr(net, 'sgen') or net.sgen.empty:
-            return False
-        if 'id_q_capability_characteristic' not in net.sgen.columns:
-            return False
-        cid = net.sgen.at[sgen_idx, 'id_q_capability_characteristic']
-        if cid is None or (isinstance(cid, float) and pd.isna(cid)):
-            return False
-        qtbl = net.get('q_capability_curve_table', None)
-        if qtbl is None or (hasattr(qtbl, 'empty') and qtbl.empty):
-            return False
-        if 'id_q_capability_curve' not in qtbl.columns:
-            return False
-        sub = _rpc_q_curve_table_subset(qtbl, cid)
-        return len(sub) >= 2
-    except Exception:
-        return False
+class _RpcQCapability:
+    """
+    Q capability of the RPC generators (gen_info order), compiled once per study.
 
+    Curves from net.q_capability_curve_table are stored as one padded (generators × breakpoints)
+    matrix each for P (padded with +inf), q_min and q_max, so caps() interpolates all generators'
+    limits at their P with one vectorized pass (same arithmetic as np.interp: clipped to the end
+    values outside the curve).
 
-def _rpc_sgen_q_caps(net, sgen_idx, p_gen, sn, mode):
+    mode (rpc_params['q_capability_mode']):
+      - 'from_sgen_curve': q_max / -q_min of the unit's curve; units without one: sqrt(S_n^2 - P^2)
+      - 'from_rating': sqrt(S_n^2 - P^2)
+      - otherwise (e.g. 'fixed_fraction'): 0.5 * S_n
     """
-    (q_pos_cap, q_neg_cap) for RPC sweeps: positive Q uses q_pos_cap * fraction;
-    negative Q uses -q_neg_cap * fraction. For symmetric modes both are equal.
-    """
-    if mode == 'from_sgen_curve':
-        lim = _rpc_interp_sgen_pq_limits(net, sgen_idx, p_gen)
-        if lim is not None:
-            q_mi, q_ma = lim
-            q_pos = max(0.0, float(q_ma))
-            q_neg = max(0.0, float(-q_mi))
-            return q_pos, q_neg
-        if sn > 0:
-            fr = math.sqrt(max(sn ** 2 - p_gen ** 2, 0))
-            return fr, fr
-        return 0.0, 0.0
-    if mode == 'from_rating':
-        if sn <= 0:
-            return 0.0, 0.0
-        fr = math.sqrt(max(sn ** 2 - p_gen ** 2, 0))
-        return fr, fr
-    half = sn * 0.5 if sn > 0 else 0.0
-    return half, half
 
-
-def _rpc_masked_q_interp_clip(p_target, p_list, q_list):
+    def __init__(self, net, gen_info, mode):
+        self.mode = mode
+        self.sn = np.array([float(g['sn_mva']) for g in gen_info], dtype=float)
+        curves = [_rpc_sgen_q_curve(net, g['idx']) if mode == 'from_sgen_curve' else None for g in gen_info]
+        self.has_curve = np.array([c is not None for c in curves], dtype=bool)
+        width = max([len(c[0]) for c in curves if c is not None] or [2])
+        self.n_points = np.array([len(c[0]) if c is not None else 2 for c in curves], dtype=int)
+        self.p_bp = np.full((len(curves), width), np.inf)
+        self.q_min_bp = np.zeros((len(curves), width))
+        self.q_max_bp = np.zeros((len(curves), width))
+        for row, curve in enumerate(curves):
+            if curve is None:
+                self.p_bp[row, :2] = (0.0, 1.0)
+                continue
+            p, q_min, q_max = curve
+            self.p_bp[row, :len(p)] = p
+            self.q_min_bp[row, :len(p)] = q_min
+            self.q_min_bp[row, len(p):] = q_min[-1]
+            self.q_max_bp[row, :len(p)] = q_max
+            self.q_max_bp[row, len(p):] = q_max[-1]
+
+    def _interp(self, p, q_bp):
+        rows = np.arange(len(p))
+        # Last breakpoint <= p (-1 left of the curve), as np.interp's search
+        j = (self.p_bp <= p[:, None]).sum(axis=1) - 1
+        last = self.n_points - 1
+        j_lo = np.clip(j, 0, last - 1)
+        x0, x1 = self.p_bp[rows, j_lo], self.p_bp[rows, j_lo + 1]
+        y0, y1 = q_bp[rows, j_lo], q_bp[rows, j_lo + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inner = (y1 - y0) / (x1 - x0) * (p - x0) + y0
+        out = np.where(p == x0, y0, inner)
+        out = np.where(j < 0, q_bp[:, 0], out)
+        return np.where(j >= last, q_bp[rows, last], out)
+
+    def has_any_curve(self):
+        return bool(self.has_curve.any())
+
+    def caps(self, p_gen):
+        """
+        (q_pos_cap, q_neg_cap) arrays at the generators' P (array, gen_info order): positive Q
+        uses q_pos_cap * fraction, negative Q uses -q_neg_cap * fraction.
+        """
+        p_gen = np.asarray(p_gen, dtype=float)
+        if self.mode not in ('from_sgen_curve', 'from_rating'):
+            half = np.where(self.sn > 0, self.sn * 0.5, 0.0)
+            return half, half
+        circle = np.where(self.sn > 0, np.sqrt(np.maximum(self.sn ** 2 - p_gen ** 2, 0.0)), 0.0)
+        if self.mode == 'from_rating' or not self.has_curve.any():
+            return circle, circle
+        q_pos = np.where(self.has_curve, np.maximum(0.0, self._interp(p_gen, self.q_max_bp)), circle)
+        q_neg = np.where(self.has_curve, np.maximum(0.0, -self._interp(p_gen, self.q_min_bp)), circle)
+        return q_pos, q_neg
+
+
+def _rpc_masked_q_interpolator(p_list, q_list):
     """
-    Interpolate Q at p_target using only finite (p, q) pairs (skip None q from failed PF).
-    Outside the span of valid P, clip to endpoint values (matches line chart behavior).
-    Returns None if there are no valid pairs.
+    Interpolator Q(p) over the finite (p, q) pairs of a capability curve (None q from a failed PF
+    is skipped); outside the span of valid P it clips to the endpoint values (matches line chart
+    behavior). Takes and returns arrays. Returns None if there are no valid pairs.
     """
     pairs = []
     for p, q in zip(p_list, q_list):
@@ -8991,10 +8119,9 @@ def _rpc_masked_q_interp_clip(p_target, p_list, q_list):
     pairs.sort(key=lambda t: t[0])
     px = np.array([t[0] for t in pairs], dtype=float)
     qy = np.array([t[1] for t in pairs], dtype=float)
-    pt = float(p_target)
     if len(px) == 1:
-        return float(qy[0])
-    return float(np.interp(pt, px, qy, left=float(qy[0]), right=float(qy[-1])))
+        return lambda p_target: np.full(len(p_target), qy[0])
+    return lambda p_target: np.interp(p_target, px, qy, left=float(qy[0]), right=float(qy[-1]))
 
 
 def reactive_power_capability(net, rpc_params):
@@ -9011,6 +8138,14 @@ def reactive_power_capability(net, rpc_params):
 
     rpc_params may include verbose_iwamoto (default False): when True, pandapower's
     per-iteration Iwamoto multiplier lines are printed; otherwise they are suppressed.
+
+    With limit_overloads, Q limits that overload a branch are searched by _rpc_search_q_limit:
+    rpc_params['q_search'] 'bisection' (default) or 'illinois' (continuation from the previous
+    P point, stops at rpc_params['q_tolerance_mvar'], default 0.01).
+
+    rpc_params['engine'] 'opf' solves each operating point as an OPF instead (_rpc_opf_chain); it
+    falls back to the power flow engine ('pf', default) when discrete controllers are active or no
+    external grid / selected generator is connected at the PCC.
     """
     import traceback
 
@@ -9028,7 +8163,11 @@ def reactive_power_capability(net, rpc_params):
         requirements = rpc_params.get('requirements', None)
         grid_code_template_name = rpc_params.get('grid_code_template_name')
         verbose_iwamoto = bool(rpc_params.get('verbose_iwamoto', False))
+        q_search = rpc_params.get('q_search') or 'bisection'
+        q_tolerance_mvar = float(rpc_params.get('q_tolerance_mvar', 0.01))
+        engine = rpc_params.get('engine') or 'pf'
         progress_cb = rpc_params.get('_progress_callback')
+        cancel = rpc_params.get('_cancel_token')
         rc2, rc3, rcs = _resolve_controller_family_flags(rpc_params)
         run_control_any = rc2 or rc3 or rcs
 
@@ -9039,7 +8178,8 @@ def reactive_power_capability(net, rpc_params):
         print(f"  Voltage levels: {voltage_levels}")
         print(f"  P range: {p_min_mw} - {p_max_mw} MW, {p_steps} steps")
         print(f"  Q capability mode: {q_capability_mode}")
-        print(f"  Limit overloads: {limit_overloads}")
+        print(f"  Limit overloads: {limit_overloads} (Q limit search: {q_search}, tolerance {q_tolerance_mvar} Mvar)")
+        print(f"  Engine: {engine}")
         print(
             f"  controllers: 2w_tap={rc2}, 3w_tap={rc3}, shunt={rcs} "
             f"(any={run_control_any})"
@@ -9123,8 +8263,9 @@ def reactive_power_capability(net, rpc_params):
                 )
         except Exception:
             pass
+        q_caps = _RpcQCapability(net, gen_info, q_capability_mode)
         if q_capability_mode == 'from_sgen_curve':
-            if not any(_rpc_sgen_has_q_curve(net, g['idx']) for g in gen_info):
+            if not q_caps.has_any_curve():
                 warnings_list.append(
                     'Q mode "from_sgen_curve": no selected static generator has an active P–Q curve '
                     '(enable reactive capability on the unit). Using circular √(S_n²−P²) fallback for all.'
@@ -9154,111 +8295,111 @@ def reactive_power_capability(net, rpc_params):
             )
         compliance = {}
 
+        # One solve on the base net: the copies made for every sweep point then carry its ppc and
+        # Ybus, and their first power flow strategy is a recycled solve (see repeated_powerflow).
+        if not any(_rpc_controller_flags(net, rc2, rc3, rcs)):
+            try:
+                repeated_powerflow.runpp(net, calculate_voltage_angles=True, **_RPC_FIRST_PF,
+                                         **_electrisim_enforce_q_lims_kw(net))
+            except Exception:
+                pass
+
+        # One task per operating point: Q_max and Q_min of every P point of every voltage level
+        ctx = {
+            'ext_grid_idx': ext_grid_idx, 'pcc_bus_idx': pcc_bus_idx, 'gen_info': gen_info,
+            'total_installed_mw': total_installed_mw, 'q_caps': q_caps,
+            'limit_overloads': limit_overloads, 'max_loading_percent': max_loading_percent,
+            'verbose_iwamoto': verbose_iwamoto, 'rc2': rc2, 'rc3': rc3, 'rcs': rcs,
+            'q_search': q_search, 'q_tolerance_mvar': q_tolerance_mvar,
+        }
+        tasks = [(float(v_pu), float(p_total), direction)
+                 for v_pu in voltage_levels for p_total in p_points for direction in ('max', 'min')]
+        point_results = [None] * len(tasks)
+        search_power_flows = 0
+        opf_runs = 0
+
+        if engine == 'opf':
+            if any(_rpc_controller_flags(net, rc2, rc3, rcs)):
+                warnings_list.append('RPC engine "opf" cannot model discrete controllers; used the power flow engine.')
+                engine = 'pf'
+            elif not _rpc_opf_objective(net, ctx):
+                warnings_list.append('RPC engine "opf" needs the External Grid or a selected generator at the PCC bus; '
+                                     'used the power flow engine.')
+                engine = 'pf'
+
+        if engine == 'opf':
+            # One chain per voltage level and direction, so each OPF is warm-started from the previous P point
+            chains = [(float(v_pu), direction, [float(p) for p in p_points])
+                      for v_pu in voltage_levels for direction in ('max', 'min')]
+
+            def _on_chain(number, points):
+                v_val, direction, chain_p = chains[number]
+                first = (number // 2) * len(p_points) * 2 + (0 if direction == 'max' else 1)
+                for offset, (p_val, point) in enumerate(zip(chain_p, points)):
+                    point_results[first + 2 * offset] = point
+                    if progress_cb:
+                        q_txt = 'failed' if point['q_pcc'] is None else f"{point['q_pcc']:.4f} Mvar"
+                        progress_cb(f"  V={v_val}pu, P={p_val:.1f}MW: Q_{direction}={q_txt}")
+
+            if progress_cb:
+                progress_cb(f"Solving {len(tasks)} RPC operating points as OPF on "
+                            f"{rpc_sweep.workers_for(len(chains))} worker(s)")
+            rpc_sweep.run(net, chains, _rpc_opf_chain, _on_chain, (ctx,), cancel=cancel)
+        elif rpc_sweep.workers_for(len(tasks)) > 1:
+            # Points are independent on the pool; the limit search then starts without continuation
+            def _on_point(number, point):
+                point_results[number] = point
+                v_val, p_val, direction = tasks[number]
+                if progress_cb:
+                    q_txt = 'failed' if point['q_pcc'] is None else f"{point['q_pcc']:.4f} Mvar"
+                    progress_cb(f"  V={v_val}pu, P={p_val:.1f}MW: Q_{direction}={q_txt}")
+
+            if progress_cb:
+                progress_cb(f"Solving {len(tasks)} RPC operating points on {rpc_sweep.workers_for(len(tasks))} workers")
+            rpc_sweep.run(net, [task + (None,) for task in tasks], _rpc_sweep_point, _on_point, (ctx,), cancel=cancel)
+        else:
+            number = 0
+            for v_pu in voltage_levels:
+                _vl_msg = f"\n  --- Voltage level: {v_pu} pu ---"
+                print(_vl_msg)
+                if progress_cb:
+                    progress_cb(_vl_msg)
+                # Fraction of the Q capability found at the previous overload-limited P point (continuation);
+                # the same P point of the previous voltage level, once there is one, is usually closer
+                frac_guess = {'max': None, 'min': None}
+                for _p_total in p_points:
+                    for direction in ('max', 'min'):
+                        if v_pu != voltage_levels[0]:
+                            prev_frac = point_results[number - 2 * len(p_points)]['frac']
+                            if prev_frac is not None:
+                                frac_guess[direction] = prev_frac
+                        point = _rpc_sweep_point(net, tasks[number] + (frac_guess[direction],), ctx, cancel=cancel)
+                        frac_guess[direction] = point['frac']
+                        point_results[number] = point
+                        number += 1
+
+        # OPF engine points that were solved by the power flow engine instead
+        opf_fallback_points = []
+        for (v_val, p_val, direction), point in zip(tasks, point_results):
+            warnings_list.extend(point['warnings'])
+            search_power_flows += point['power_flows']
+            opf_runs += point.get('opf_runs', 0)
+            if point.get('opf_fallback'):
+                opf_fallback_points.append({'v_pu': round(v_val, 4), 'p_mw': round(p_val, 4), 'direction': direction})
+
+        number = 0
         for v_pu in voltage_levels:
             v_key = f"{float(v_pu):.4f}"
-            _vl_msg = f"\n  --- Voltage level: {v_pu} pu ---"
-            print(_vl_msg)
-            if progress_cb:
-                progress_cb(_vl_msg)
 
             p_result = []
             q_max_result = []
             q_min_result = []
 
             for p_total in p_points:
-                p_val = float(p_total)
-
-                # --- Q_max sweep (overexcited, positive Q) ---
-                q_max_pcc = None
-                for q_frac in [1.0, 0.9, 0.8, 0.7, 0.5, 0.3, 0.0]:
-                    net_copy = deepcopy(net)
-                    net_copy.ext_grid.at[ext_grid_idx, 'vm_pu'] = float(v_pu)
-                    for g in gen_info:
-                        share = g['sn_mva'] / total_installed_mw
-                        p_gen = p_val * share
-                        q_pos_cap, q_neg_cap = _rpc_sgen_q_caps(
-                            net, g['idx'], p_gen, g['sn_mva'], q_capability_mode)
-                        net_copy.sgen.at[g['idx'], 'p_mw'] = p_gen
-                        net_copy.sgen.at[g['idx'], 'q_mvar'] = q_pos_cap * q_frac
-
-                    if _rpc_run_pf_robust(net_copy, verbose_iwamoto, rc2, rc3, rcs):
-                        q_max_pcc = _rpc_pcc_q_for_chart(net_copy, pcc_bus_idx, ext_grid_idx)
-                        if limit_overloads:
-                            overloaded = False
-                            if not net_copy.res_trafo.empty and net_copy.res_trafo.loading_percent.max() > max_loading_percent:
-                                overloaded = True
-                            if not net_copy.res_line.empty and net_copy.res_line.loading_percent.max() > max_loading_percent:
-                                overloaded = True
-                            if overloaded:
-                                q_max_pcc = _rpc_binary_search_q(
-                                    net, ext_grid_idx, float(v_pu), gen_info,
-                                    total_installed_mw, p_val, q_capability_mode,
-                                    'max', max_loading_percent, pcc_bus_idx,
-                                    verbose_iwamoto=verbose_iwamoto,
-                                    run_control_trafo2w=rc2,
-                                    run_control_trafo3w=rc3,
-                                    run_control_shunt=rcs,
-                                )
-                                warnings_list.append(
-                                    f"V={v_pu}pu, P={p_val:.1f}MW: Q_max limited due to overload"
-                                )
-                        if q_frac < 1.0:
-                            warnings_list.append(
-                                f"V={v_pu}pu, P={p_val:.1f}MW: Q_max converged at {q_frac*100:.0f}% capability"
-                            )
-                        break
-                    else:
-                        continue
-
-                if q_max_pcc is None:
-                    print(f"    Q_max PF failed at P={p_val:.1f}MW, V={v_pu}pu (all strategies)")
-
-                # --- Q_min sweep (underexcited, negative Q) ---
-                q_min_pcc = None
-                for q_frac in [1.0, 0.9, 0.8, 0.7, 0.5, 0.3, 0.0]:
-                    net_copy2 = deepcopy(net)
-                    net_copy2.ext_grid.at[ext_grid_idx, 'vm_pu'] = float(v_pu)
-                    for g in gen_info:
-                        share = g['sn_mva'] / total_installed_mw
-                        p_gen = p_val * share
-                        q_pos_cap, q_neg_cap = _rpc_sgen_q_caps(
-                            net, g['idx'], p_gen, g['sn_mva'], q_capability_mode)
-                        net_copy2.sgen.at[g['idx'], 'p_mw'] = p_gen
-                        net_copy2.sgen.at[g['idx'], 'q_mvar'] = -q_neg_cap * q_frac
-
-                    if _rpc_run_pf_robust(net_copy2, verbose_iwamoto, rc2, rc3, rcs):
-                        q_min_pcc = _rpc_pcc_q_for_chart(net_copy2, pcc_bus_idx, ext_grid_idx)
-                        if limit_overloads:
-                            overloaded = False
-                            if not net_copy2.res_trafo.empty and net_copy2.res_trafo.loading_percent.max() > max_loading_percent:
-                                overloaded = True
-                            if not net_copy2.res_line.empty and net_copy2.res_line.loading_percent.max() > max_loading_percent:
-                                overloaded = True
-                            if overloaded:
-                                q_min_pcc = _rpc_binary_search_q(
-                                    net, ext_grid_idx, float(v_pu), gen_info,
-                                    total_installed_mw, p_val, q_capability_mode,
-                                    'min', max_loading_percent, pcc_bus_idx,
-                                    verbose_iwamoto=verbose_iwamoto,
-                                    run_control_trafo2w=rc2,
-                                    run_control_trafo3w=rc3,
-                                    run_control_shunt=rcs,
-                                )
-                                warnings_list.append(
-                                    f"V={v_pu}pu, P={p_val:.1f}MW: Q_min limited due to overload"
-                                )
-                        if q_frac < 1.0:
-                            warnings_list.append(
-                                f"V={v_pu}pu, P={p_val:.1f}MW: Q_min converged at {q_frac*100:.0f}% capability"
-                            )
-                        break
-                    else:
-                        continue
-
-                if q_min_pcc is None:
-                    print(f"    Q_min PF failed at P={p_val:.1f}MW, V={v_pu}pu (all strategies)")
-
-                p_result.append(round(p_val, 4))
+                q_max_pcc = point_results[number]['q_pcc']
+                q_min_pcc = point_results[number + 1]['q_pcc']
+                number += 2
+                p_result.append(round(float(p_total), 4))
                 q_max_result.append(round(q_max_pcc, 4) if q_max_pcc is not None else None)
                 q_min_result.append(round(q_min_pcc, 4) if q_min_pcc is not None else None)
 
@@ -9302,17 +8443,16 @@ def reactive_power_capability(net, rpc_params):
                                     continue
                                 if p_lo <= pf <= p_hi:
                                     p_check.add(pf)
-                            for p_s in sorted(p_check):
-                                req_max_v = float(np.interp(p_s, rp, rmax, left=float(rmax[0]), right=float(rmax[-1])))
-                                req_min_v = float(np.interp(p_s, rp, rmin, left=float(rmin[0]), right=float(rmin[-1])))
-                                cap_max_v = _rpc_masked_q_interp_clip(p_s, p_result, q_max_result)
-                                cap_min_v = _rpc_masked_q_interp_clip(p_s, p_result, q_min_result)
-                                if cap_max_v is None or cap_min_v is None:
-                                    is_compliant = False
-                                    break
-                                if cap_max_v < req_max_v - tol_mvar or cap_min_v > req_min_v + tol_mvar:
+                            p_s = np.array(sorted(p_check), dtype=float)
+                            cap_max = _rpc_masked_q_interpolator(p_result, q_max_result)
+                            cap_min = _rpc_masked_q_interpolator(p_result, q_min_result)
+                            if cap_max is None or cap_min is None:
+                                is_compliant = False
+                            else:
+                                req_max_v = np.interp(p_s, rp, rmax, left=float(rmax[0]), right=float(rmax[-1]))
+                                req_min_v = np.interp(p_s, rp, rmin, left=float(rmin[0]), right=float(rmin[-1]))
+                                if np.any((cap_max(p_s) < req_max_v - tol_mvar) | (cap_min(p_s) > req_min_v + tol_mvar)):
                                     is_compliant = False
-                                    break
 
                     compliance[v_key] = is_compliant
                 else:
@@ -9332,6 +8472,15 @@ def reactive_power_capability(net, rpc_params):
                 'generator_count': len(gen_info),
                 'grid_code_template_name': grid_code_template_name,
                 'q_capability_mode': q_capability_mode,
+                'q_limit_search': {
+                    'engine': engine,
+                    'opf_runs': opf_runs,
+                    # The OPF engine has no limit search (its fallback points use q_search)
+                    'method': q_search if engine == 'pf' else None,
+                    'tolerance_mvar': q_tolerance_mvar if engine == 'pf' and q_search == 'illinois' else None,
+                    'power_flows': search_power_flows,
+                    'opf_fallback_points': opf_fallback_points if engine == 'opf' else None,
+                },
                 'tap_changer_control': {
                     'run_control_requested': run_control_any,
                     'controllers_applied': bool(has_applicable),
@@ -9349,7 +8498,7 @@ def reactive_power_capability(net, rpc_params):
             }
         }
 
-        return json.dumps(result, default=_json_serialize_default, separators=(',', ':'))
+        return result_json.dumps(result)
 
     except Exception as e:
         traceback.print_exc()
@@ -9442,6 +8591,224 @@ def _electrisim_attach_discrete_shunt_controllers(net):
             pass
 
 
+def _rpc_sweep_point(net, task, ctx, cancel=None):
+    """
+    Q_max (direction 'max', overexcited) or Q_min ('min', underexcited) at the PCC for one RPC
+    operating point task = (v_pu, p_total_mw, direction, frac_guess) on the base net, with the
+    study settings in ctx (see reactive_power_capability). The generators get their share of P and
+    their full Q capability, stepped down (90 %, 80 %, ... 0 %) until the power flow converges;
+    with limit_overloads an overloading result is replaced by the Q limit search
+    (_rpc_search_q_limit, starting from frac_guess).
+    Returns {'q_pcc' (None when no power flow converged), 'frac' (next frac_guess),
+    'power_flows' (of the limit search), 'warnings'}. Leaves net as it found it.
+    """
+    v_pu, p_val, direction, frac_guess = task
+    ext_grid_idx = ctx['ext_grid_idx']
+    max_loading_percent = ctx['max_loading_percent']
+    label = 'Q_max' if direction == 'max' else 'Q_min'
+    warnings_list = []
+    power_flows = 0
+    q_pcc = None
+    p_gens = [p_val * (g['sn_mva'] / ctx['total_installed_mw']) for g in ctx['gen_info']]
+    q_pos_caps, q_neg_caps = ctx['q_caps'].caps(p_gens)
+    for q_frac in [1.0, 0.9, 0.8, 0.7, 0.5, 0.3, 0.0]:
+        study_cancellation.check(cancel)
+        net_copy = deepcopy(net)
+        net_copy.ext_grid.at[ext_grid_idx, 'vm_pu'] = v_pu
+        for g, p_gen, q_pos_cap, q_neg_cap in zip(ctx['gen_info'], p_gens, q_pos_caps.tolist(), q_neg_caps.tolist()):
+            net_copy.sgen.at[g['idx'], 'p_mw'] = p_gen
+            net_copy.sgen.at[g['idx'], 'q_mvar'] = q_pos_cap * q_frac if direction == 'max' else -q_neg_cap * q_frac
+
+        if _rpc_run_pf_robust(net_copy, ctx['verbose_iwamoto'], ctx['rc2'], ctx['rc3'], ctx['rcs']):
+            q_pcc = _rpc_pcc_q_for_chart(net_copy, ctx['pcc_bus_idx'], ext_grid_idx)
+            if ctx['limit_overloads']:
+                loading = -np.inf
+                if not net_copy.res_trafo.empty:
+                    loading = max(loading, net_copy.res_trafo.loading_percent.max())
+                if not net_copy.res_line.empty:
+                    loading = max(loading, net_copy.res_line.loading_percent.max())
+                if loading > max_loading_percent:
+                    q_pcc, frac_guess, power_flows = _rpc_search_q_limit(
+                        net, ext_grid_idx, v_pu, ctx['gen_info'],
+                        ctx['total_installed_mw'], p_val, ctx['q_caps'],
+                        direction, max_loading_percent, ctx['pcc_bus_idx'],
+                        verbose_iwamoto=ctx['verbose_iwamoto'],
+                        run_control_trafo2w=ctx['rc2'],
+                        run_control_trafo3w=ctx['rc3'],
+                        run_control_shunt=ctx['rcs'],
+                        cancel=cancel,
+                        method=ctx['q_search'],
+                        frac_guess=frac_guess,
+                        q_tolerance_mvar=ctx['q_tolerance_mvar'],
+                        overloaded=(q_frac, float(loading - max_loading_percent)),
+                    )
+                    warnings_list.append(
+                        f"V={v_pu}pu, P={p_val:.1f}MW: {label} limited due to overload"
+                    )
+            if q_frac < 1.0:
+                warnings_list.append(
+                    f"V={v_pu}pu, P={p_val:.1f}MW: {label} converged at {q_frac*100:.0f}% capability"
+                )
+            break
+
+    if q_pcc is None:
+        print(f"    {label} PF failed at P={p_val:.1f}MW, V={v_pu}pu (all strategies)")
+    return {'q_pcc': q_pcc, 'frac': frac_guess, 'power_flows': power_flows, 'warnings': warnings_list}
+
+
+# OPF engine: bounds that leave the slack and the bus voltages free, as in the power flow engine
+_RPC_OPF_SLACK_LIMIT = 999999.0
+_RPC_OPF_VM_RANGE = (0.5, 1.5)
+
+
+def _rpc_opf_objective(net, ctx):
+    """
+    [(element_type, index, cq1_eur_per_mvar)] of the controllable injections at the PCC bus for
+    RPC engine 'opf', with the sign that makes the OPF maximise the chart Q at the PCC (negate for
+    Q_min). res_bus.q_mvar at the PCC is its fixed demand minus these injections, and
+    _rpc_pcc_q_for_chart flips the sign when the PCC is not the external grid bus. Empty when no
+    external grid or selected generator is connected at the PCC (the OPF then has nothing to steer).
+    """
+    pcc_bus_idx = ctx['pcc_bus_idx']
+    sign = 1.0 if int(net.ext_grid.at[ctx['ext_grid_idx'], 'bus']) == int(pcc_bus_idx) else -1.0
+    terms = [('ext_grid', idx, sign) for idx in net.ext_grid.index
+             if int(net.ext_grid.at[idx, 'bus']) == int(pcc_bus_idx) and bool(net.ext_grid.at[idx, 'in_service'])]
+    terms += [('sgen', g['idx'], sign) for g in ctx['gen_info']
+              if int(net.sgen.at[g['idx'], 'bus']) == int(pcc_bus_idx)]
+    return terms
+
+
+def _rpc_opf_open_switch_buses(net_opf):
+    """
+    Replace every open line / transformer switch of net_opf by an explicit bus at that branch end.
+    pandapower models the open end as an auxiliary bus of its own, which the OPF limits to
+    0.9-1.1 pu regardless of net.bus; line charging raises the open end above that at high PCC
+    voltages, which would limit Q for a reason the power flow engine does not have.
+    """
+    ends = {'l': ('line', ('from_bus', 'to_bus')), 't': ('trafo', ('hv_bus', 'lv_bus')),
+            't3': ('trafo3w', ('hv_bus', 'mv_bus', 'lv_bus'))}
+    open_sw = net_opf.switch[~net_opf.switch.closed.astype(bool) & net_opf.switch.et.isin(list(ends))]
+    for sw_idx in open_sw.index:
+        table, columns = ends[net_opf.switch.at[sw_idx, 'et']]
+        element, bus = net_opf.switch.at[sw_idx, 'element'], net_opf.switch.at[sw_idx, 'bus']
+        for column in columns:
+            if net_opf[table].at[element, column] == bus:
+                net_opf[table].at[element, column] = pp.create_bus(net_opf, vn_kv=net_opf.bus.at[bus, 'vn_kv'])
+                break
+    net_opf.switch = net_opf.switch.drop(index=open_sw.index)
+
+
+def _rpc_opf_net(net, ctx, v_pu, direction):
+    """
+    Copy of net set up as the OPF of one RPC voltage level and direction: the selected sgens are the
+    only controllable injections (their P and Q bounds are set per point by _rpc_opf_chain), the
+    external grid holds v_pu with unbounded P/Q, bus voltages are free (open branch switches become
+    buses, _rpc_opf_open_switch_buses), branch loading is limited to
+    max_loading_percent only with limit_overloads, and the cost is the PCC Q (_rpc_opf_objective).
+    """
+    net_opf = deepcopy(net)
+    for table in ('gen', 'sgen', 'load', 'storage'):
+        if table in net_opf and not net_opf[table].empty:
+            net_opf[table]['controllable'] = False
+    sgen_idx = [g['idx'] for g in ctx['gen_info']]
+    net_opf.sgen.loc[sgen_idx, 'controllable'] = True
+    net_opf.ext_grid.at[ctx['ext_grid_idx'], 'vm_pu'] = v_pu
+    if 'controllable' in net_opf.ext_grid.columns:
+        net_opf.ext_grid['controllable'] = False
+    for column, value in (('min_p_mw', -_RPC_OPF_SLACK_LIMIT), ('max_p_mw', _RPC_OPF_SLACK_LIMIT),
+                          ('min_q_mvar', -_RPC_OPF_SLACK_LIMIT), ('max_q_mvar', _RPC_OPF_SLACK_LIMIT)):
+        net_opf.ext_grid[column] = value
+    _rpc_opf_open_switch_buses(net_opf)
+    net_opf.bus['min_vm_pu'], net_opf.bus['max_vm_pu'] = _RPC_OPF_VM_RANGE
+    for table in ('line', 'trafo', 'trafo3w'):
+        if ctx['limit_overloads']:
+            net_opf[table]['max_loading_percent'] = ctx['max_loading_percent']
+        elif 'max_loading_percent' in net_opf[table].columns:
+            net_opf[table] = net_opf[table].drop(columns=['max_loading_percent'])
+    net_opf.poly_cost = net_opf.poly_cost.iloc[0:0]
+    if 'pwl_cost' in net_opf:
+        net_opf.pwl_cost = net_opf.pwl_cost.iloc[0:0]
+    for element_type, idx, cost in _rpc_opf_objective(net, ctx):
+        pp.create_poly_cost(net_opf, idx, element_type, cp1_eur_per_mw=0.0,
+                            cq1_eur_per_mvar=cost if direction == 'max' else -cost)
+    return net_opf
+
+
+def _rpc_opf_chain(net, chain, ctx, cancel=None):
+    """
+    RPC engine 'opf': Q_max or Q_min at the PCC for every P point of one voltage level,
+    chain = (v_pu, direction, p_points). Each point is one pandapower AC OPF on a shared copy of net
+    (_rpc_opf_net): every selected generator gets its share of P and may use any Q within its own
+    capability, so the result is the exact envelope rather than a common fraction of all units.
+    The OPF of a point is warm-started from the voltages of the previous one (init='results'), with
+    a flat start as retry. If the OPF does not converge with voltage angles (e.g. phase-shifting
+    transformers), it runs without them from then on: ctx['opf_angles'] keeps that for the later
+    chains of this process, as ctx['opf_first_init'] keeps a flat start for their first point when
+    the power flow start failed. A point whose OPF fails either way (usually a branch that is overloaded
+    at any Q) is solved by the power flow engine (_rpc_sweep_point) and marked 'opf_fallback'.
+    Returns one _rpc_sweep_point-like dict per P point, with 'opf_runs' added.
+    """
+    v_pu, direction, p_points = chain
+    label = 'Q_max' if direction == 'max' else 'Q_min'
+    net_opf = _rpc_opf_net(net, ctx, v_pu, direction)
+    sgen_idx = [g['idx'] for g in ctx['gen_info']]
+    init = ctx.get('opf_first_init', 'pf')
+    points = []
+    for p_val in p_points:
+        study_cancellation.check(cancel)
+        p_gens = np.array([p_val * (g['sn_mva'] / ctx['total_installed_mw']) for g in ctx['gen_info']])
+        q_pos_caps, q_neg_caps = ctx['q_caps'].caps(p_gens)
+        net_opf.sgen.loc[sgen_idx, 'p_mw'] = p_gens
+        net_opf.sgen.loc[sgen_idx, 'min_p_mw'] = p_gens
+        net_opf.sgen.loc[sgen_idx, 'max_p_mw'] = p_gens
+        net_opf.sgen.loc[sgen_idx, 'q_mvar'] = 0.0
+        net_opf.sgen.loc[sgen_idx, 'min_q_mvar'] = -q_neg_caps
+        net_opf.sgen.loc[sgen_idx, 'max_q_mvar'] = q_pos_caps
+        warnings_list = []
+        opf_runs = 0
+        converged = False
+        # Same retry order as the OPF study: the warm start, then a flat start; then without angles
+        angles = ctx.get('opf_angles', True)
+        attempts = [(use_angles, use_init) for use_angles in ((True, False) if angles else (False,))
+                    for use_init in dict.fromkeys((init, 'flat'))]
+        for use_angles, use_init in attempts:
+            opf_runs += 1
+            try:
+                pp.runopp(net_opf, init=use_init, calculate_voltage_angles=use_angles)
+            except Exception:
+                continue
+            converged = True
+            if not points and init == 'pf' and use_init == 'flat':
+                ctx['opf_first_init'] = 'flat'
+            if angles and not use_angles:
+                ctx['opf_angles'] = False
+                warnings_list.append(
+                    f"V={v_pu}pu, P={p_val:.1f}MW: {label} OPF did not converge with voltage angles; "
+                    f"the OPF engine runs without them from here (transformer phase shifts ignored)"
+                )
+            break
+        if not converged:
+            point = _rpc_sweep_point(net, (v_pu, p_val, direction, None), ctx, cancel=cancel)
+            point['warnings'].insert(0, f"V={v_pu}pu, P={p_val:.1f}MW: {label} OPF did not converge, "
+                                        f"solved with the power flow engine")
+            point['opf_runs'] = opf_runs
+            point['opf_fallback'] = True
+            points.append(point)
+            init = 'pf'
+            continue
+        init = 'results'
+        if ctx['limit_overloads']:
+            loading = [net_opf[f'res_{table}'].loading_percent.max() for table in ('line', 'trafo', 'trafo3w')
+                       if not net_opf[f'res_{table}'].empty]
+            if loading and max(loading) >= ctx['max_loading_percent'] - 0.01:
+                warnings_list.append(f"V={v_pu}pu, P={p_val:.1f}MW: {label} limited due to overload")
+        points.append({
+            'q_pcc': _rpc_pcc_q_for_chart(net_opf, ctx['pcc_bus_idx'], ctx['ext_grid_idx']),
+            'frac': None, 'power_flows': 0, 'opf_runs': opf_runs, 'warnings': warnings_list,
+        })
+    return points
+
+
 def _rpc_pcc_q_for_chart(net_pf, pcc_bus_idx, ext_grid_idx):
     """
     Net reactive power (Mvar) at the PCC for RPC red curves: always res_bus.q_mvar at pcc_bus_idx
@@ -9462,6 +8829,24 @@ def _rpc_pcc_q_for_chart(net_pf, pcc_bus_idx, ext_grid_idx):
     return -q_raw
 
 
+# First RPC power flow strategy; without controllers it runs through repeated_powerflow
+_RPC_FIRST_PF = {'algorithm': 'nr', 'init': 'auto', 'max_iteration': 50}
+
+
+def _rpc_controller_flags(net_pf, run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False):
+    """(attach_2w, attach_3w, attach_sh, attach_lf): controller families _rpc_run_pf_robust attaches to net_pf."""
+    tc2 = getattr(net_pf, 'trafo_discrete_tap_controllers', None) or []
+    tc3 = getattr(net_pf, 'trafo3w_discrete_tap_controllers', None) or []
+    shc = getattr(net_pf, 'shunt_discrete_controllers', None) or []
+    lfc = getattr(net_pf, 'line_flow_shunt_controllers', None) or []
+    attach_2w = bool(run_control_trafo2w) and bool(tc2)
+    attach_3w = bool(run_control_trafo3w) and bool(tc3)
+    attach_sh = bool(run_control_shunt) and bool(shc)
+    # Same as powerflow(): line-flow shunt specs imply control run; do not gate on run_control_shunt.
+    attach_lf = bool(lfc)
+    return attach_2w, attach_3w, attach_sh, attach_lf
+
+
 def _rpc_run_pf_robust(net_pf, verbose_iwamoto=False, run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False):
     """
     Run power flow for RPC with multiple solver fallbacks (nr first, then iwamoto_nr).
@@ -9473,19 +8858,14 @@ def _rpc_run_pf_robust(net_pf, verbose_iwamoto=False, run_control_trafo2w=False,
     lists matching controller specs, registers DiscreteTapControl / DiscreteShuntController / line-P
     CharacteristicControl for shunt step and runs pp.runpp(..., run_control=True) with a single NR
     strategy (controller state is not reliable across solver fallbacks on the same net).
+    Without controllers the first strategy goes through repeated_powerflow, so a net that carries
+    the ppc of an earlier solve on the same topology reuses it.
     """
     import io
 
     q_kw = _electrisim_enforce_q_lims_kw(net_pf)
-    tc2 = getattr(net_pf, 'trafo_discrete_tap_controllers', None) or []
-    tc3 = getattr(net_pf, 'trafo3w_discrete_tap_controllers', None) or []
-    shc = getattr(net_pf, 'shunt_discrete_controllers', None) or []
-    lfc = getattr(net_pf, 'line_flow_shunt_controllers', None) or []
-    attach_2w = bool(run_control_trafo2w) and bool(tc2)
-    attach_3w = bool(run_control_trafo3w) and bool(tc3)
-    attach_sh = bool(run_control_shunt) and bool(shc)
-    # Same as powerflow(): line-flow shunt specs imply control run; do not gate on run_control_shunt.
-    attach_lf = bool(lfc)
+    attach_2w, attach_3w, attach_sh, attach_lf = _rpc_controller_flags(
+        net_pf, run_control_trafo2w, run_control_trafo3w, run_control_shunt)
     rc = attach_2w or attach_3w or attach_sh or attach_lf
     if rc:
         if attach_2w or attach_3w:
@@ -9497,7 +8877,7 @@ def _rpc_run_pf_robust(net_pf, verbose_iwamoto=False, run_control_trafo2w=False,
         strategies = [{'algorithm': 'nr', 'init': 'auto', 'max_iteration': 100}]
     else:
         strategies = [
-            {'algorithm': 'nr', 'init': 'auto', 'max_iteration': 50},
+            _RPC_FIRST_PF,
             {'algorithm': 'nr', 'init': 'dc', 'max_iteration': 80},
             {'algorithm': 'nr', 'init': 'flat', 'max_iteration': 80},
             {'algorithm': 'iwamoto_nr', 'init': 'dc', 'max_iteration': 80},
@@ -9520,6 +8900,8 @@ def _rpc_run_pf_robust(net_pf, verbose_iwamoto=False, run_control_trafo2w=False,
                 finally:
                     sys.stdout = old_out
                     sys.stderr = old_err
+            elif s is _RPC_FIRST_PF and not rc:
+                repeated_powerflow.runpp(net_pf, calculate_voltage_angles=True, **_RPC_FIRST_PF, **q_kw)
             else:
                 pp.runpp(net_pf,
                          algorithm=algo,
@@ -9534,56 +8916,190 @@ def _rpc_run_pf_robust(net_pf, verbose_iwamoto=False, run_control_trafo2w=False,
     return False
 
 
-def _rpc_binary_search_q(net, ext_grid_idx, v_pu, gen_info,
-                          total_installed_mw, p_val, q_capability_mode,
-                          direction, max_loading_percent, pcc_bus_idx,
-                          iterations=12, verbose_iwamoto=False,
-                          run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False):
+def _rpc_search_q_limit(net, ext_grid_idx, v_pu, gen_info,
+                        total_installed_mw, p_val, q_caps,
+                        direction, max_loading_percent, pcc_bus_idx,
+                        iterations=12, verbose_iwamoto=False,
+                        run_control_trafo2w=False, run_control_trafo3w=False, run_control_shunt=False,
+                        cancel=None, method='bisection', frac_guess=None, q_tolerance_mvar=0.01,
+                        overloaded=None):
     """
-    Binary search to find the maximum (or minimum) Q at PCC that keeps
-    all branch loadings within max_loading_percent.
+    Search the maximum (or minimum) Q at PCC that keeps all branch loadings within
+    max_loading_percent, as a fraction 0..1 of the generators' Q capability (q_caps: _RpcQCapability).
     direction: 'max' for overexcited, 'min' for underexcited.
+    cancel: optional study_cancellation.CancelToken, checked before every power flow.
+
+    method 'bisection': `iterations` halvings of [0, 1].
+    method 'illinois': brackets the limit around frac_guess (the fraction found at a neighbouring
+    operating point), first along the secant through overloaded = (fraction, loading margin) of a
+    power flow known to overload (the sweep's own), then with growing steps; then closes the bracket
+    with the Illinois variant of regula falsi on the loading margin (max loading - max_loading_percent; a probe that does not converge counts as
+    overloaded and falls back to bisection), clamped to the inner 80 % of the bracket. Stops once the
+    PCC Q of the bracket ends differs by at most q_tolerance_mvar, after at most 2 * iterations probes.
+
+    When neither the guess nor two steps below it are feasible (the loading margin need not be
+    monotonic in Q, and the guess may sit at a bound), the Illinois search falls back to the bisection;
+    without a guess it steps down through the bisection's own probes.
+
+    Returns (q_pcc, fraction, power_flows) of the largest feasible fraction found (0.0, None when
+    none is, so the sweep does not continue from it).
+
+    Without controllers the probes set ext_grid vm_pu and the generators' P/Q on net itself and
+    restore them before returning: each probe's power flow is then a recycled solve warm-started
+    from the previous probe's voltages. With controllers (which attach to the solved net and move
+    taps / shunt steps) every probe solves a fresh copy of net.
     """
-    lo, hi = 0.0, 1.0
-
-    best_q_pcc = 0.0
-
-    for _ in range(iterations):
-        mid = (lo + hi) / 2.0
-        net_try = deepcopy(net)
+    sign = 1 if direction == 'max' else -1
+    p_gens = [p_val * (g['sn_mva'] / total_installed_mw) for g in gen_info]
+    q_pos_caps, q_neg_caps = q_caps.caps(p_gens)
+    q_fulls = q_pos_caps if direction == 'max' else q_neg_caps
+    setpoints = list(zip([g['idx'] for g in gen_info], p_gens, q_fulls.tolist()))
+    q_span = sum(q_full for _idx, _p, q_full in setpoints)
+
+    in_place = not any(_rpc_controller_flags(
+        net, run_control_trafo2w, run_control_trafo3w, run_control_shunt))
+    if in_place:
+        saved_vm = net.ext_grid.at[ext_grid_idx, 'vm_pu']
+        saved_pq = [(idx, net.sgen.at[idx, 'p_mw'], net.sgen.at[idx, 'q_mvar']) for idx, _p, _q in setpoints]
+    power_flows = [0]
+    probed = {}  # fraction -> (loading margin, PCC Q), so the bisection fallback reuses the bracket's probes
+
+    def _probe(frac):
+        """(loading margin, PCC Q) at frac; (None, None) when the power flow fails."""
+        if frac not in probed:
+            probed[frac] = _solve(frac)
+        return probed[frac]
+
+    def _solve(frac):
+        study_cancellation.check(cancel)
+        power_flows[0] += 1
+        net_try = net if in_place else deepcopy(net)
         net_try.ext_grid.at[ext_grid_idx, 'vm_pu'] = v_pu
+        for idx, p_gen, q_full in setpoints:
+            net_try.sgen.at[idx, 'p_mw'] = p_gen
+            net_try.sgen.at[idx, 'q_mvar'] = q_full * frac * sign
+        if not _rpc_run_pf_robust(net_try, verbose_iwamoto,
+                                  run_control_trafo2w, run_control_trafo3w, run_control_shunt):
+            return None, None
+        loading = -np.inf
+        if not net_try.res_trafo.empty:
+            loading = max(loading, net_try.res_trafo.loading_percent.max())
+        if not net_try.res_line.empty:
+            loading = max(loading, net_try.res_line.loading_percent.max())
+        return float(loading - max_loading_percent), _rpc_pcc_q_for_chart(net_try, pcc_bus_idx, ext_grid_idx)
+
+    def _feasible(margin):
+        # NaN loadings (out-of-service branches only) never count as overloaded, as in the sweep
+        return margin is not None and not margin > 0
 
-        for g in gen_info:
-            share = g['sn_mva'] / total_installed_mw
-            p_gen = p_val * share
-            sn = g['sn_mva']
-            q_pos_cap, q_neg_cap = _rpc_sgen_q_caps(net, g['idx'], p_gen, sn, q_capability_mode)
-            q_full = q_pos_cap if direction == 'max' else q_neg_cap
-            q_gen = q_full * mid * (1 if direction == 'max' else -1)
-            net_try.sgen.at[g['idx'], 'p_mw'] = p_gen
-            net_try.sgen.at[g['idx'], 'q_mvar'] = q_gen
-
-        converged = _rpc_run_pf_robust(
-            net_try, verbose_iwamoto,
-            run_control_trafo2w, run_control_trafo3w, run_control_shunt)
-
-        if not converged:
-            hi = mid
-            continue
-
-        overloaded = False
-        if not net_try.res_trafo.empty and net_try.res_trafo.loading_percent.max() > max_loading_percent:
-            overloaded = True
-        if not net_try.res_line.empty and net_try.res_line.loading_percent.max() > max_loading_percent:
-            overloaded = True
-
-        if overloaded:
-            hi = mid
+    try:
+        def _bisect():
+            lo, hi = 0.0, 1.0
+            best_q_pcc, best = 0.0, None
+            for _ in range(iterations):
+                mid = (lo + hi) / 2.0
+                margin, q_pcc = _probe(mid)
+                if _feasible(margin):
+                    lo = best = mid
+                    best_q_pcc = q_pcc
+                else:
+                    hi = mid
+            return best_q_pcc, best, power_flows[0]
+
+        if method != 'illinois':
+            return _bisect()
+
+        max_probes = 2 * iterations
+        x = 0.5 if frac_guess is None else min(max(float(frac_guess), 0.0), 1.0)
+        lo = hi = None  # (fraction, margin, PCC Q)
+        margin, q_pcc = _probe(x)
+        if _feasible(margin):
+            lo = (x, margin, q_pcc)
         else:
-            lo = mid
-            best_q_pcc = _rpc_pcc_q_for_chart(net_try, pcc_bus_idx, ext_grid_idx)
-
-    return best_q_pcc
+            hi = (x, margin, q_pcc)
+
+        # Bracket: step away from the guess, doubling the step, until the other side is found. The first
+        # step aims just past the zero of the margin on the secant through the known overloaded point,
+        # so a close guess gets a bracket about as narrow as the tolerance.
+        step = 0.05
+        secant = overloaded
+        tol_frac = q_tolerance_mvar / q_span if q_span > 0 else 0.0
+        steps_down = 0
+        while lo is None or hi is None:
+            if power_flows[0] >= max_probes:
+                break
+            end = lo if hi is None else hi
+            if (end[0] >= 1.0 and hi is None) or (end[0] <= 0.0 and lo is None):
+                break
+            x = None
+            if lo is None and frac_guess is None:
+                # Without a guess step down as the bisection does, so its fallback reuses every probe
+                if power_flows[0] >= iterations:
+                    break
+                x = end[0] / 2.0
+            elif lo is None:
+                # A feasible fraction below an infeasible one may be anywhere in [0, 1]: after two steps
+                # down the bisection searches it instead
+                if steps_down == 2:
+                    break
+                steps_down += 1
+            if (x is None and secant is not None and end[1] is not None and np.isfinite(end[1])
+                    and secant[0] != end[0]):
+                slope = (secant[1] - end[1]) / (secant[0] - end[0])
+                if slope > 0:
+                    root = end[0] - end[1] / slope
+                    past = max(2.0 * tol_frac, 0.1 * abs(root - end[0]))
+                    x = root + past if hi is None else root - past
+                    if not (x > end[0] if hi is None else x < end[0]):
+                        x = None
+            secant = None
+            if x is None:
+                x = end[0] + step if hi is None else end[0] - step
+                step *= 2.0
+            x = min(max(x, 0.0), 1.0)
+            margin, q_pcc = _probe(x)
+            if _feasible(margin):
+                lo = (x, margin, q_pcc)
+            else:
+                hi = (x, margin, q_pcc)
+        if lo is None:
+            return _bisect()
+        if hi is None:
+            return lo[2], lo[0], power_flows[0]
+
+        # Illinois: regula falsi on the margin, halving the retained end's margin when the same
+        # end is kept twice in a row
+        f_lo, f_hi = lo[1], hi[1]
+        kept = 0
+        while power_flows[0] < max_probes:
+            if hi[2] is not None and abs(hi[2] - lo[2]) <= q_tolerance_mvar:
+                break
+            if hi[2] is None and (hi[0] - lo[0]) * q_span <= q_tolerance_mvar:
+                break
+            width = hi[0] - lo[0]
+            if f_hi is None or not np.isfinite(f_lo) or f_hi == f_lo:
+                x = lo[0] + 0.5 * width
+            else:
+                x = hi[0] - f_hi * width / (f_hi - f_lo)
+                x = min(max(x, lo[0] + 0.1 * width), hi[0] - 0.1 * width)
+            margin, q_pcc = _probe(x)
+            if _feasible(margin):
+                lo, f_lo = (x, margin, q_pcc), margin
+                if kept == 1 and f_hi is not None:
+                    f_hi *= 0.5
+                kept = 1
+            else:
+                hi, f_hi = (x, margin, q_pcc), margin
+                if kept == -1:
+                    f_lo *= 0.5
+                kept = -1
+        return lo[2], lo[0], power_flows[0]
+    finally:
+        if in_place:
+            net.ext_grid.at[ext_grid_idx, 'vm_pu'] = saved_vm
+            for idx, p_mw, q_mvar in saved_pq:
+                net.sgen.at[idx, 'p_mw'] = p_mw
+                net.sgen.at[idx, 'q_mvar'] = q_mvar
 
 
 # ============================================================================
@@ -10765,7 +10281,10 @@ def protection_coordination(net, prot_params, in_data):
             fault_location_mode = 'line'
         fault_bus_cell_id = prot_params.get('fault_bus_id')
 
-        # Build the list of fault scenarios.
+        # Build the list of fault scenarios. Streaming (NDJSON) callers get each scenario as soon as
+        # it is solved; the miscoordination check still needs the full list at the end.
+        partial_cb = prot_params.get('_partial_callback')
+        cancel = prot_params.get('_cancel_token')
         scenarios = []
         if fault_location_mode == 'bus':
             fault_bus_idx = _prot_resolve_fault_bus_idx(in_data, net, fault_bus_cell_id)
@@ -10778,6 +10297,8 @@ def protection_coordination(net, prot_params, in_data):
                     'summary': {'converged': False},
                 }, separators=(',', ':'))
             scenarios.append(_prot_run_bus_scenario(net, fault_bus_idx, fault_type, case, attach_summaries))
+            if partial_cb:
+                partial_cb({'scenarios': [scenarios[-1]]})
         else:
             if sc_line_id_raw in (None, '', 'all'):
                 line_ids = [int(idx) for idx in net.line.index if net.line.at[idx, 'in_service']]
@@ -10787,7 +10308,10 @@ def protection_coordination(net, prot_params, in_data):
                 except (TypeError, ValueError):
                     line_ids = [int(idx) for idx in net.line.index if net.line.at[idx, 'in_service']]
             for line_id in line_ids:
+                study_cancellation.check(cancel)
                 scenarios.append(_prot_run_scenario(net, line_id, sc_fraction, fault_type, case, attach_summaries))
+                if partial_cb:
+                    partial_cb({'scenarios': [scenarios[-1]]})
 
         # Sample characteristics on the unmodified net so curves do not include the sc_bus.
         devices = _prot_extract_devices_for_ui(net, attach_summaries)
@@ -10797,7 +10321,7 @@ def protection_coordination(net, prot_params, in_data):
         n_tripped = sum(1 for sc_res in scenarios for trip in sc_res.get('trip', []) if trip.get('tripped'))
         response = {
             'error': False,
-            'scenarios': scenarios,
+            'scenarios': [] if partial_cb else scenarios,
             'devices': devices,
             'attach_summaries': attach_summaries,
             'summary': {
@@ -10815,7 +10339,7 @@ def protection_coordination(net, prot_params, in_data):
             },
             'miscoordination': miscoord,
         }
-        return json.dumps(response, default=_json_serialize_default, separators=(',', ':'))
+        return result_json.dumps(response)
     except Exception as e:
         import traceback
         return json.dumps({
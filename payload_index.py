@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Single-pass index over an Electrisim simulation payload (the in_data dict posted by the frontend).
+
+Every row is classified once by element kind ('bus', 'line', 'trafo', 'sgen', ... or 'study' for
+the study-parameter row), so the pandapower and OpenDSS builders and the study dispatch in app.py
+read typed buckets instead of rescanning the whole dict with substring matches on 'typ'.
+Numeric fields are parsed on first access and memoized, so helpers that read the same rated
+voltages (bus vn_kv, transformer vn_hv_kv / vn_lv_kv, ...) do not re-float() them.
+
+The index holds references to the payload rows; it is meant to live for one request and the
+payload must not be modified while it is in use.
+"""
+from typing import Dict, List
+
+
+# Element kinds by 'typ' prefix, checked in order (longer prefixes before the ones they extend).
+_KIND_PREFIXES = (
+    ('Three Winding Transformer', 'trafo3w'),
+    ('Two Winding', 'trafo'),
+    ('Transformer', 'trafo'),
+    ('Asymmetric Static Generator', 'asymmetric_sgen'),
+    ('Static Generator', 'sgen'),
+    ('Generator', 'gen'),
+    ('External Grid', 'ext_grid'),
+    ('ExternalGrid', 'ext_grid'),
+    ('Shunt Reactor', 'shunt_reactor'),
+    ('Capacitor', 'capacitor'),
+    ('Asymmetric Load', 'asymmetric_load'),
+    ('Load DC', 'load_dc'),
+    ('Load', 'load'),
+    ('Impedance', 'impedance'),
+    ('Extended Ward', 'xward'),
+    ('Ward', 'ward'),
+    ('Motor', 'motor'),
+    ('SVC', 'svc'),
+    ('TCSC', 'tcsc'),
+    ('SSC', 'ssc'),
+    ('Storage', 'storage'),
+    ('Source DC', 'source_dc'),
+    ('Switch', 'switch'),
+    ('B2B VSC', 'b2b_vsc'),
+    ('VSC', 'vsc'),
+    ('DC Line', 'dc_line'),
+    ('Line', 'line'),
+    ('PVSystem', 'pvsystem'),
+)
+
+STUDY = 'study'
+OTHER = 'other'
+BUS_KINDS = ('bus', 'dc_bus')
+
+_NULL_STRINGS = ('', 'none', 'null')
+
+
+def is_study_row(row):
+    """True for the study-parameter row (e.g. 'PowerFlowPandaPower Parameters') or other non-element entries."""
+    if not isinstance(row, dict):
+        return True
+    typ = str(row.get('typ', ''))
+    return 'PandaPower' in typ or 'OpenDss' in typ
+
+
+def element_kind(typ):
+    """Kind of an element row from its 'typ' (e.g. 'Line12' -> 'line', 'Bus3' -> 'bus'), or 'other'."""
+    typ = str(typ or '')
+    if 'DC Bus' in typ:
+        return 'dc_bus'
+    if 'Bus' in typ:
+        return 'bus'
+    for prefix, kind in _KIND_PREFIXES:
+        if typ.startswith(prefix):
+            return kind
+    return OTHER
+
+
+def _parse_number(raw):
+    if raw is None:
+        return None
+    if isinstance(raw, str) and raw.strip().lower() in _NULL_STRINGS:
+        return None
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+class PayloadIndex:
+    """Typed view of one payload: kind per key, keys per kind and memoized numeric fields."""
+
+    def __init__(self, in_data):
+        self.in_data = in_data
+        self.kinds: Dict[str, str] = {}
+        self.buckets: Dict[str, List[str]] = {}
+        self._numbers = {}
+        for key, row in in_data.items():
+            if not isinstance(row, dict):
+                continue
+            kind = STUDY if is_study_row(row) else element_kind(row.get('typ'))
+            self.kinds[key] = kind
+            self.buckets.setdefault(kind, []).append(key)
+
+    def kind(self, key):
+        return self.kinds.get(key)
+
+    def keys(self, *kinds):
+        """Keys of the given kinds in payload order (all indexed rows when no kind is given)."""
+        if not kinds:
+            return list(self.kinds)
+        if len(kinds) == 1:
+            return list(self.buckets.get(kinds[0], ()))
+        wanted = set(kinds)
+        return [k for k, kind in self.kinds.items() if kind in wanted]
+
+    def rows(self, *kinds):
+        """(key, row) pairs of the given kinds in payload order."""
+        return [(k, self.in_data[k]) for k in self.keys(*kinds)]
+
+    def element_keys(self):
+        """Keys of all element rows (everything except the study-parameter row)."""
+        return [k for k, kind in self.kinds.items() if kind != STUDY]
+
+    def has(self, kind):
+        return bool(self.buckets.get(kind))
+
+    def number(self, key, field, default=None):
+        """
+        float(row[field]), parsed once per (key, field). Missing, blank, 'None'/'null' or
+        unparseable values give default.
+        """
+        cache_key = (key, field)
+        try:
+            value = self._numbers[cache_key]
+        except KeyError:
+            value = _parse_number(self.in_data[key].get(field))
+            self._numbers[cache_key] = value
+        return default if value is None else value
+
+
+def index_payload(in_data, index=None):
+    """PayloadIndex for in_data; returns index unchanged when the caller already built one for it."""
+    if index is not None and index.in_data is in_data:
+        return index
+    return PayloadIndex(in_data)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Repeated power flows on an unchanged topology.
+
+Time series steps, economic loss lookup points, RPC sweep points and BESS control iterations solve
+the same network over and over with only the injections changing. They call runpp() from here
+instead of pp.runpp: the first call is a full pandapower power flow; later calls use pandapower's
+recycle mode, which keeps the internal ppc, reuses the admittance matrices and only refreshes the
+bus P/Q injections and the generator / external grid table (incl. voltage setpoints) before a
+Newton-Raphson solve warm-started from the previous voltages.
+
+The reused state is tagged with a key of everything recycle does not refresh: table lengths and
+indices, in_service flags of every element table, switch positions, transformer tap positions,
+shunt steps and setpoints, and the power flow options. When any of them changed, when the last
+solve on the net was not made here (e.g. a run_control power flow) or when the recycled solve does
+not converge, the next call is a full pp.runpp again. Changes to other element parameters (line
+impedances, transformer ratings, ...) are not detected; callers change only injections and the
+state listed above between calls.
+
+Configuration (environment variables):
+    ELECTRISIM_PF_RECYCLE   set to 0 to always run full power flows (default 1)
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+
+PF_RECYCLE = os.getenv('ELECTRISIM_PF_RECYCLE', '1') != '0'
+
+# Refreshed by a recycled solve: bus P/Q of loads, sgens, storages, ... and the gen / ext_grid table.
+# Ybus is kept (trafo=False), so tap changes are part of the key instead.
+_RECYCLE = {'bus_pq': True, 'gen': True, 'trafo': False}
+
+# Columns (besides every in_service flag) that change the admittance matrix or the topology
+_KEY_COLUMNS = (
+    ('switch', 'closed'),
+    ('trafo', 'tap_pos'),
+    ('trafo3w', 'tap_pos'),
+    ('shunt', 'step'),
+    ('shunt', 'p_mw'),
+    ('shunt', 'q_mvar'),
+)
+
+# Stored in net._ppc, so any pandapower run that rebuilds the ppc drops it
+_PPC_KEY = 'electrisim_recycle_key'
+
+
+def _column_bytes(df, column):
+    values = df[column].to_numpy()
+    try:
+        return np.asarray(values, dtype=float).tobytes()
+    except (TypeError, ValueError):
+        return repr(values.tolist()).encode()
+
+
+def _index_bytes(df):
+    try:
+        return np.asarray(df.index.to_numpy(), dtype=np.int64).tobytes()
+    except (TypeError, ValueError):
+        return repr(df.index.tolist()).encode()
+
+
+def _state_key(net, pf_kwargs):
+    """Everything a recycled solve would not pick up, as a comparable tuple."""
+    parts = [repr(sorted(pf_kwargs.items()))]
+    for name in sorted(net.keys()):
+        df = net[name]
+        if name.startswith('res_') or not isinstance(df, pd.DataFrame) or 'in_service' not in df.columns:
+            continue
+        parts.append((name, _index_bytes(df), _column_bytes(df, 'in_service')))
+    for table, column in _KEY_COLUMNS:
+        df = net.get(table)
+        if isinstance(df, pd.DataFrame) and column in df.columns:
+            parts.append((table, column, _index_bytes(df), _column_bytes(df, column)))
+    return tuple(parts)
+
+
+def invalidate(net):
+    """Make the next runpp() on net a full power flow."""
+    ppc = net.get('_ppc')
+    if isinstance(ppc, dict):
+        ppc.pop(_PPC_KEY, None)
+
+
+def runpp(net, init='auto', **pf_kwargs):
+    """
+    pp.runpp(net, init=init, **pf_kwargs), recycling the previous solve of net when its topology
+    and options are unchanged (init is then ignored: the solve starts from the last voltages).
+    Raises like pp.runpp; a recycled solve that fails is repeated once as a full power flow.
+    """
+    if not PF_RECYCLE or pf_kwargs.get('run_control') or pf_kwargs.get('algorithm', 'nr') not in ('nr', 'iwamoto_nr'):
+        pp.runpp(net, init=init, **pf_kwargs)
+        return
+    key = _state_key(net, pf_kwargs)
+    ppc = net.get('_ppc')
+    if isinstance(ppc, dict) and ppc.get(_PPC_KEY) == key:
+        try:
+            pp.runpp(net, init=init, recycle=dict(_RECYCLE), **pf_kwargs)
+            if net.converged:
+                return
+        except Exception:
+            pass
+        invalidate(net)
+    pp.runpp(net, init=init, **pf_kwargs)
+    if net.converged:
+        net._ppc[_PPC_KEY] = key
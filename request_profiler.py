@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand profiling of single requests.
+
+When ELECTRISIM_PROFILE_TOKEN is set, a request to POST /, /import-pandapower or /import-opendss
+that carries the token (X-Electrisim-Profile header or ?profile=<token>) runs under cProfile with
+tracemalloc enabled. Instead of the plain result the client gets either
+
+    {"profile": {"hotspots": [...], "peak_memory_bytes": ..., ...}, "result": <normal response body>}
+
+or, with ?profile_output=prof, the raw cProfile stats as a downloadable .prof file (open it with
+pstats.Stats or snakeviz). ?profile_top=N (default ELECTRISIM_PROFILE_TOP) and ?profile_sort=tottime
+tune the hotspot table.
+
+tracemalloc and cProfile slow the request down noticeably, so only one request per process is
+profiled at a time; a second one gets 429. Requests without a valid token are served normally.
+
+Configuration (environment variables):
+    ELECTRISIM_PROFILE_TOKEN   shared secret enabling profiling (unset: profiling disabled)
+    ELECTRISIM_PROFILE_TOP     rows in the hotspot table (default 30)
+"""
+import cProfile
+import contextvars
+import functools
+import gzip
+import hmac
+import json
+import marshal
+import os
+import threading
+import time
+import tracemalloc
+
+from flask import Response, jsonify, make_response, request
+
+PROFILE_TOKEN = os.getenv('ELECTRISIM_PROFILE_TOKEN', '')
+PROFILE_TOP = max(1, int(os.getenv('ELECTRISIM_PROFILE_TOP', 30)))
+
+_SORT_KEYS = {'cumulative': 3, 'tottime': 2}
+
+_busy = threading.Lock()
+_active = contextvars.ContextVar('electrisim_profiling', default=False)
+
+
+def is_profiling():
+    """True while the current request runs under the profiler (e.g. to disable streaming)."""
+    return _active.get()
+
+
+def _requested_token():
+    return request.headers.get('X-Electrisim-Profile') or request.args.get('profile') or ''
+
+
+def _token_ok(token):
+    return bool(PROFILE_TOKEN) and bool(token) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+def _hotspots(stats, sort, top):
+    """Top rows of a cProfile stats dict as plain dicts, sorted by cumulative or own time."""
+    key = _SORT_KEYS.get(sort, _SORT_KEYS['cumulative'])
+    rows = sorted(stats.items(), key=lambda item: item[1][key], reverse=True)[:top]
+    out = []
+    for (filename, line, func), (primitive_calls, calls, tottime, cumtime, _callers) in rows:
+        out.append({
+            'function': func,
+            'location': f'{filename}:{line}',
+            'ncalls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_s': round(tottime, 6),
+            'cumtime_s': round(cumtime, 6),
+            'percall_cum_s': round(cumtime / calls, 6) if calls else 0.0,
+        })
+    return out
+
+
+def _body_as_json(response):
+    """The profiled view's response body as JSON text (gunzipped; non-JSON bodies become a JSON string)."""
+    data = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        data = gzip.decompress(data)
+    text = data.decode('utf-8', errors='replace')
+    if response.mimetype == 'application/json':
+        return text
+    return json.dumps(text)
+
+
+def profiled(view):
+    """Decorator for Flask views: run the view under the profiler when the request carries the token."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _token_ok(_requested_token()):
+            return view(*args, **kwargs)
+        if not _busy.acquire(blocking=False):
+            return jsonify({'error': 'Another request is being profiled, retry shortly'}), 429
+        token = _active.set(True)
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                profiler.disable()
+            wall_s = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            _active.reset(token)
+            _busy.release()
+
+        profiler.create_stats()
+        print(f"=== PROFILED {request.path}: {wall_s:.3f}s, peak traced memory {peak / 1e6:.1f} MB ===")
+        if request.args.get('profile_output') == 'prof':
+            prof = Response(marshal.dumps(profiler.stats), mimetype='application/octet-stream')
+            prof.headers['Content-Disposition'] = f'attachment; filename=electrisim-{int(time.time())}.prof'
+            prof.headers['X-Electrisim-Peak-Memory-Bytes'] = str(peak)
+            prof.headers['X-Electrisim-Result-Status'] = str(response.status_code)
+            return prof
+
+        try:
+            top = max(1, int(request.args.get('profile_top', PROFILE_TOP)))
+        except ValueError:
+            top = PROFILE_TOP
+        sort = request.args.get('profile_sort', 'cumulative')
+        summary = {
+            'path': request.path,
+            'wall_time_s': round(wall_s, 6),
+            'peak_memory_bytes': peak,
+            'total_calls': sum(s[1] for s in profiler.stats.values()),
+            'sort': sort if sort in _SORT_KEYS else 'cumulative',
+            'hotspots': _hotspots(profiler.stats, sort, top),
+            'result_status': response.status_code,
+        }
+        body = '{"profile":' + json.dumps(summary) + ',"result":' + _body_as_json(response) + '}'
+        return Response(body, status=response.status_code, mimetype='application/json')
+    return wrapper
+
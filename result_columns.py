@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""
+Power-flow result tables.
+
+Result tables (bus, line, trafo, load, ...) are built in one vectorized pass per table: each
+net.res_* DataFrame is joined with its static table for names / ids and the derived fields (power
+factor, bus through power, per-phase splits, ...) are computed on whole columns.
+
+The default power-flow response lists one JSON object per element, e.g.
+{"busbars": [{"name": ..., "id": ..., "vm_pu": ..., ...}, ...]}, so every field name is repeated
+for every bus. For large networks the frontend can ask for the columnar layout instead (study
+parameter resultFormat='columnar'):
+
+    {"format": "columnar",
+     "busbars": {"name": [...], "id": [...], "vm_pu": [...], "va_degree": [...], ...},
+     "lines":   {"name": [...], "id": [...], "p_from_mw": [...], ...},
+     ...}
+
+Tables and field names are the same as in the row layout; each field is one array (ids are
+listed once per table) and row i of every array in a table belongs to the same element.
+Numeric columns are read straight from the net.res_* DataFrames as numpy arrays, which
+result_json encodes natively, with NaN / inf as null.
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNAR = 'columnar'
+ROWS = 'rows'
+
+_PHASE_COLUMNS = ('p_a_mw', 'q_a_mvar', 'p_b_mw', 'q_b_mvar', 'p_c_mw', 'q_c_mvar')
+
+# Table key -> (pandapower element, result columns) for tables that copy net.res_<element> as is.
+_SIMPLE_TABLES = {
+    'lines': ('line', ('p_from_mw', 'q_from_mvar', 'p_to_mw', 'q_to_mvar', 'i_from_ka', 'i_to_ka',
+                       'loading_percent')),
+    'generators': ('gen', ('p_mw', 'q_mvar', 'va_degree', 'vm_pu')),
+    'staticgenerators': ('sgen', ('p_mw', 'q_mvar')),
+    'loads': ('load', ('p_mw', 'q_mvar')),
+    'impedances': ('impedance', ('p_from_mw', 'q_from_mvar', 'p_to_mw', 'q_to_mvar', 'pl_mw', 'ql_mvar',
+                                 'i_from_ka', 'i_to_ka')),
+    'wards': ('ward', ('p_mw', 'q_mvar', 'vm_pu')),
+    'extendedwards': ('xward', ('p_mw', 'q_mvar', 'vm_pu')),
+    'motors': ('motor', ('p_mw', 'q_mvar')),
+    'storages': ('storage', ('p_mw', 'q_mvar')),
+    'svcs': ('svc', ('thyristor_firing_angle_degree', 'x_ohm', 'q_mvar', 'vm_pu', 'va_degree')),
+    'tcscs': ('tcsc', ('thyristor_firing_angle_degree', 'x_ohm', 'p_from_mw', 'q_from_mvar', 'p_to_mw',
+                       'q_to_mvar', 'p_l_mw', 'q_l_mvar', 'vm_from_pu', 'va_from_degree', 'vm_to_pu',
+                       'va_to_degree')),
+    'sscs': ('ssc', ('q_mvar', 'vm_internal_pu', 'va_internal_degree', 'vm_pu', 'va_degree')),
+    'dcbuses': ('dc_bus', ('vm_pu', 'p_mw')),
+    'loadsdc': ('load_dc', ('p_mw',)),
+    'sourcesdc': ('source_dc', ('vm_pu', 'p_mw')),
+    'b2bvscs': ('b2b_vsc', ('p_mw', 'vm1_pu', 'vm2_pu')),
+    'dclines': ('dcline', ('p_from_mw', 'q_from_mvar', 'p_to_mw', 'q_to_mvar', 'pl_mw', 'vm_from_pu',
+                           'va_from_degree', 'vm_to_pu', 'va_to_degree')),
+}
+
+_TRAFO_COLUMNS = ('p_hv_mw', 'q_hv_mvar', 'p_lv_mw', 'q_lv_mvar', 'pl_mw', 'ql_mvar', 'i_hv_ka', 'i_lv_ka',
+                  'vm_hv_pu', 'vm_lv_pu', 'va_hv_degree', 'va_lv_degree', 'loading_percent')
+_TRAFO3W_COLUMNS = ('p_hv_mw', 'q_hv_mvar', 'p_mv_mw', 'q_mv_mvar', 'p_lv_mw', 'q_lv_mvar', 'pl_mw', 'ql_mvar',
+                    'i_hv_ka', 'i_mv_ka', 'i_lv_ka', 'vm_hv_pu', 'vm_mv_pu', 'vm_lv_pu', 'va_hv_degree',
+                    'va_mv_degree', 'va_lv_degree', 'loading_percent')
+_LINE_DC_COLUMNS = ('p_from_mw', 'p_to_mw', 'pl_mw', 'vm_from_pu', 'vm_to_pu', 'i_from_ka', 'i_to_ka',
+                    'loading_percent')
+
+# Branch terminals feeding the per-bus "through power" (p_branch_mw / q_branch_mvar).
+_BRANCH_TERMINALS = (
+    ('line', (('from_bus', 'p_from_mw', 'q_from_mvar'), ('to_bus', 'p_to_mw', 'q_to_mvar'))),
+    ('trafo', (('hv_bus', 'p_hv_mw', 'q_hv_mvar'), ('lv_bus', 'p_lv_mw', 'q_lv_mvar'))),
+    ('trafo3w', (('hv_bus', 'p_hv_mw', 'q_hv_mvar'), ('mv_bus', 'p_mv_mw', 'q_mv_mvar'),
+                 ('lv_bus', 'p_lv_mw', 'q_lv_mvar'))),
+    ('impedance', (('from_bus', 'p_from_mw', 'q_from_mvar'), ('to_bus', 'p_to_mw', 'q_to_mvar'))),
+)
+
+
+def result_format(params):
+    """'columnar' when the study parameters ask for the columnar layout, else 'rows'."""
+    value = str((params or {}).get('resultFormat') or ROWS).strip().lower()
+    return COLUMNAR if value == COLUMNAR else ROWS
+
+
+def _table(net, element):
+    df = getattr(net, element, None)
+    return df if isinstance(df, pd.DataFrame) else None
+
+
+def _res(net, element):
+    return _table(net, 'res_' + element)
+
+
+def _column(df, col, index=None, default=np.nan):
+    """Float column of df (rows of index when given); default when the column is missing."""
+    n = len(df) if index is None else len(index)
+    if col not in df.columns:
+        return np.full(n, default, dtype=float)
+    values = df[col] if index is None else df[col].reindex(index)
+    return values.to_numpy(dtype=float, na_value=np.nan)
+
+
+def _labels(df, col, index, fallback=None):
+    """Python list of df[col] for the rows in index; fallback(i) per row when the column is missing."""
+    if col not in df.columns:
+        return [fallback(i) if fallback else None for i in index]
+    return df[col].reindex(index).tolist()
+
+
+def _finite_or_zero(values):
+    return np.where(np.isfinite(values), values, 0.0)
+
+
+def _branch_through_power(net, bus_index):
+    """
+    "Through power" of every bus from the AC branch results (lines, 2W/3W trafos, impedances), as
+    (p_branch_mw, q_branch_mvar).
+
+    res_bus.p_mw / q_mvar are lumped injections, so a pass-through bus (e.g. an LV node with a trafo
+    and a generator behind a bus-bus switch) can show zero while its branches carry power. Terminal
+    p_*_mw is power leaving the bus into the branch; per bus, terminals with p < 0 sum into the
+    inflow and p > 0 into the outflow (with their Q). The side with the larger |P| is reported,
+    outflow negated so the sign matches the res_bus convention for local generation.
+    """
+    n = len(bus_index)
+    p_in = np.zeros(n)
+    p_out = np.zeros(n)
+    q_in = np.zeros(n)
+    q_out = np.zeros(n)
+    for element, terminals in _BRANCH_TERMINALS:
+        df = _table(net, element)
+        res = _res(net, element)
+        if df is None or res is None or df.empty or res.empty:
+            continue
+        terminals = [t for t in terminals if t[0] in df.columns]
+        if not terminals:
+            continue
+        rows = df.index[df.index.isin(res.index)]
+        # summed element by element, terminal by terminal (from before to), in net order
+        pos = np.column_stack([bus_index.get_indexer(df.loc[rows, bus_col]) for bus_col, _, _ in terminals]).ravel()
+        p = np.column_stack([_finite_or_zero(_column(res, p_col, rows, 0.0)) for _, p_col, _ in terminals]).ravel()
+        q = np.column_stack([_finite_or_zero(_column(res, q_col, rows, 0.0)) for _, _, q_col in terminals]).ravel()
+        found = pos >= 0
+        into = found & (p < 0)
+        out = found & (p > 0)
+        np.add.at(p_in, pos[into], -p[into])
+        np.add.at(q_in, pos[into], q[into])
+        np.add.at(p_out, pos[out], p[out])
+        np.add.at(q_out, pos[out], q[out])
+    inflow = p_in >= p_out
+    return np.where(inflow, p_in, -p_out), np.where(inflow, q_in, -q_out)
+
+
+def _bus_table(net):
+    res = net.res_bus
+    index = res.index
+    p = _column(res, 'p_mw')
+    q = _column(res, 'q_mvar')
+    vm = _column(res, 'vm_pu')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = np.sqrt(p * p + q * q)
+        pf = np.where((denom != 0) & ~np.isnan(denom), p / denom, 0.0)
+        pf = np.where(np.isnan(pf), 0.0, pf)
+        q_p = np.where((p != 0) & ~np.isnan(p), q / p, 0.0)
+        q_p = np.where(np.isfinite(q_p), q_p, 0.0)
+        vn_kv = _column(net.bus, 'vn_kv', index)
+        vm_kv = np.where((vn_kv > 0) & ~np.isnan(vm), vm * vn_kv, np.nan)
+    p_branch, q_branch = _branch_through_power(net, index)
+    return {
+        'name': _labels(net.bus, 'name', index),
+        'id': _labels(net.bus, 'id', index),
+        'vm_pu': vm,
+        'va_degree': _column(res, 'va_degree'),
+        'p_mw': p,
+        'q_mvar': q,
+        'pf': pf,
+        'q_p': q_p,
+        'p_branch_mw': p_branch,
+        'q_branch_mvar': q_branch,
+        'vm_kv': vm_kv,
+    }
+
+
+def _simple_table(net, element, columns):
+    df = _table(net, element)
+    res = _res(net, element)
+    if df is None or res is None or res.empty:
+        return None
+    table = {'name': _labels(df, 'name', res.index), 'id': _labels(df, 'id', res.index)}
+    for col in columns:
+        table[col] = _column(res, col)
+    return table
+
+
+def _ext_grid_table(net):
+    table = _simple_table(net, 'ext_grid', ('p_mw', 'q_mvar'))
+    if table is not None:
+        p, q = table['p_mw'], table['q_mvar']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['pf'] = p / np.sqrt(p * p + q * q)
+            table['q_p'] = q / p
+    return table
+
+
+def _phase_table(net, element):
+    """Asymmetric sgen / load: per-phase results, or the aggregate split by the input phase shares."""
+    df = _table(net, element)
+    res = _res(net, element)
+    if df is None or res is None or res.empty:
+        return None
+    index = res.index
+    table = {'name': _labels(df, 'name', index), 'id': _labels(df, 'id', index)}
+    if all(col in res.columns for col in _PHASE_COLUMNS):
+        for col in _PHASE_COLUMNS:
+            table[col] = _column(res, col)
+        return table
+    if not all(col in res.columns for col in ('p_mw', 'q_mvar')):
+        print(f"Warning: res_{element} has unexpected column structure. Available columns: {res.columns.tolist()}")
+        return None
+    split = {}
+    for total_col, phase_cols in (('p_mw', _PHASE_COLUMNS[0::2]), ('q_mvar', _PHASE_COLUMNS[1::2])):
+        total = _column(res, total_col)
+        shares = [np.abs(_column(df, col, index)) for col in phase_cols]
+        total_input = shares[0] + shares[1] + shares[2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for col, share in zip(phase_cols, shares):
+                split[col] = np.where(total_input > 0, total * (share / total_input), total / 3.0)
+    for col in _PHASE_COLUMNS:
+        table[col] = split[col]
+    return table
+
+
+def _result_positions(df, res):
+    """Position in res of each row of df (same index, else same position when lengths match), -1 if none."""
+    if res is None or res.empty:
+        return np.full(len(df), -1)
+    pos = res.index.get_indexer(df.index)
+    if len(res) == len(df):
+        pos = np.where(pos < 0, np.arange(len(df)), pos)
+    return pos
+
+
+def _trafo_ids(df):
+    names = df['name'].tolist() if 'name' in df.columns else [None] * len(df)
+    raw_ids = df['id'].tolist() if 'id' in df.columns else [None] * len(df)
+    out_names, out_ids = [], []
+    for idx, name, raw_id in zip(df.index, names, raw_ids):
+        has_name = name is not None and not pd.isna(name)
+        out_names.append(str(name) if has_name else str(idx))
+        if raw_id is not None and not pd.isna(raw_id):
+            out_ids.append(str(raw_id))
+        else:
+            out_ids.append(str(name) if has_name else str(idx))
+    return out_names, out_ids
+
+
+def _trafo_table(net, element, columns):
+    """One row per net.trafo / net.trafo3w element; elements without a result row get idle defaults."""
+    df = _table(net, element)
+    if df is None or df.empty:
+        return None
+    res = _res(net, element)
+    pos = _result_positions(df, res)
+    found = pos >= 0
+    names, ids = _trafo_ids(df)
+    table = {'name': names, 'id': ids}
+    for col in columns:
+        default = 1.0 if col.startswith('vm_') else 0.0
+        values = np.full(len(df), default)
+        if found.any() and col in res.columns:
+            values[found] = res[col].to_numpy(dtype=float, na_value=np.nan)[pos[found]]
+        table[col] = values
+    return table
+
+
+def _shunt_tables(net):
+    """Shunt results split by typ into shunt reactors (with the final step) and capacitors."""
+    res = _res(net, 'shunt')
+    if res is None or res.empty:
+        return None, None
+    typ = net.shunt['typ'].reindex(res.index) if 'typ' in net.shunt.columns else pd.Series(index=res.index,
+                                                                                           dtype=object)
+    tables = []
+    for kind in ('shuntreactor', 'capacitor'):
+        index = res.index[(typ == kind).to_numpy()]
+        if not len(index):
+            tables.append(None)
+            continue
+        table = {'name': _labels(net.shunt, 'name', index), 'id': _labels(net.shunt, 'id', index)}
+        for col in ('p_mw', 'q_mvar', 'vm_pu'):
+            table[col] = _column(res, col, index)
+        if kind == 'shuntreactor':
+            for col in ('step', 'max_step'):
+                table[col] = _column(net.shunt, col, index)
+        tables.append(table)
+    return tables[0], tables[1]
+
+
+def _switch_table(net, switch_values):
+    res = _res(net, 'switch')
+    if res is None or res.empty:
+        return None
+    index = res.index
+    table = {
+        'name': _labels(net.switch, 'name', index),
+        'id': _labels(net.switch, 'id', index, str),
+        'closed': _labels(net.switch, 'closed', index, lambda i: True),
+    }
+    cols = ('i_ka', 'p_from_mw', 'q_from_mvar', 'p_to_mw', 'q_to_mvar', 'loading_percent')
+    values = np.array([switch_values(net, i, row) for i, row in zip(index, res.to_dict('records'))],
+                      dtype=float).reshape(len(index), len(cols))
+    for k, col in enumerate(cols):
+        table[col] = values[:, k]
+    return table
+
+
+def _vsc_table(net):
+    res = _res(net, 'vsc')
+    if res is None or res.empty:
+        return None
+    return {
+        'name': _labels(net.vsc, 'name', res.index, lambda i: f'VSC_{i}'),
+        'id': _labels(net.vsc, 'id', res.index, str),
+        'p_mw': _column(res, 'p_mw'),
+        'vm_pu': _column(res, 'vm_pu', default=0.0),
+    }
+
+
+def _line_dc_table(net):
+    res = _res(net, 'line_dc')
+    if res is None or res.empty:
+        return None
+    table = {
+        'name': _labels(net.line_dc, 'name', res.index, lambda i: f'LineDC_{i}'),
+        'id': _labels(net.line_dc, 'id', res.index, str),
+    }
+    for col in _LINE_DC_COLUMNS:
+        table[col] = _column(res, col, default=0.0)
+    return table
+
+
+def _tables(net, switch_values):
+    """(key, table) pairs in response order; tables without results are None."""
+    shunts, capacitors = _shunt_tables(net)
+    return (
+        ('busbars', _bus_table(net)),
+        ('lines', _simple_table(net, *_SIMPLE_TABLES['lines'])),
+        ('externalgrids', _ext_grid_table(net)),
+        ('generators', _simple_table(net, *_SIMPLE_TABLES['generators'])),
+        ('staticgenerators', _simple_table(net, *_SIMPLE_TABLES['staticgenerators'])),
+        ('asymmetricstaticgenerators', _phase_table(net, 'asymmetric_sgen')),
+        ('transformers', _trafo_table(net, 'trafo', _TRAFO_COLUMNS)),
+        ('transformers3W', _trafo_table(net, 'trafo3w', _TRAFO3W_COLUMNS)),
+        ('shunts', shunts),
+        ('capacitors', capacitors),
+        ('loads', _simple_table(net, *_SIMPLE_TABLES['loads'])),
+        ('asymmetricloads', _phase_table(net, 'asymmetric_load')),
+        ('impedances', _simple_table(net, *_SIMPLE_TABLES['impedances'])),
+        ('wards', _simple_table(net, *_SIMPLE_TABLES['wards'])),
+        ('extendedwards', _simple_table(net, *_SIMPLE_TABLES['extendedwards'])),
+        ('motors', _simple_table(net, *_SIMPLE_TABLES['motors'])),
+        ('storages', _simple_table(net, *_SIMPLE_TABLES['storages'])),
+        ('svcs', _simple_table(net, *_SIMPLE_TABLES['svcs'])),
+        ('tcscs', _simple_table(net, *_SIMPLE_TABLES['tcscs'])),
+        ('sscs', _simple_table(net, *_SIMPLE_TABLES['sscs'])),
+        ('dcbuses', _simple_table(net, *_SIMPLE_TABLES['dcbuses'])),
+        ('loadsdc', _simple_table(net, *_SIMPLE_TABLES['loadsdc'])),
+        ('sourcesdc', _simple_table(net, *_SIMPLE_TABLES['sourcesdc'])),
+        ('switches', _switch_table(net, switch_values)),
+        ('vscs', _vsc_table(net)),
+        ('b2bvscs', _simple_table(net, *_SIMPLE_TABLES['b2bvscs'])),
+        ('dclines', _simple_table(net, *_SIMPLE_TABLES['dclines'])),
+        ('linedcs', _line_dc_table(net)),
+    )
+
+
+def powerflow_tables(net, switch_values):
+    """
+    Power-flow result tables of a solved net in the columnar layout, keyed like the row layout
+    (busbars, lines, externalgrids, ...). Tables without results are left out.
+
+    switch_values(net, switch_index, res_row) -> (i_ka, p_from_mw, q_from_mvar, p_to_mw, q_to_mvar,
+    loading_percent) repairs the switch quantities pandapower leaves NaN.
+    """
+    result = {'format': COLUMNAR}
+    for key, table in _tables(net, switch_values):
+        if table is not None:
+            result[key] = table
+    return result
+
+
+def powerflow_rows(net, switch_values):
+    """
+    The same tables in the default row layout: {"busbars": [{"name": ..., "id": ..., "vm_pu": ...}, ...], ...},
+    one dict per element with the fields in table order.
+    """
+    result = {}
+    for key, table in _tables(net, switch_values):
+        if table is None:
+            continue
+        fields = list(table)
+        columns = [v.tolist() if isinstance(v, np.ndarray) else v for v in table.values()]
+        result[key] = [dict(zip(fields, values)) for values in zip(*columns)]
+    return result
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+JSON encoding of study results.
+
+Results are nested dicts / lists / output objects full of numpy scalars, arrays and NaN
+values. dumps() turns them into compact, strict RFC 8259 JSON in one pass: numpy scalars
+and arrays are encoded natively, NaN and +/-inf become null (browser JSON.parse rejects
+NaN tokens) and objects are encoded through their __dict__.
+
+orjson is used when it is installed; otherwise (or for the rare value orjson refuses,
+e.g. integers above 64 bits or numpy dict keys) a pure-Python fallback walks the result
+once and hands it to the standard library encoder.
+
+Configuration (environment variables):
+    ELECTRISIM_ORJSON   set to 0 to always use the pure-Python encoder (default 1)
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+import stage_timing
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+USE_ORJSON = orjson is not None and os.getenv('ELECTRISIM_ORJSON', '1') not in ('0', 'false', 'False')
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _convert(obj):
+    """JSON-compatible stand-in for a value neither encoder handles natively."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # numpy scalars (bool_, int64, float64, etc.) have .item() -> native Python type
+    if hasattr(obj, 'item') and callable(getattr(obj, 'item')):
+        return obj.item()
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return vars(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _strict(obj, default):
+    """Copy of obj made of plain dicts, lists, str, int, finite floats, bools and None."""
+    t = type(obj)
+    if t is str or t is int or t is bool or obj is None:
+        return obj
+    if t is float:
+        return obj if math.isfinite(obj) else None
+    if t is dict:
+        return {(k.item() if isinstance(k, np.generic) else k): _strict(v, default) for k, v in obj.items()}
+    if t is list or t is tuple:
+        return [_strict(v, default) for v in obj]
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        f = float(obj)
+        return f if math.isfinite(f) else None
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, dict):
+        return _strict(dict(obj), default)
+    if isinstance(obj, (list, tuple)):
+        return [_strict(v, default) for v in obj]
+    if default is not None:
+        try:
+            converted = default(obj)
+        except TypeError:
+            converted = obj
+        if converted is not obj:
+            return _strict(converted, default)
+    return _strict(_convert(obj), default)
+
+
+def dumps(obj, default=None):
+    """
+    Compact strict JSON string for a study result.
+
+    default: optional hook for objects the encoder does not know (called before the built-in
+    handling of numpy values and objects); it returns a JSON-compatible value, or raises
+    TypeError / returns the object unchanged to fall back to the built-in handling.
+    """
+    with stage_timing.stage('serialize'):
+        return _dumps(obj, default)
+
+
+def _dumps(obj, default):
+    if USE_ORJSON:
+        if default is None:
+            hook = _convert
+        else:
+            def hook(o):
+                try:
+                    converted = default(o)
+                except TypeError:
+                    converted = o
+                return _convert(o) if converted is o else converted
+        try:
+            return orjson.dumps(obj, default=hook, option=_ORJSON_OPTIONS).decode('utf-8')
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(_strict(obj, default), allow_nan=False, separators=(',', ':'))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel sweep of reactive power capability (RPC) operating points.
+
+The RPC study solves every (voltage level, P point, direction) operating point of its sweep on
+its own: the Q_max / Q_min power flows and limit searches of one point do not depend on those of
+another (the limit search only uses the neighbouring P point's answer as a starting guess). run()
+solves a list of such points either in-process, in order, or on a process pool created for the
+study: the base net is pickled once per worker (pool initializer) and every point is a task.
+Results are handed back as points finish; the caller reassembles them in sweep order.
+
+Configuration (environment variables):
+    ELECTRISIM_RPC_WORKERS          pool size for RPC sweeps (default 1: no pool)
+    ELECTRISIM_RPC_START_METHOD     multiprocessing start method for the pool (default 'spawn')
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import contingency_engine
+import study_cancellation
+
+RPC_WORKERS = max(1, int(os.getenv('ELECTRISIM_RPC_WORKERS', 1)))
+POOL_START_METHOD = os.getenv('ELECTRISIM_RPC_START_METHOD', 'spawn')
+
+# How often (s) the study checks its cancel token while waiting for pool tasks
+_CANCEL_POLL_S = 0.25
+
+_worker_state = None
+
+
+def _init_worker(net, solve, args):
+    """Pool initializer: keep this worker's copy of the base net for all points it solves."""
+    global _worker_state
+    _worker_state = (net, solve, args)
+
+
+def _solve_task(task):
+    net, solve, args = _worker_state
+    return solve(net, task, *args)
+
+
+def workers_for(n_tasks, workers=None):
+    """Pool size run() uses for n_tasks points (1: solved in-process)."""
+    return max(1, min(RPC_WORKERS if workers is None else int(workers), n_tasks))
+
+
+def run(net, tasks, solve, on_result, args=(), workers=None, cancel=None):
+    """
+    solve(net, task, *args, cancel=...) for every task; on_result(number, result) receives each
+    result with the task's position in tasks. solve must be a module-level function (it is pickled
+    by reference for the pool) and leave the net as it found it; args are pickled for the pool too.
+    In-process solves get the cancel token to check inside a point, pool solves get None (the
+    token stays in this process).
+
+    With one worker the tasks are solved in order in this process. Otherwise they run on a process
+    pool and on_result is called in completion order. A tripped cancel token (study_cancellation)
+    raises StudyCancelled; the pool processes are terminated then instead of finishing their tasks.
+    """
+    workers = workers_for(len(tasks), workers)
+    if workers <= 1:
+        for number, task in enumerate(tasks):
+            study_cancellation.check(cancel)
+            on_result(number, solve(net, task, *args, cancel=cancel))
+        return
+
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                               initializer=_init_worker, initargs=(net, solve, args))
+    with pool as executor:
+        numbers = {executor.submit(_solve_task, task): number for number, task in enumerate(tasks)}
+        pending = set(numbers)
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=_CANCEL_POLL_S, return_when=FIRST_COMPLETED)
+                study_cancellation.check(cancel)
+                for future in done:
+                    on_result(numbers[future], future.result())
+        except study_cancellation.StudyCancelled:
+            # Before leaving the with-block, whose shutdown would wait for the running tasks
+            contingency_engine.terminate_pool(executor)
+            raise
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Background job execution for long-running Electrisim studies.
+
+Studies submitted through the /jobs API run in a bounded process pool instead of the
+gunicorn request worker, so a long economic analysis or contingency run does not block
+quick load flows. Jobs live in this process only (one registry per gunicorn worker).
+
+Every job gets a slot in a shared byte array handed to the pool processes. Cancelling a running
+job sets the slot, and the CancelToken the job function receives reports it, so the study stops at
+its next loop iteration instead of running to completion. The same token enforces
+ELECTRISIM_JOB_MAX_RUNTIME_S inside the pool process, measured from the moment the job starts
+there; the worker publishes that start time in a second shared array.
+
+Configuration (environment variables):
+    ELECTRISIM_JOB_WORKERS          size of the process pool (default: CPU count - 1, at least 1)
+    ELECTRISIM_JOB_QUEUE_DEPTH      max queued + running jobs before submissions are rejected (default 16)
+    ELECTRISIM_JOB_MAX_RUNTIME_S    runtime after which a running job is stopped and reported as timed out (default 3600)
+    ELECTRISIM_JOB_RESULT_TTL_S     how long finished jobs and their results are kept (default 900)
+    ELECTRISIM_JOB_START_METHOD     multiprocessing start method for the pool (default 'spawn')
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import study_cancellation
+
+
+JOB_WORKERS = max(1, int(os.getenv('ELECTRISIM_JOB_WORKERS', max(1, (os.cpu_count() or 2) - 1))))
+JOB_QUEUE_DEPTH = max(1, int(os.getenv('ELECTRISIM_JOB_QUEUE_DEPTH', 16)))
+JOB_MAX_RUNTIME_S = float(os.getenv('ELECTRISIM_JOB_MAX_RUNTIME_S', 3600))
+JOB_RESULT_TTL_S = float(os.getenv('ELECTRISIM_JOB_RESULT_TTL_S', 900))
+JOB_START_METHOD = os.getenv('ELECTRISIM_JOB_START_METHOD', 'spawn')
+
+# Job states reported by GET /jobs/<id>
+QUEUED = 'queued'
+RUNNING = 'running'
+CANCELLING = 'cancelling'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+TIMEOUT = 'timeout'
+
+_ACTIVE_STATES = (QUEUED, RUNNING, CANCELLING)
+
+_jobs = {}
+_lock = threading.Lock()
+_executor = None
+_cancel_flags = None  # one byte per job slot, shared with the pool processes
+_start_times = None  # worker-side start time per job slot (0.0 until the job starts)
+_worker_cancel_flags = None  # the same arrays inside a pool process
+_worker_start_times = None
+
+# Cancel flag values
+_CANCEL_REQUESTED = 1
+_TIMED_OUT = 2  # set by the worker when the job ran past JOB_MAX_RUNTIME_S
+
+
+class JobQueueFull(Exception):
+    """Raised when the number of queued + running jobs reached ELECTRISIM_JOB_QUEUE_DEPTH."""
+
+
+def _init_worker(cancel_flags, start_times):
+    global _worker_cancel_flags, _worker_start_times
+    _worker_cancel_flags = cancel_flags
+    _worker_start_times = start_times
+
+
+def _get_executor():
+    global _executor, _cancel_flags, _start_times
+    if _executor is None:
+        ctx = multiprocessing.get_context(JOB_START_METHOD)
+        _cancel_flags = ctx.RawArray('b', JOB_QUEUE_DEPTH)
+        _start_times = ctx.RawArray('d', JOB_QUEUE_DEPTH)
+        _executor = ProcessPoolExecutor(
+            max_workers=JOB_WORKERS,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(_cancel_flags, _start_times),
+        )
+    return _executor
+
+
+def _shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+
+
+atexit.register(_shutdown)
+
+
+def _job_entry(fn, in_data, slot):
+    """Runs inside the pool process; returns worker-side timestamps together with the study result."""
+    started_at = time.time()
+    _worker_start_times[slot] = started_at
+    deadline = started_at + JOB_MAX_RUNTIME_S
+
+    def probe():
+        if _worker_cancel_flags[slot]:
+            return True
+        if time.time() > deadline:
+            _worker_cancel_flags[slot] = _TIMED_OUT
+            return True
+        return False
+
+    cancel = study_cancellation.CancelToken(probe=probe, probe_interval_s=0.0)
+    result = fn(in_data, cancel)
+    return started_at, time.time(), result
+
+
+def _free_slot():
+    """Cancel flag slot not used by a job still occupying the pool (caller holds _lock)."""
+    used = {job['slot'] for job in _jobs.values() if not job['future'].done()}
+    return next(slot for slot in range(JOB_QUEUE_DEPTH) if slot not in used)
+
+
+def _request_cancel(job):
+    """Ask a running job's study to stop (caller holds _lock)."""
+    job['cancel_requested'] = True
+    _cancel_flags[job['slot']] = _CANCEL_REQUESTED
+
+
+def _set_timeout(job, now):
+    """Mark a job as timed out (caller holds _lock)."""
+    job['status'] = TIMEOUT
+    job['finished_at'] = job.get('finished_at') or now
+    job['error'] = f"Job exceeded the maximum runtime of {JOB_MAX_RUNTIME_S:g} s"
+
+
+def _refresh(job, now):
+    """Update job state from its future (caller holds _lock)."""
+    fut = job['future']
+    if job['status'] in _ACTIVE_STATES:
+        timed_out = _cancel_flags[job['slot']] == _TIMED_OUT
+        if job['started_at'] is None and _start_times[job['slot']]:
+            job['started_at'] = _start_times[job['slot']]
+        if fut.done():
+            if fut.cancelled():
+                job['status'] = CANCELLED
+            elif fut.exception() is not None:
+                job['status'] = CANCELLED if job['cancel_requested'] else FAILED
+                job['error'] = str(fut.exception())
+            else:
+                started_at, finished_at, result = fut.result()
+                job['started_at'] = started_at
+                job['finished_at'] = finished_at
+                if timed_out:
+                    _set_timeout(job, now)
+                elif job['cancel_requested']:
+                    job['status'] = CANCELLED
+                else:
+                    job['status'] = DONE
+                    job['result'] = result
+            job['finished_at'] = job.get('finished_at') or now
+        elif fut.running():
+            if job['status'] == QUEUED:
+                job['status'] = RUNNING
+            # The worker stops the study at its deadline; this also covers studies that never
+            # reach a cancellation check
+            if timed_out or (job['status'] == RUNNING and job['started_at'] is not None
+                             and now - job['started_at'] > JOB_MAX_RUNTIME_S):
+                if not timed_out:
+                    _request_cancel(job)
+                _set_timeout(job, now)
+
+
+def _purge(now):
+    """Forget finished jobs older than JOB_RESULT_TTL_S (caller holds _lock)."""
+    for job_id in [j for j, job in _jobs.items()
+                   if job['status'] not in _ACTIVE_STATES and job['finished_at'] is not None
+                   and job['future'].done() and now - job['finished_at'] > JOB_RESULT_TTL_S]:
+        del _jobs[job_id]
+
+
+def _public(job, now):
+    """JSON-safe view of a job (no future, no result payload)."""
+    started = job['started_at']
+    finished = job['finished_at']
+    runtime_s = None
+    if started is not None:
+        runtime_s = round((finished or now) - started, 3)
+    return {
+        'job_id': job['job_id'],
+        'study_type': job['study_type'],
+        'status': job['status'],
+        'submitted_at': job['submitted_at'],
+        'started_at': started,
+        'finished_at': finished,
+        'runtime_s': runtime_s,
+        'queue_position': job.get('queue_position'),
+        'error': job.get('error'),
+    }
+
+
+def _active_count():
+    # Timed-out / cancelling jobs still occupy a pool process until their worker returns.
+    return sum(1 for job in _jobs.values() if not job['future'].done())
+
+
+def _update_all(now):
+    queued = []
+    for job in _jobs.values():
+        _refresh(job, now)
+        job['queue_position'] = None
+        if job['status'] == QUEUED:
+            queued.append(job)
+    queued.sort(key=lambda j: j['submitted_at'])
+    for pos, job in enumerate(queued):
+        job['queue_position'] = pos
+
+
+def submit_job(fn, in_data, study_type='unknown'):
+    """
+    Queue fn(in_data, cancel) on the process pool; cancel is a study_cancellation.CancelToken
+    tripped by cancel_job(). fn must be a picklable module-level function.
+    Raises JobQueueFull when ELECTRISIM_JOB_QUEUE_DEPTH jobs are already queued or running.
+    """
+    now = time.time()
+    with _lock:
+        _update_all(now)
+        _purge(now)
+        if _active_count() >= JOB_QUEUE_DEPTH:
+            raise JobQueueFull(
+                f"Too many simulations in progress ({JOB_QUEUE_DEPTH}). Please retry in a moment."
+            )
+        job_id = uuid.uuid4().hex
+        executor = _get_executor()
+        slot = _free_slot()
+        _cancel_flags[slot] = 0
+        _start_times[slot] = 0.0
+        job = {
+            'job_id': job_id,
+            'study_type': study_type,
+            'status': QUEUED,
+            'submitted_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'cancel_requested': False,
+            'error': None,
+            'result': None,
+            'slot': slot,
+            'future': executor.submit(_job_entry, fn, in_data, slot),
+        }
+        _jobs[job_id] = job
+        _update_all(now)
+        return _public(job, now)
+
+
+def get_job(job_id):
+    """Status dict of a job, or None if the id is unknown (or expired)."""
+    now = time.time()
+    with _lock:
+        _update_all(now)
+        job = _jobs.get(job_id)
+        return _public(job, now) if job is not None else None
+
+
+def get_job_result(job_id):
+    """Study result of a finished job (whatever fn returned), or None if not available."""
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        _refresh(job, now)
+        return job['result'] if job['status'] == DONE else None
+
+
+def cancel_job(job_id):
+    """
+    Cancel a job. Queued jobs are removed from the pool queue; a running job is marked
+    'cancelling', its study stops at the next loop iteration and its result is discarded.
+    Returns the updated status dict, or None if the id is unknown.
+    """
+    now = time.time()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        _refresh(job, now)
+        if job['status'] in _ACTIVE_STATES:
+            _request_cancel(job)
+            if job['future'].cancel():
+                job['status'] = CANCELLED
+                job['finished_at'] = now
+            else:
+                job['status'] = CANCELLING
+        _update_all(now)
+        return _public(job, now)
+
+
+def stats():
+    """Snapshot of pool configuration and job counts per state."""
+    now = time.time()
+    with _lock:
+        _update_all(now)
+        counts = {}
+        for job in _jobs.values():
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'workers': JOB_WORKERS,
+            'queue_depth': JOB_QUEUE_DEPTH,
+            'max_runtime_s': JOB_MAX_RUNTIME_S,
+            'active': _active_count(),
+            'jobs': counts,
+        }
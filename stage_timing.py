@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request stage timing.
+
+Each simulation request is split into stages (parse, build, topology, solve, extract, serialize,
+compress). The study code marks them with
+
+    with stage_timing.stage('solve'):
+        pp.runpp(net, ...)
+
+and the request handler reports the collected durations twice: as a Server-Timing response header
+(visible in the browser dev tools) and, per finished request, in Prometheus-style histograms labelled
+by stage, study type and network size bucket, exposed at GET /metrics.
+
+Outside a request (background jobs, scripts) stage() is a no-op. Repeated stages within one request
+(e.g. several solver runs) are summed. Histograms are kept per worker process.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+
+STAGES = ('parse', 'build', 'topology', 'solve', 'extract', 'serialize', 'compress')
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implicit.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Network size buckets by number of diagram elements: (upper bound, label).
+_SIZE_BUCKETS = ((100, '0-99'), (1000, '100-999'), (10000, '1000-9999'))
+_SIZE_LARGEST = '10000+'
+
+_current = contextvars.ContextVar('electrisim_stage_timer', default=None)
+_lock = threading.Lock()
+_histograms = {}  # (stage, study, size) -> [bucket counts..., +Inf count, sum]
+
+
+class RequestTimer:
+    """Stage durations (seconds) of one request, in the order the stages first ran."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Server-Timing header value, durations in milliseconds."""
+        parts = [f'{name};dur={seconds * 1000.0:.1f}' for name, seconds in self.stages.items()]
+        parts.append(f'total;dur={self.total() * 1000.0:.1f}')
+        return ', '.join(parts)
+
+
+def start_request():
+    """Start timing the current request; returns the timer and the token for end_request()."""
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Add the time spent in the with-block to stage name of the current request (if any)."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - t0)
+
+
+def size_bucket(in_data):
+    """Network size label for a simulation payload, by its number of diagram element rows."""
+    n = sum(1 for row in in_data.values() if isinstance(row, dict)) if isinstance(in_data, dict) else 0
+    for bound, label in _SIZE_BUCKETS:
+        if n < bound:
+            return label
+    return _SIZE_LARGEST
+
+
+def observe(timer, study, size):
+    """Record the stages of a finished request (plus 'total') in the histograms."""
+    samples = list(timer.stages.items()) + [('total', timer.total())]
+    with _lock:
+        for name, seconds in samples:
+            entry = _histograms.get((name, study, size))
+            if entry is None:
+                entry = _histograms[(name, study, size)] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[i] += 1
+            entry[len(BUCKETS)] += 1
+            entry[-1] += seconds
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics():
+    """Histograms in the Prometheus text exposition format."""
+    lines = [
+        '# HELP electrisim_stage_duration_seconds Time spent per simulation request stage.',
+        '# TYPE electrisim_stage_duration_seconds histogram',
+    ]
+    with _lock:
+        items = sorted((key, list(entry)) for key, entry in _histograms.items())
+    for (name, study, size), entry in items:
+        labels = f'stage="{_label(name)}",study="{_label(study)}",size="{_label(size)}"'
+        for i, bound in enumerate(BUCKETS):
+            lines.append(f'electrisim_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {entry[i]}')
+        lines.append(f'electrisim_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {entry[len(BUCKETS)]}')
+        lines.append(f'electrisim_stage_duration_seconds_sum{{{labels}}} {entry[-1]:.6f}')
+        lines.append(f'electrisim_stage_duration_seconds_count{{{labels}}} {entry[len(BUCKETS)]}')
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    with _lock:
+        _histograms.clear()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Cooperative cancellation of running studies.
+
+A CancelToken travels with the study parameters ('_cancel_token') and the long loops (contingency
+cases, time series steps, RPC sweep and bisection, protection fault scenarios, economic lookup
+points, BESS scenarios and control iterations) call check(token) once per iteration. A tripped
+token raises StudyCancelled there, so abandoned work stops at the next iteration boundary instead
+of running to completion.
+
+A token trips when
+    - cancel() is called (the NDJSON stream consumer went away, a background job was cancelled
+      via DELETE /jobs/<id> or timed out), or
+    - its probe reports it: for POST / the probe peeks at the client socket and reports a closed
+      connection; for background jobs it reads the job's shared cancel flag.
+
+StudyCancelled derives from BaseException so the studies' broad `except Exception` handlers
+(which build error results and run diagnostics) do not swallow it; the request handlers catch it.
+
+Configuration (environment variables):
+    ELECTRISIM_CANCEL_ON_DISCONNECT   set to 0 to keep running studies whose client disconnected (default 1)
+    ELECTRISIM_DISCONNECT_POLL_S      least time between two client socket checks (default 0.5)
+"""
+import os
+import select
+import socket
+import threading
+import time
+
+CANCEL_ON_DISCONNECT = os.getenv('ELECTRISIM_CANCEL_ON_DISCONNECT', '1') != '0'
+DISCONNECT_POLL_S = max(0.0, float(os.getenv('ELECTRISIM_DISCONNECT_POLL_S', 0.5)))
+
+
+class StudyCancelled(BaseException):
+    """Raised by check() inside a study whose token was tripped."""
+
+
+class CancelToken:
+    """
+    Cancellation flag of one study. probe() (optional) is consulted at most every
+    probe_interval_s seconds; once it returns True the token stays cancelled.
+    """
+
+    def __init__(self, probe=None, probe_interval_s=DISCONNECT_POLL_S):
+        self._event = threading.Event()
+        self._probe = probe
+        self._probe_interval_s = probe_interval_s
+        self._next_probe = 0.0
+
+    def cancel(self):
+        self._event.set()
+
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self._probe is not None:
+            now = time.monotonic()
+            if now >= self._next_probe:
+                self._next_probe = now + self._probe_interval_s
+                if self._probe():
+                    self._event.set()
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled():
+            raise StudyCancelled('Study cancelled')
+
+
+def check(token):
+    """Raise StudyCancelled when token (may be None) was tripped."""
+    if token is not None:
+        token.check()
+
+
+def is_cancelled(token):
+    return token is not None and token.cancelled()
+
+
+def _socket_closed(sock):
+    """True when the peer closed the connection (the request body has been read already)."""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (ValueError, TypeError, NotImplementedError):
+        # TLS sockets do not support MSG_PEEK; closed / detached sockets raise ValueError
+        return False
+    except OSError:
+        return True
+
+
+def request_token(environ):
+    """CancelToken for the current WSGI request, tripped when its client disconnects."""
+    sock = environ.get('gunicorn.socket') or environ.get('werkzeug.socket')
+    if not CANCEL_ON_DISCONNECT or sock is None:
+        return CancelToken()
+    return CancelToken(probe=lambda: _socket_closed(sock))
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pandapower as pp
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandapower_electrisim  # noqa: E402
+
+
+def _bus(n, vn_kv):
+    return {'typ': f'Bus{n}', 'name': f'bus{n}', 'id': f'bus-{n}', 'vn_kv': str(vn_kv), 'userFriendlyName': f'Bus {n}'}
+
+
+def _line(n, bus_from, bus_to, length_km='2'):
+    return {'typ': f'Line{n}', 'name': f'line{n}', 'id': f'line-{n}', 'userFriendlyName': f'Line {n}',
+            'busFrom': bus_from, 'busTo': bus_to, 'length_km': length_km, 'parallel': '1', 'df': '1',
+            'in_service': 'true', 'r_ohm_per_km': '0.1', 'x_ohm_per_km': '0.12', 'c_nf_per_km': '250',
+            'g_us_per_km': '0', 'max_i_ka': '0.4', 'type': 'cs', 'r0_ohm_per_km': '0.3',
+            'x0_ohm_per_km': '0.36', 'c0_nf_per_km': '150', 'endtemp_degree': '250'}
+
+
+def _load(n, bus, p_mw='1'):
+    return {'typ': f'Load{n}', 'name': f'load{n}', 'id': f'load-{n}', 'userFriendlyName': f'Load {n}',
+            'bus': bus, 'p_mw': p_mw, 'q_mvar': '0.2', 'const_z_percent': '0', 'const_i_percent': '0',
+            'sn_mva': '2', 'scaling': '1', 'type': 'wye', 'in_service': 'true'}
+
+
+def _sgen(n, bus, p_mw='1.5'):
+    return {'typ': f'Static Generator{n}', 'name': f'sgen{n}', 'id': f'sgen-{n}', 'userFriendlyName': f'Sgen {n}',
+            'bus': bus, 'p_mw': p_mw, 'q_mvar': '0', 'sn_mva': '2', 'scaling': '1', 'type': 'wye', 'k': '0',
+            'rx': '0.1', 'generator_type': 'async', 'lrc_pu': '0', 'max_ik_ka': '0', 'kappa': '0',
+            'current_source': 'true', 'in_service': 'true'}
+
+
+def make_diagram(loads_per_bus=1, sgens_per_bus=1, lines=1):
+    """Small diagram: grid - 110/20 kV transformer - lines out of one 20 kV bus, loads and sgens at their ends."""
+    rows = [
+        {'typ': 'PowerFlowPandaPower Parameters', 'frequency': '50', 'algorithm': 'nr',
+         'calculate_voltage_angles': 'auto', 'initialization': 'auto', 'exportPython': False,
+         'exportPandapowerResults': False, 'run_control': False, 'user_email': 'test@example.com'},
+        {'name': 'grid', 'id': 'grid-0', 'userFriendlyName': 'External Grid', 'bus': 'bus0',
+         'typ': 'External Grid0', 'vm_pu': '1', 'va_degree': '0', 's_sc_max_mva': '1000', 's_sc_min_mva': '800',
+         'rx_max': '0.1', 'rx_min': '0.1', 'r0x0_max': '0.1', 'x0x_max': '1', 'in_service': 'true'},
+        _bus(0, 110),
+        _bus(1, 20),
+        {'typ': 'Transformer0', 'name': 'trafo0', 'id': 'trafo-0', 'userFriendlyName': 'Transformer',
+         'hv_bus': 'bus0', 'lv_bus': 'bus1', 'sn_mva': '25', 'vn_hv_kv': '110', 'vn_lv_kv': '20',
+         'vkr_percent': '0.4', 'vk_percent': '12', 'pfe_kw': '14', 'i0_percent': '0.07', 'vector_group': 'Dyn',
+         'vk0_percent': '12', 'vkr0_percent': '0.4', 'mag0_percent': '100', 'si0_hv_partial': '0.9',
+         'parallel': '1', 'shift_degree': '150', 'tap_side': 'hv', 'tap_pos': '0', 'tap_neutral': '0',
+         'tap_max': '9', 'tap_min': '-9', 'tap_step_percent': '1.5', 'tap_step_degree': '0',
+         'tap_phase_shifter': 'false', 'tap_changer_type': 'Ratio', 'in_service': 'true',
+         'discrete_tap_control': 'false'},
+    ]
+    n_load = n_sgen = 0
+    for n in range(lines):
+        end = f'bus{n + 2}'
+        rows.append(_bus(n + 2, 20))
+        rows.append(_line(n, 'bus1', end))
+        for _ in range(loads_per_bus):
+            rows.append(_load(n_load, end))
+            n_load += 1
+        for _ in range(sgens_per_bus):
+            rows.append(_sgen(n_sgen, end))
+            n_sgen += 1
+    return {str(n): row for n, row in enumerate(rows)}
+
+
+def build(in_data, bulk):
+    net = pp.create_empty_network(f_hz=50.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        Busbars = pandapower_electrisim.create_busbars(in_data, net, bulk=bulk)
+        pandapower_electrisim.create_other_elements(in_data, net, None, Busbars, bulk=bulk)
+    return net, Busbars
+
+
+def _null(value):
+    return value is None or value is pd.NA or (isinstance(value, float) and value != value)
+
+
+def assert_same_cells(left, right):
+    """Element tables equal cell for cell, telling None and NaN apart, with the same column order."""
+    for table, df in left.items():
+        if not isinstance(df, pd.DataFrame) or table.startswith('res_') or not len(df):
+            continue
+        other = right[table]
+        assert list(df.index) == list(other.index), table
+        assert list(df.columns) == list(other.columns), table
+        for col in df.columns:
+            assert df[col].dtype == other[col].dtype, (table, col)
+            for a, b in zip(df[col].tolist(), other[col].tolist()):
+                if _null(a) or _null(b):
+                    assert type(a) is type(b), (table, col, a, b)
+                elif isinstance(a, float):
+                    assert np.isclose(a, b), (table, col, a, b)
+                else:
+                    assert a == b, (table, col, a, b)
+
+
+@pytest.fixture
+def diagram():
+    return make_diagram
@@ -0,0 +1,30 @@
+from conftest import assert_same_cells, build
+
+
+def test_one_row_per_table(diagram):
+    in_data = diagram(loads_per_bus=1, sgens_per_bus=1, lines=1)
+    net, Busbars = build(in_data, bulk=True)
+    assert (len(net.line), len(net.load), len(net.sgen), len(net.trafo)) == (1, 1, 1, 1)
+    legacy, legacy_busbars = build(in_data, bulk=False)
+    assert Busbars == legacy_busbars
+    assert_same_cells(legacy, net)
+
+
+def test_several_rows_on_one_bus(diagram):
+    in_data = diagram(loads_per_bus=3, sgens_per_bus=4, lines=1)
+    net, Busbars = build(in_data, bulk=True)
+    assert len(net.load) == 3 and net.load.bus.nunique() == 1
+    assert len(net.sgen) == 4 and net.sgen.bus.nunique() == 1
+    legacy, legacy_busbars = build(in_data, bulk=False)
+    assert Busbars == legacy_busbars
+    assert_same_cells(legacy, net)
+
+
+def test_parallel_lines_between_the_same_buses(diagram):
+    in_data = diagram(lines=1)
+    line = next(row for row in in_data.values() if row.get('typ', '').startswith('Line'))
+    in_data['extra'] = dict(line, typ='Line9', name='line9', id='line-9')
+    net, _ = build(in_data, bulk=True)
+    assert len(net.line) == 2
+    legacy, _ = build(in_data, bulk=False)
+    assert_same_cells(legacy, net)
@@ -0,0 +1,45 @@
+import pytest
+
+import network_cache
+from conftest import assert_same_cells
+
+
+def _keys(in_data, typ):
+    return [key for key, row in in_data.items() if row.get('typ', '').startswith(typ)]
+
+
+def _delta(base, kind):
+    changed, added, removed = {}, {}, []
+    if kind in ('changed', 'all'):
+        line = _keys(base, 'Line')[0]
+        changed[line] = dict(base[line], length_km='7.5')
+        sgen = _keys(base, 'Static Generator')[0]
+        changed[sgen] = dict(base[sgen], p_mw='0.4')
+    if kind in ('added', 'all'):
+        sgen = base[_keys(base, 'Static Generator')[0]]
+        added['new-sgen'] = dict(sgen, typ='Static Generator9', name='sgen9', id='sgen-9', p_mw='0.7')
+        load = base[_keys(base, 'Load')[0]]
+        added['new-load'] = dict(load, typ='Load9', name='load9', id='load-9', bus='bus3')
+    if kind in ('removed', 'all'):
+        removed.append(_keys(base, 'Load')[1])
+    return {'changed': changed, 'added': added, 'removed': removed}
+
+
+@pytest.mark.parametrize('kind', ['changed', 'added', 'removed', 'all'])
+def test_patched_net_equals_full_build(diagram, kind):
+    network_cache.clear()
+    base = diagram(loads_per_bus=2, sgens_per_bus=1, lines=2)
+    base_hash = network_cache.remember_model(base)
+    network_cache.build_network(base, 50.0)
+
+    study_row = base['0']
+    in_data, delta = network_cache.expand_delta(
+        {'0': study_row, 'model_delta': {'base_hash': base_hash, **_delta(base, kind)}})
+    patched = network_cache.stats()['patched']
+    net, Busbars = network_cache.build_network(in_data, 50.0, delta=delta)
+    assert network_cache.stats()['patched'] == patched + 1
+
+    expected, expected_busbars = network_cache._build(in_data, 50.0)
+    assert Busbars == expected_busbars
+    assert net.user_friendly_names == expected.user_friendly_names
+    assert_same_cells(expected, net)